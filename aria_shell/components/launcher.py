@@ -1,5 +1,10 @@
+import time
 from typing import TYPE_CHECKING
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from operator import attrgetter
+from threading import RLock, Thread
 
 from gi.repository import GObject, GLib, Gio, Gdk, Gtk
 
@@ -7,8 +12,12 @@ from aria_shell.components import AriaComponent
 from aria_shell.i18n import i18n
 from aria_shell.services.commands import CommandsService, CommandFailed
 from aria_shell.services.xdg import XDGDesktopService, DesktopApp
+from aria_shell.services.icon_cache import IconCacheService
 from aria_shell.gui import AriaWindow
-from aria_shell.utils import clamp, PerfTimer, CleanupHelper
+from aria_shell.utils import clamp, Timer, PerfTimer, CleanupHelper, Coalescer, splice_list_store
+from aria_shell.utils.search import SearchIndex, EXACT_SCORE, TIER_FLOORS, score_tier
+from aria_shell.utils.frecency import FrecencyStore
+from aria_shell.utils.env import ARIA_CONFIG_HOME
 from aria_shell.config import AriaConfig, AriaConfigModel
 from aria_shell.utils.logger import get_loggers
 if TYPE_CHECKING:
@@ -26,6 +35,17 @@ class LauncherConfig(AriaConfigModel):
     width: int = 400
     height: int = 400
     grab_display: bool = True
+    search_delay: int = 50
+    prewarm: bool = False
+    max_results: int = 50
+
+    @staticmethod
+    def validate_search_delay(val: int):
+        return clamp(val, 0, 1000)
+
+    @staticmethod
+    def validate_max_results(val: int):
+        return clamp(val, 0, 10000)
 
     @staticmethod
     def validate_icon_size(val: int):
@@ -57,6 +77,12 @@ class AriaLauncher(CleanupHelper, AriaComponent):
         self.list_view: Gtk.ListView | None = None
         self.search_entry: Gtk.Entry | None = None
 
+        # state of the running search
+        self._search_timer: Timer | None = None
+        self._search_cancellable: Gio.Cancellable | None = None
+        self._search_perf: PerfTimer | None = None
+        self._results: dict[LauncherProvider, list[LauncherItem]] = {}
+
         # crete the window
         self.win = AriaWindow(
             app=app,
@@ -76,27 +102,40 @@ class AriaLauncher(CleanupHelper, AriaComponent):
 
         # init all providers
         self.providers = [
-            ApplicationsProvider(),
+            ApplicationsProvider(self.conf.max_results),
         ]
 
         # perform a first search
         self._on_entry_changed(self.search_entry, '')
 
+        # render the window once, when the shell startup is completed
+        if self.conf.prewarm:
+            GLib.idle_add(self._prewarm, priority=GLib.PRIORITY_LOW)
+
     def shutdown(self):
         CommandsService().unregister('launcher')
-        # TODO shutdown properly each provider !!!!!!!!!!!
+        self._cancel_search()
+        for provider in self.providers:
+            provider.shutdown()
         self.win.shutdown()
         self.win = None
         self.providers = []
+        self._results = {}
         self.list_store = None
         self.list_view = None
         self.search_entry = None
         super().shutdown()
 
+    def _prewarm(self) -> bool:
+        if self.win and not self.win.is_visible():
+            DBG('Prewarming the launcher window')
+            self.win.prewarm()
+        return False  # one-shot idle
+
     def the_launcher_command(self, _, params: list[str]) -> None:
         """Runner for the 'launcher' aria command."""
         if not params or params[0] == 'toggle':
-            self.hide() if self.win.is_visible() else self.show()
+            self.hide() if self.win.is_shown() else self.show()
         elif params and params[0] == 'hide':
             self.hide()
         elif params and params[0] == 'show':
@@ -171,26 +210,70 @@ class AriaLauncher(CleanupHelper, AriaComponent):
         title = GLib.markup_escape_text(item.title, -1)
         subtitle = GLib.markup_escape_text(item.subtitle or '', -1)
 
-        ico.set_from_icon_name(item.icon_name)
+        IconCacheService().set_image(ico, item.icon_name)
         lbl.set_markup(
             f'{title}\n'
             f'<span font_size="small" alpha="60%">{subtitle}</span>'
         )
 
     def _on_entry_changed(self, *_):
-        t = PerfTimer()
-        # get results from all providers
-        items = []
+        # debounce the search while typing, an empty search run immediately
+        if self._search_timer:
+            self._search_timer.stop()
+            self._search_timer = None
+        if self.get_search_text() and self.conf.search_delay > 0:
+            self._search_timer = Timer(self.conf.search_delay / 1000.0,
+                                       self._start_search)
+        else:
+            self._start_search()
+
+    def _start_search(self) -> bool:
+        """Ask all providers to search, results will stream in when ready."""
+        self._search_timer = None
+        self._cancel_search()
+        self._search_cancellable = cancellable = Gio.Cancellable()
+        self._search_perf = PerfTimer(auto_reset=False)
+        self._results = {}
+
+        text = self.get_search_text()
+        callback = partial(self._on_provider_results, cancellable)
         for provider in self.providers:
-            items.extend(provider.search(self.get_search_text()))
-
-        # repopulate the list store
-        self.list_store.remove_all()
-        for item in sorted(items, key=attrgetter('priority'), reverse=True):
-            self.list_store.append(item)
-
-        DBG(f'Found {len(items)} results in {t.elapsed}')
-
+            provider.search_async(text, cancellable, callback)
+        return False  # one-shot timer
+
+    def _cancel_search(self):
+        """Stop the pending or running search, stale results will be dropped."""
+        if self._search_timer:
+            self._search_timer.stop()
+            self._search_timer = None
+        if self._search_cancellable:
+            self._search_cancellable.cancel()
+            self._search_cancellable = None
+
+    def _flush_search(self):
+        """Run the debounced search now, if still waiting for the timer."""
+        if self._search_timer:
+            self._search_timer.stop()
+            self._start_search()
+
+    def _on_provider_results(self, cancellable: Gio.Cancellable,
+                             provider: LauncherProvider,
+                             items: list[LauncherItem]):
+        # late results of a cancelled search are stale
+        if cancellable is not self._search_cancellable:
+            DBG(f'{provider} dropped {len(items)} stale results')
+            return
+
+        # merge with the results of the providers that already finished
+        self._results[provider] = items
+        results = [item for items in self._results.values() for item in items]
+
+        # update the list store, only touching the changed rows
+        results.sort(key=attrgetter('priority'), reverse=True)
+        splice_list_store(self.list_store, results)
+
+        DBG(f'{provider} found {len(items)} results'
+            f' (total: {len(results)}) in {self._search_perf.elapsed}')
 
     def _on_win_key_pressed(self, _ec: Gtk.EventControllerKey, keyval: int,
                             _keycode: int, _state: Gdk.ModifierType):
@@ -228,16 +311,21 @@ class AriaLauncher(CleanupHelper, AriaComponent):
         self.win.hide()
 
     def reset(self):
-        self.search_entry.set_text('')
+        if self.search_entry.get_text():
+            self.search_entry.set_text('')
+        else:
+            self._start_search()  # apps can be changed while hidden
         self.list_view.scroll_to(0, Gtk.ListScrollFlags.SELECT)
 
     def get_search_text(self) -> str:
         return self.search_entry.get_text().strip().lower()
 
     def run_selected(self, *_):
+        self._flush_search()
         model: Gtk.SingleSelection = self.list_view.get_model()  # noqa
         item: LauncherItem = model.get_selected_item()  # noqa
-        item.selected()
+        if item:
+            item.selected()
         self.hide()
 
 
@@ -266,26 +354,90 @@ class LauncherItem(GObject.Object):
         return f"<LauncherItem '{self.title}' prio={self.priority}>"
 
 
+SearchCallback = Callable[['LauncherProvider', list[LauncherItem]], None]
+
+
 class LauncherProvider:
-    """ Base class for all items providers """
+    """ Base class for all items providers
+
+    Providers must implement search(), that is called on the main loop.
+    Slow providers can set `threaded = True` to run search() in a worker
+    thread instead, one search at a time and holding `self.lock`: the state
+    used by search() must be changed only while holding the same lock.
+    Or they can override search_async() with a custom async implementation.
+    """
+    threaded = False
+
+    def __init__(self):
+        self.lock = RLock()
+        self._worker: ThreadPoolExecutor | None = None
+
+    def __repr__(self):
+        return f'<{type(self).__name__}>'
+
     def search(self, text: str) -> list[LauncherItem]:
         raise NotImplementedError
 
+    def search_async(self, text: str, cancellable: Gio.Cancellable,
+                     callback: SearchCallback):
+        """Search text and call callback(provider, items) on the main loop.
+
+        The callback is not called if cancellable has been cancelled
+        in the meantime, as the results are stale.
+        """
+        if not self.threaded:
+            callback(self, self.search(text))
+            return
+
+        def _search():
+            # searches queued while typing are stale before they start
+            if cancellable.is_cancelled():
+                return
+            try:
+                with self.lock:
+                    items = self.search(text)
+            except Exception as e:
+                ERR(f'{self} search failed: {e}')
+                return
+            GLib.idle_add(_search_done, items)
+
+        def _search_done(items: list[LauncherItem]) -> bool:
+            if not cancellable.is_cancelled():
+                callback(self, items)
+            return False  # one-shot idle
+
+        if self._worker is None:
+            self._worker = ThreadPoolExecutor(max_workers=1,
+                                              thread_name_prefix='aria-launcher')
+        self._worker.submit(_search)
+
+    def shutdown(self):
+        """Release all the provider resources."""
+        if self._worker:
+            self._worker.shutdown(wait=False, cancel_futures=True)
+            self._worker = None
+
 
 ################################################################################
 # DGX DestopApp search provider
 ################################################################################
 class ApplicationItem(LauncherItem):
-    """ Items returned by the ApplicationProvider """
-    def __init__(self, app: DesktopApp, priority: float):
+    """ Items returned by the ApplicationProvider, one for each app """
+    def __init__(self, app: DesktopApp, frecency: FrecencyStore,
+                 priority: float = 0):
         super().__init__()
         self._app = app
+        self._frecency = frecency
         self._priority = priority
 
     @property
     def priority(self):
         return self._priority
 
+    @priority.setter
+    def priority(self, priority: float):
+        self._priority = priority
+
     @property
     def title(self):
         return self._app.display_name
@@ -299,37 +451,118 @@ class ApplicationItem(LauncherItem):
         return self._app.icon_name
 
     def selected(self):
+        self._frecency.bump(self._app.id)
         self._app.launch()
 
 
+def app_priority(score: float, boost: float) -> float:
+    """
+    Priority of an app from its search score and its frecency boost (0..1).
+
+    Sort by the kind of match first (exact, prefix, ... subsequence), then
+    by usage, and only then by the exact score: a heavily used app never
+    beats a better kind of match.
+    """
+    tier = len(TIER_FLOORS) - score_tier(score)
+    return tier + boost * 0.9 + score / EXACT_SCORE * 0.09
+
+
 class ApplicationsProvider(LauncherProvider):
-    """" XDG Desktop App search provider """
-    def __init__(self):
+    """" XDG Desktop App search provider
+
+    Args:
+        max_results: max number of apps returned by a search (0: no limit),
+                     the used apps are always returned when they match
+    """
+    def __init__(self, max_results: int = 0):
+        super().__init__()
+        self.max_results = max_results
         self.xdg_service = XDGDesktopService()
-        self.apps = self.xdg_service.all_apps()
+        self.frecency = FrecencyStore(ARIA_CONFIG_HOME / 'launcher.frecency')
+
+        # create all the items, remembering the display_name order
+        self.items: dict[str, ApplicationItem] = {}
+        self.order: dict[str, int] = {}
+        apps = self.xdg_service.all_apps(sort=False)
+        for app in apps:
+            self.items[app.id] = ApplicationItem(app, self.frecency)
+        self._update_order()
+        # sort again only once for a burst of app changes
+        self._order_updates = Coalescer()
+
+        # index the apps in a thread, the first search waits for it.
+        # Fuzzy match only the names: the ids words (org, gnome, kde...)
+        # are shared by most of the apps, so they only add junk matches
+        self.index: SearchIndex[str] = SearchIndex(fuzzy_fields=1)
+        self._indexer: Thread | None = Thread(
+            target=self._index_apps, args=(apps,),
+            name='aria-app-index', daemon=True)
+        self._indexer.start()
+
+        # keep the index updated when apps are (un)installed
+        self.xdg_service.connect('app-added', self._on_app_changed)
+        self.xdg_service.connect('app-changed', self._on_app_changed)
+        self.xdg_service.connect('app-removed', self._on_app_removed)
 
     def search(self, search: str) -> list[LauncherItem]:
+        # reuse the same item for each app, so the view can keep its rows
+        self._order_updates.flush()
+        if search:
+            self._wait_index()
+            matches = self.index.search(search, self.max_results)
+            # the used apps can rank first even with a worse match
+            for app_id in self.frecency.entries:
+                if app_id not in matches and app_id in self.index:
+                    if score := self.index.score(search, app_id):
+                        matches[app_id] = score
+        else:
+            matches = dict.fromkeys(self.items, 1)
+        # most used apps first, within the same kind of match
+        now = time.time()
+        boost = self.frecency.boost
         results = []
-        for app in self.apps:
-            prio = 0
-            if not search:
-                prio = 1
-            else:
-                for field in app.id, app.name, app.description:
-                    if not field:
-                        continue
-                    field = field.lower()
-                    if search == field:
-                        prio = 10
-                        break
-                    elif field.startswith(search):
-                        prio = 8
-                        break
-                    elif search in field:
-                        prio = 6
-                        break
-
-            if prio > 0:
-                results.append(ApplicationItem(app, priority=prio))
-
+        for app_id in sorted(matches, key=self.order.__getitem__):
+            item = self.items[app_id]
+            item.priority = app_priority(matches[app_id], boost(app_id, now))
+            results.append(item)
         return results
+
+    def shutdown(self):
+        self.xdg_service.disconnect('app-added', self._on_app_changed)
+        self.xdg_service.disconnect('app-changed', self._on_app_changed)
+        self.xdg_service.disconnect('app-removed', self._on_app_removed)
+        self._order_updates.cancel()
+        self.frecency.flush()
+        super().shutdown()
+
+    def _index_apps(self, apps: list[DesktopApp]):
+        perf = PerfTimer()
+        for app in apps:
+            self.index.add(app.id, app.name, app.id, app.description)
+        self.index.prepare()
+        DBG(f'Indexed {len(apps)} apps in {perf.elapsed}')
+
+    def _wait_index(self):
+        """Wait for the apps to be indexed, before using the index."""
+        if self._indexer is not None:
+            self._indexer.join()
+            self._indexer = None
+
+    def _add_app(self, app: DesktopApp):
+        self._wait_index()
+        self.items[app.id] = ApplicationItem(app, self.frecency)
+        self.index.add(app.id, app.name, app.id, app.description)
+
+    def _update_order(self):
+        titles = sorted(self.items, key=lambda app_id: self.items[app_id].title)
+        self.order = {app_id: position for position, app_id in enumerate(titles)}
+
+    def _on_app_changed(self, app: DesktopApp):
+        self._add_app(app)
+        self._order_updates.schedule('order', self._update_order)
+
+    def _on_app_removed(self, app: DesktopApp):
+        if self.items.pop(app.id, None):
+            self._wait_index()
+            self.index.remove(app.id)
+            self._order_updates.schedule('order', self._update_order)
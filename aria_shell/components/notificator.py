@@ -33,6 +33,7 @@ class NotificatorConfig(AriaConfigModel):
     position: Literal['top-left', 'top-right','top-center',
                       'bottom-left','bottom-right','bottom-center'] = 'top-right'
     opacity: int = 100
+    max_notifications: int = 50
 
     @staticmethod
     def validate_duration(val: int):
@@ -42,6 +43,10 @@ class NotificatorConfig(AriaConfigModel):
     def validate_opacity(val: int):
         return clamp(val, 0, 100)
 
+    @staticmethod
+    def validate_max_notifications(val: int):
+        return clamp(val, 1, None)
+
 
 class AriaNotificator(CleanupHelper, AriaComponent):
     """The notificator window show a ListView of Notification."""
@@ -66,7 +71,8 @@ class AriaNotificator(CleanupHelper, AriaComponent):
 
         # initialize the NotificationService
         self.notification_service = NotificationService()
-        self.notification_service.start_server(self.config.duration)
+        self.notification_service.start_server(self.config.duration,
+                                               self.config.max_notifications)
         notifications_model = self.notification_service.get_list_model()
         self.safe_connect(notifications_model, 'items_changed', self._on_items_changed)
 
@@ -5,7 +5,7 @@ import configparser
 from pathlib import Path
 from annotationlib import get_annotations
 
-from aria_shell.utils import Singleton
+from aria_shell.utils import Singleton, clamp
 from aria_shell.utils.logger import get_loggers
 from aria_shell.utils.env import lookup_config_file
 
@@ -130,6 +130,16 @@ class AriaConfigGeneralModel(AriaConfigModel):
     style: str = ''
     reload_config: bool = False
     reload_style: bool = False
+    command_workers: int = 2
+    command_timeout: int = 10
+
+    @staticmethod
+    def validate_command_workers(val: int):
+        return clamp(val, 1, 64)
+
+    @staticmethod
+    def validate_command_timeout(val: int):
+        return val if val >= 0 else 0
 
 
 AriaConfigModelType = TypeVar('AriaConfigModelType', bound=AriaConfigModel)
@@ -1,4 +1,4 @@
-from gi.repository import Gtk, Gdk
+from gi.repository import GLib, Gtk, Gdk
 from gi.repository import Gtk4LayerShell as GtkLayerShell
 
 from aria_shell.utils import CleanupHelper
@@ -95,23 +95,75 @@ class AriaWindow(CleanupHelper, Gtk.Window):
             self.safe_connect(ec, 'key-pressed', self._key_pressed)
             self.add_controller(ec)
 
+        # (frame_clock, handler_id, opacity, keyboard_mode) while prewarming
+        self._prewarm_state = None
+
     def show(self):
         """Show the window."""
+        self._end_prewarm()
+        super().show()
+
+    def prewarm(self):
+        """Render the window once, invisible, to make the first show() faster.
+
+        The window is mapped fully transparent and without keyboard focus,
+        and hidden again as soon as the first frame has been painted. This
+        way the surface, the widgets and the icons are all ready to be used.
+        """
+        if self.is_visible() or self.is_prewarming():
+            return
+        opacity = self.get_opacity()
+        keyboard_mode = GtkLayerShell.get_keyboard_mode(self)
+        self.set_opacity(0)
+        GtkLayerShell.set_keyboard_mode(self, GtkLayerShell.KeyboardMode.NONE)
         super().show()
 
+        clock = self.get_frame_clock()
+        handler = clock.connect('after-paint', self._on_prewarm_painted)
+        self._prewarm_state = (clock, handler, opacity, keyboard_mode)
+
     def hide(self):
         """Hide the window."""
+        self._end_prewarm()
         super().hide()
 
     def toggle(self):
         """Toggle window visibility."""
-        self.hide() if self.is_visible() else self.show()
+        self.hide() if self.is_shown() else self.show()
+
+    def is_prewarming(self) -> bool:
+        """True while mapped (but invisible) by prewarm()."""
+        return self._prewarm_state is not None
+
+    def is_shown(self) -> bool:
+        """True if the window is visible to the user, not just prewarming."""
+        return self.is_visible() and not self.is_prewarming()
 
     def shutdown(self):
         """Destroy the window."""
+        self._end_prewarm()
         CleanupHelper.shutdown(self)
         Gtk.Window.destroy(self)
 
+    def _on_prewarm_painted(self, _clock: Gdk.FrameClock):
+        # do not hide while painting, wait the frame to be completed
+        GLib.idle_add(self._prewarm_done)
+
+    def _prewarm_done(self) -> bool:
+        if self._prewarm_state:
+            self._end_prewarm()
+            super().hide()
+        return False  # one-shot idle
+
+    def _end_prewarm(self):
+        """Restore the window state changed by prewarm()."""
+        if self._prewarm_state:
+            clock, handler, opacity, keyboard_mode = self._prewarm_state
+            self._prewarm_state = None
+            clock.disconnect(handler)
+            self.set_opacity(opacity)
+            GtkLayerShell.set_keyboard_mode(self, keyboard_mode)
+
     def _key_pressed(self, _ec: Gtk.EventControllerKey, keyval: int,
                      _keycode: int, _state: Gdk.ModifierType):
         if keyval == Gdk.KEY_Escape:
@@ -22,6 +22,7 @@ from aria_shell.gui import AriaPopover
 from aria_shell.utils import IndexedListStore, CleanupHelper
 from aria_shell.utils.logger import get_loggers
 from aria_shell.services.dbus_menu import CanonicalDBusMenu
+from aria_shell.services.icon_cache import IconCacheService
 
 
 DBG, INF, WRN, ERR, CRI = get_loggers(__name__)
@@ -95,7 +96,8 @@ class TrayIcon(CleanupHelper, Gtk.Overlay):
         self.add_controller(ec)
 
         # bind properties from the sni object
-        self.safe_bind(sni, 'icon_name', self.image, 'icon_name')
+        self.safe_connect(sni, 'notify::icon-name', self._on_icon_name_changed)
+        self._on_icon_name_changed(sni)
         self.safe_bind(sni, 'tooltip', self, 'tooltip_markup')
 
     def do_unmap(self):
@@ -110,6 +112,9 @@ class TrayIcon(CleanupHelper, Gtk.Overlay):
         CleanupHelper.shutdown(self)
         Gtk.Overlay.do_unmap(self)
 
+    def _on_icon_name_changed(self, sni: StatusNotifierItem, *_):
+        IconCacheService().set_image(self.image, sni.icon_name)
+
     def _on_scroll(self, _ec: Gtk.EventControllerScroll, dx: float, dy: float):
         if self.sni:
             if dy != 0:
@@ -5,6 +5,7 @@ from aria_shell.gui import AriaBox
 from aria_shell.utils import CleanupHelper
 from aria_shell.services.wm import WindowManagerService, Workspace, Window
 from aria_shell.services.xdg import XDGDesktopService
+from aria_shell.services.icon_cache import IconCacheService
 from aria_shell.utils.logger import get_loggers
 from aria_shell.module import AriaModule, GadgetRunContext
 from aria_shell.config import AriaConfigModel
@@ -102,7 +103,7 @@ class WindowView(CleanupHelper, Gtk.Image):
         self.add_css_class('aria-workspace-window')
 
         icon = XDGDesktopService().get_icon_name_for_window_class(window.name)
-        self.set_from_icon_name(icon)
+        IconCacheService().set_image(self, icon)
 
         # window tooltip
         self.safe_bind(
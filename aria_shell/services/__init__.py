@@ -4,6 +4,7 @@ from .audio import AudioService
 from .commands import CommandsService
 from .display import DisplayService
 from .hyprland import HyprlandService
+from .icon_cache import IconCacheService
 from .notifications import NotificationService
 from .pam import PamService
 from .sway import SwayService
@@ -21,6 +21,10 @@ class AriaService(ABC, metaclass=Singleton):
     def shutdown(self):
         """Called on aria shutdown (NOT on restart)."""
 
+    def stats(self) -> dict:
+        """Runtime statistics of the service, for the 'stats' aria command."""
+        return {}
+
     def __repr__(self):
         return f'<{type(self).__name__}>'
 
@@ -27,7 +27,8 @@ from enum import StrEnum
 from gi.repository import Gio, GObject
 
 from aria_shell.services import AriaService
-from aria_shell.utils import Singleton, IndexedListStore
+from aria_shell.services.commands import publish
+from aria_shell.utils import Singleton, IndexedListStore, Coalescer
 from aria_shell.utils.logger import get_loggers
 
 
@@ -138,6 +139,9 @@ class AudioService(AriaService, metaclass=Singleton):
         # MediaPlayer list store (with index for faster access by pid)
         self._players = IndexedListStore(item_type=MediaPlayer, key_prop='pid')
 
+        # volume events for the commands socket, one per channel per frame
+        self._events = Coalescer()
+
         # try to load the pipewire backend
         try:
             from .audio_pipewire import PipeWireBackend
@@ -156,6 +160,7 @@ class AudioService(AriaService, metaclass=Singleton):
         if self._cancellable:
             self._cancellable.cancel()
             self._cancellable = None
+        self._events.cancel()
         if self._channels:
             self._channels.remove_all()
             self._channels = None
@@ -184,10 +189,15 @@ class AudioService(AriaService, metaclass=Singleton):
     def channel_added(self, cha: AudioChannel):
         DBG(f'AAS: Channel added {cha}')
         self._channels.insert_sorted(cha, channel_sort)
+        cha.connect('notify::volume', self._on_channel_changed)
+        cha.connect('notify::muted', self._on_channel_changed)
 
     def channel_removed(self, cha_id: str):
         DBG(f'AAS: Channel removed {cha_id}')
-        self._channels.remove_key(cha_id)
+        if cha := self._channels.get(cha_id):
+            cha.disconnect_by_func(self._on_channel_changed)
+            self._events.discard(cha.cid)
+            self._channels.remove_key(cha_id)
 
     def player_added(self, player: MediaPlayer):
         DBG(f'AAS: Player added {player}')
@@ -196,3 +206,18 @@ class AudioService(AriaService, metaclass=Singleton):
     def player_removed(self, pid: str):
         DBG(f'AAS: Player removed id={pid}')
         self._players.remove_key(pid)
+
+    #
+    # internals
+    def _on_channel_changed(self, cha: AudioChannel, _pspec):
+        self._events.schedule(cha.cid, self._publish_channel, cha)
+
+    @staticmethod
+    def _publish_channel(cha: AudioChannel):
+        publish('audio', {
+            'cid': str(cha.cid),
+            'name': cha.name,
+            'group': cha.group,
+            'volume': round(cha.volume, 3),
+            'muted': cha.muted,
+        })
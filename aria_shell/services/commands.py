@@ -17,13 +17,62 @@ def the_pippo_command(cmd: str, params: list[str]) -> str | None
     # or return a message on success, return None is still a success.
     return 'An optional (success) response string'
 
+Slow runners must not block the main loop, they can:
+- be registered with threaded=True, to run in the commands worker pool
+- return a concurrent.futures.Future, the reply is sent when it is done
+- be coroutines (async def), they are run in the worker pool with asyncio
+
+Runners that are not executed on the main loop must not touch GTK. The
+size of the worker pool and the commands timeout (after that the command
+fails) are read from the [general] config section.
+
+Python threads cannot be killed: a runner still running at the timeout
+keeps its worker thread until it returns. The worker pool is then left to
+it and a new one is used for the next commands, so hung runners do not
+starve the others. Their threads are still joined when the shell exits.
+
+Protocol:
+Clients send one command per line on the ARIA_RUNTIME_DIR/cmd.sock socket,
+in plain text or as a JSON object, and get a reply line in the same form:
+
+> launcher toggle
+< OK
+> {"v": 1, "id": 7, "cmd": "launcher", "params": ["toggle"]}
+< {"v": 1, "id": 7, "ok": true, "result": null}
+
+JSON requests can be pipelined on the same connection, the id (any JSON
+value) is copied in the reply to match it with its request, as replies
+are sent when each command completes (not in the requests order).
+"params" is optional, without it the params are split from "cmd" at
+spaces. Failed commands reply with "ok": false and an "error" message.
+Plain text replies are always sent in the same order of the commands.
+
+Events:
+The 'subscribe [topic ...]' command keeps the connection open and streams
+the events of the given topics (all if none given), as JSON lines:
+
+> subscribe workspace audio
+< OK
+< {"v": 1, "event": "workspace", "data": {"id": "2", "name": "2", ...}}
+
+Services send the events with publish(). Clients that do not read the
+events fast enough are disconnected, instead of buffering forever.
+
 """
-from collections.abc import Callable
+import asyncio
+import inspect
+import json
+import time
+from collections import deque
+from collections.abc import Callable, Awaitable
+from concurrent.futures import Future, ThreadPoolExecutor, CancelledError
+from dataclasses import dataclass
 
 from gi.repository import Gio, GLib
 
+from aria_shell.config import AriaConfig
 from aria_shell.services import AriaService
-from aria_shell.utils import Singleton
+from aria_shell.utils import Singleton, Timer
 from aria_shell.utils.env import ARIA_RUNTIME_DIR
 from aria_shell.utils.logger import get_loggers
 
@@ -31,14 +80,24 @@ from aria_shell.utils.logger import get_loggers
 DBG, INF, WRN, ERR, CRI = get_loggers(__name__)
 
 
+# version of the JSON protocol of the commands socket
+PROTOCOL_VERSION = 1
+
+# topics of the events that clients can subscribe
+TOPICS = ('workspace', 'audio', 'notification')
+
+# max bytes of events queued for a client, slower clients are disconnected
+MAX_CLIENT_BUFFER = 256 * 1024
+
 
 class CommandFailed(Exception):
     """Exception to raise from command runners to notify a failure."""
     pass
 
 
-CommandRunner = Callable[[str, list[str]], str|None]
+CommandRunner = Callable[[str, list[str]], str | None | Future | Awaitable]
 CommandResult = tuple[bool, str]
+CommandCallback = Callable[[bool, str | None], None]
 
 
 def the_ping_command(_cmd: str, params: list[str]) -> str:
@@ -46,6 +105,23 @@ def the_ping_command(_cmd: str, params: list[str]) -> str:
     return f'pong {params}'
 
 
+def the_stats_command(_cmd: str, params: list[str]) -> str:
+    """Dump the stats of the running services, as JSON. Optionally filtered
+    by service name (fe: 'stats IconCacheService')."""
+    stats = {}
+    for service in AriaService.__subclasses__():
+        if service.has_instance() and (not params or service.__name__ in params):
+            if service_stats := service().stats():
+                stats[service.__name__] = service_stats
+    return json.dumps(stats)
+
+
+def publish(topic: str, data: dict):
+    """Stream an event to the clients subscribed to topic, if any."""
+    if CommandsService.has_instance():
+        CommandsService().publish(topic, data)
+
+
 class CommandsService(AriaService, metaclass=Singleton):
     """
     A service to manage  aria commands.
@@ -54,7 +130,16 @@ class CommandsService(AriaService, metaclass=Singleton):
         # index of registered command runners
         self._commands: dict[str, CommandRunner] = {
             'ping': the_ping_command,
+            'stats': the_stats_command,
         }
+        # commands to run in the worker pool (created on first use)
+        self._threaded: set[str] = set()
+        self._executor: ThreadPoolExecutor | None = None
+        self._workers = 0
+        # per command counters: {cmd: CommandStats}
+        self._stats: dict[str, CommandStats] = {}
+        self.in_flight = 0
+        self.hung_runners = 0  # timed out while running in the worker pool
         # listen for commands on the socket
         self._socket_listener = SocketListener()
 
@@ -62,15 +147,45 @@ class CommandsService(AriaService, metaclass=Singleton):
         if self._socket_listener:
             self._socket_listener.cancellable.cancel()
             self._socket_listener = None
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            self._workers = 0
         self._commands = {}
+        self._threaded.clear()
+
+    def stats(self) -> dict:
+        return {
+            'in_flight': self.in_flight,
+            'workers': self._workers,
+            'hung_runners': self.hung_runners,
+            'commands': {cmd: stats.as_dict() for cmd, stats in self._stats.items()},
+        }
 
-    def register(self, prefix: str, runner: CommandRunner):
-        """Register `prefix` as a command. `runner` will be called to execute the command."""
+    def register(self, prefix: str, runner: CommandRunner, threaded: bool = False):
+        """Register `prefix` as a command. `runner` will be called to execute the command.
+
+        With threaded=True the runner is called in the worker pool.
+        """
         if prefix in self._commands:
             ERR('Command <%s> already registered', prefix)
         else:
             DBG('Registering command <%s> runner: %s', prefix, runner)
             self._commands[prefix] = runner
+            if threaded:
+                self._threaded.add(prefix)
+
+    def publish(self, topic: str, data: dict):
+        """Stream an event to the clients subscribed to topic."""
+        if not self._socket_listener:
+            return
+        line = None
+        for client in list(self._socket_listener.clients):
+            if client.is_subscribed(topic):
+                if line is None:  # only encode if needed
+                    event = {'v': PROTOCOL_VERSION, 'event': topic, 'data': data}
+                    line = json.dumps(event).encode() + b'\n'
+                client.send_event(line)
 
     def unregister(self, prefix):
         """Remove a previously registered command."""
@@ -79,45 +194,201 @@ class CommandsService(AriaService, metaclass=Singleton):
         else:
             DBG('Un-registering command <%s>', prefix)
             del self._commands[prefix]
-
-    def run(self, command: str) -> CommandResult:
-        """Execute the given command, dispatching to a registered runner."""
-        DBG('Processing command: <%s>', command)
+            self._threaded.discard(prefix)
+
+    def run(self, command: str, params: list[str] | None = None) -> CommandResult:
+        """Execute the given command, dispatching to a registered runner.
+
+        If params is not given they are split from the command at spaces.
+        Commands that do not complete immediately (threaded or async) are
+        only started: (True, None) is returned and failures are logged.
+        """
+        result: CommandResult | None = None
+
+        def _done(success: bool, response: str | None):
+            nonlocal result
+            if result is None:
+                result = success, response
+            elif not success:
+                ERR('Command <%s> failed: %s', command, response)
+
+        self.run_async(command, params, _done)
+        if result is None:
+            result = True, None  # still running
+        return result
+
+    def run_async(self, command: str, params: list[str] | None,
+                  callback: CommandCallback):
+        """Execute the given command, callback(success, response) is called
+        on the main loop when it completes (immediately for sync runners).
+        """
+        DBG('Processing command: <%s> %s', command, params or '')
         if not command:
-            return False, 'Empty command!'
+            callback(False, 'Empty command!')
+            return
 
         # support the config file syntax: 'aria terminal toggle'
         if command.startswith('aria '):
             command = command[5:]
 
         # split command and params
-        params = command.strip().split(' ')
-        # TODO handle "params with spaces" ! ma non vedo le virgolette??
-        if len(params) > 1:
-            command, *params = params
-        else:
-            params = []
+        if params is None:
+            params = command.strip().split(' ')
+            # TODO handle "params with spaces" ! ma non vedo le virgolette??
+            if len(params) > 1:
+                command, *params = params
+            else:
+                params = []
 
         # find a registered runner
         runner = self._commands.get(command, None)
         if not callable(runner):
-            return False, f'Unknown command <{command}>'
+            callback(False, f'Unknown command <{command}>')
+            return
 
-        # let the runner execute the command
+        execution = CommandExecution(self, command, callback)
+
+        # run in the worker pool
+        if command in self._threaded:
+            execution.wait_future(self._submit(runner, command, params),
+                                  self._executor)
+            return
+
+        # or let the runner execute the command now
         try:
             response = runner(command, params)
-            return True, response
-        except CommandFailed as e:
-            return False, str(e)
         except Exception as e:
-            ERR('Error running command <%s>. %s: %s', command,
-                type(e).__name__, e, exc_info=True)
-            return False, str(e)
+            execution.done(*_failure(command, e))
+            return
+
+        if inspect.iscoroutine(response):
+            execution.wait_future(self._submit(asyncio.run, response),
+                                  self._executor)
+        elif isinstance(response, Future):
+            execution.wait_future(response)
+        else:
+            execution.done(True, response)
+
+    def _submit(self, func: Callable, *args) -> Future:
+        if self._executor is None:
+            self._workers = AriaConfig().general.command_workers
+            DBG('Starting the commands worker pool with %d workers', self._workers)
+            self._executor = ThreadPoolExecutor(max_workers=self._workers,
+                                                thread_name_prefix='aria-commands')
+        return self._executor.submit(func, *args)
+
+    def _abandon_executor(self, executor: ThreadPoolExecutor):
+        """Leave the worker pool to a hung runner, the next commands will
+        start a new one. The queued commands still run in the old pool."""
+        self.hung_runners += 1
+        if executor is self._executor:
+            executor.shutdown(wait=False)
+            self._executor = None
+
+
+def _failure(command: str, e: BaseException) -> CommandResult:
+    """The result of a failed runner, unexpected errors are also logged."""
+    if isinstance(e, CommandFailed):
+        return False, str(e)
+    ERR('Error running command <%s>. %s: %s', command,
+        type(e).__name__, e, exc_info=e)
+    return False, str(e) or type(e).__name__
+
+
+@dataclass(slots=True)
+class CommandStats:
+    """Counters and latency of a command."""
+    runs: int = 0
+    failures: int = 0
+    timeouts: int = 0
+    total_time: float = 0.0
+    max_time: float = 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            'runs': self.runs,
+            'failures': self.failures,
+            'timeouts': self.timeouts,
+            'avg_ms': round(self.total_time / self.runs * 1000, 3) if self.runs else 0,
+            'max_ms': round(self.max_time * 1000, 3),
+        }
+
+
+class CommandExecution:
+    """
+    A running command, that report the result (only once) to the callback.
+
+    Results of futures are moved back to the main loop, and the command
+    fails if it does not complete in the configured timeout.
+    """
+    def __init__(self, service: CommandsService, command: str,
+                 callback: CommandCallback):
+        self.service = service
+        self.command = command
+        self.callback = callback
+        self.start_time = time.perf_counter()
+        self.future: Future | None = None
+        self.executor: ThreadPoolExecutor | None = None  # running the future
+        self.timer: Timer | None = None
+        self.finished = False
+        service.in_flight += 1
+
+    def wait_future(self, future: Future,
+                    executor: ThreadPoolExecutor | None = None):
+        self.future = future
+        self.executor = executor
+        if timeout := AriaConfig().general.command_timeout:
+            self.timer = Timer(timeout, self._on_timeout)
+        # NOTE: done callbacks are called in the worker thread
+        future.add_done_callback(lambda f: GLib.idle_add(self._on_future_done, f))
+
+    def done(self, success: bool, response: str | None, timed_out=False):
+        if self.finished:
+            return
+        self.finished = True
+        if self.timer:
+            self.timer.stop()
+            self.timer = None
+        elapsed = time.perf_counter() - self.start_time
+        stats = self.service._stats.setdefault(self.command, CommandStats())
+        stats.runs += 1
+        stats.total_time += elapsed
+        stats.max_time = max(stats.max_time, elapsed)
+        if not success:
+            stats.failures += 1
+        if timed_out:
+            stats.timeouts += 1
+        self.service.in_flight -= 1
+        self.callback(success, response)
+
+    def _on_future_done(self, future: Future) -> bool:
+        try:
+            response = future.result()
+        except CancelledError:
+            self.done(False, 'Command cancelled')
+        except Exception as e:
+            self.done(*_failure(self.command, e))
+        else:
+            self.done(True, response)
+        return False  # one-shot idle
+
+    def _on_timeout(self) -> bool:
+        self.timer = None
+        timeout = AriaConfig().general.command_timeout
+        WRN('Command <%s> timed out after %s seconds', self.command, timeout)
+        # only works if not yet started, a running one cannot be stopped
+        if self.future and not self.future.cancel() and self.executor:
+            WRN('Command <%s> is still running, using a new worker pool',
+                self.command)
+            self.service._abandon_executor(self.executor)
+        self.done(False, f'Command <{self.command}> timed out', timed_out=True)
+        return False  # one-shot timer
 
 
 class SocketListener(metaclass=Singleton):
     def __init__(self):
         self.cancellable = Gio.Cancellable()
+        self.clients: set[ClientConnection] = set()
         socket_path = ARIA_RUNTIME_DIR / 'cmd.sock'
         socket_path.unlink(missing_ok=True)
 
@@ -131,52 +402,197 @@ class SocketListener(metaclass=Singleton):
     def on_new_connection(self, _service: Gio.SocketService, connection: Gio.SocketConnection, *_):
         DBG('Client connected to socket')
         try:
-            input_stream = Gio.DataInputStream.new(connection.get_input_stream())
-            output_stream = connection.get_output_stream()
-            self.read_data_async(input_stream, output_stream, connection)
+            client = ClientConnection(self, connection)
         except Exception as e:
             ERR(f'Error accepting socket connection: {e}')
             connection.close()
+        else:
+            self.clients.add(client)
 
-    def read_data_async(self,
-                        input_stream: Gio.DataInputStream,
-                        output_stream: Gio.OutputStream,
-                        connection: Gio.SocketConnection,
-                        ):
-        """Asynchronous wait-command -> send-response loop."""
-
-        def on_write_ready(stream: Gio.OutputStream, task: Gio.Task):
-            try:
-                stream.write_bytes_finish(task)
-            except Exception as e:
-                ERR(f'Error writing on socket: {e}')
-                connection.close()
-
-        def on_line_ready(stream: Gio.DataInputStream, result: Gio.Task):
-            try:
-                if received := stream.read_line_finish(result)[0]:
-                    # process received data (execute the aria command)
-                    success, response = CommandsService().run(received.decode())
-                    full_reply = f'{'OK' if success else 'ERR'} {response or ''}'
-                    # send response
-                    output_stream.write_bytes_async(
-                        GLib.Bytes.new(full_reply.strip().encode() + b'\n'),
-                        GLib.PRIORITY_DEFAULT,
-                        None,
-                        on_write_ready,
-                    )
-                    # listen for the next line
-                    stream.read_line_async(
-                        GLib.PRIORITY_DEFAULT, self.cancellable, on_line_ready
-                    )
-                else:
-                    DBG('Client closed connection')
-                    connection.close()
-            except Exception as e:
-                ERR(f'Error reading from socket: {e}', exc_info=True)
-                connection.close()
-
-        # start listening for the first line
-        input_stream.read_line_async(
-            GLib.PRIORITY_DEFAULT, self.cancellable, on_line_ready
+
+class ClientConnection:
+    """
+    A client of the commands socket.
+
+    Lines are read one after the other and the replies are queued, so a
+    new write never starts while the previous one is still pending.
+    JSON replies are queued as soon as their command completes, plain
+    text ones wait for the replies of the previous plain commands.
+    The subscribe/unsubscribe commands are handled here, as they act on
+    the connection itself.
+    """
+    def __init__(self, listener: SocketListener, connection: Gio.SocketConnection):
+        self.listener = listener
+        self.connection = connection
+        self.input_stream = Gio.DataInputStream.new(connection.get_input_stream())
+        self.output_stream = connection.get_output_stream()
+        self._write_queue: deque[bytes] = deque()
+        self._queued_bytes = 0
+        self._topics: set[str] = set()  # subscribed events
+        self._plain_replies: deque[list[bytes | None]] = deque()  # in order
+        self._in_flight = 0  # commands still running
+        self._closing = False  # close when all the replies are sent
+        self._closed = False
+        self._read_next()
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self._write_queue.clear()
+            self._topics.clear()
+            self.connection.close()
+            self.listener.clients.discard(self)
+
+    def close_when_done(self):
+        """Close the connection after all the replies are sent."""
+        if self._write_queue or self._in_flight:
+            self._closing = True
+        else:
+            self.close()
+
+    def send(self, data: bytes):
+        """Queue a line to send to the client."""
+        if not self._closed:
+            self._write_queue.append(data)
+            self._queued_bytes += len(data)
+            if len(self._write_queue) == 1:
+                self._write_next()
+
+    def send_event(self, data: bytes):
+        """Queue an event line, dropping the client if it is too slow."""
+        if self._queued_bytes + len(data) > MAX_CLIENT_BUFFER:
+            WRN('Dropping slow commands socket client, %d bytes queued',
+                self._queued_bytes)
+            self.close()
+        else:
+            self.send(data)
+
+    def is_subscribed(self, topic: str) -> bool:
+        return topic in self._topics
+
+    def _subscribe(self, params: list[str]) -> CommandResult:
+        if unknown := [topic for topic in params if topic not in TOPICS]:
+            return False, f'Unknown topics {unknown}, available: {TOPICS}'
+        self._topics.update(params or TOPICS)
+        return True, None
+
+    def _unsubscribe(self, params: list[str]) -> CommandResult:
+        self._topics.difference_update(params or TOPICS)
+        return True, None
+
+    def _write_next(self):
+        self.output_stream.write_bytes_async(
+            GLib.Bytes.new(self._write_queue[0]),
+            GLib.PRIORITY_DEFAULT,
+            self.listener.cancellable,
+            self._on_write_ready,
+        )
+
+    def _on_write_ready(self, stream: Gio.OutputStream, task: Gio.Task):
+        try:
+            written = stream.write_bytes_finish(task)
+        except Exception as e:
+            ERR(f'Error writing on socket: {e}')
+            self.close()
+            return
+        if self._closed:
+            return
+        data = self._write_queue[0]
+        self._queued_bytes -= written
+        if written < len(data):
+            self._write_queue[0] = data[written:]  # partial write
+        else:
+            self._write_queue.popleft()
+        if self._write_queue:
+            self._write_next()
+        elif self._closing:
+            self.close_when_done()
+
+    def _read_next(self):
+        self.input_stream.read_line_async(
+            GLib.PRIORITY_DEFAULT, self.listener.cancellable, self._on_line_ready
         )
+
+    def _on_line_ready(self, stream: Gio.DataInputStream, result: Gio.Task):
+        try:
+            if received := stream.read_line_finish(result)[0]:
+                # process received data (execute the aria command)
+                if received.startswith(b'{'):
+                    self._run_json(received)
+                else:
+                    self._run_plain(received)
+                # listen for the next line
+                self._read_next()
+            else:
+                DBG('Client closed connection')
+                self.close_when_done()
+        except Exception as e:
+            ERR(f'Error reading from socket: {e}', exc_info=True)
+            self.close()
+
+    def _run(self, command: str, params: list[str] | None,
+             callback: CommandCallback):
+        """Run the command, handling the ones about this connection."""
+        def _done(success: bool, response: str | None):
+            self._in_flight -= 1
+            callback(success, response)
+            if self._closing:
+                self.close_when_done()
+
+        self._in_flight += 1
+        name, _, rest = command.strip().partition(' ')
+        if name in ('subscribe', 'unsubscribe'):
+            if params is None:
+                params = rest.split()
+            if name == 'subscribe':
+                _done(*self._subscribe(params))
+            else:
+                _done(*self._unsubscribe(params))
+        else:
+            CommandsService().run_async(command, params, _done)
+
+    def _run_plain(self, line: bytes):
+        slot: list[bytes | None] = [None]
+        self._plain_replies.append(slot)
+
+        def _done(success: bool, response: str | None):
+            full_reply = f'{'OK' if success else 'ERR'} {response or ''}'
+            slot[0] = full_reply.strip().encode() + b'\n'
+            # send all the completed replies, in order
+            while self._plain_replies and self._plain_replies[0][0] is not None:
+                self.send(self._plain_replies.popleft()[0])
+
+        self._run(line.decode(), None, _done)
+
+    def _run_json(self, line: bytes):
+        request_id = None
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError('the request must be an object')
+            request_id = request.get('id')
+            version = request.get('v', PROTOCOL_VERSION)
+            if version != PROTOCOL_VERSION:
+                raise ValueError(f'unsupported protocol version {version}')
+            command = request.get('cmd')
+            params = request.get('params')
+            if not isinstance(command, str):
+                raise ValueError('cmd must be a string')
+            if params is not None and (not isinstance(params, list) or
+                                       not all(isinstance(p, str) for p in params)):
+                raise ValueError('params must be a list of strings')
+        except ValueError as e:
+            self.send(self._json_reply(request_id, False, f'Invalid request: {e}'))
+        else:
+            self._run(command, params, lambda success, response: self.send(
+                self._json_reply(request_id, success, response)
+            ))
+
+    @staticmethod
+    def _json_reply(request_id, success: bool, response: str | None) -> bytes:
+        reply = {'v': PROTOCOL_VERSION, 'id': request_id, 'ok': success}
+        if success:
+            reply['result'] = response
+        else:
+            reply['error'] = response
+        return json.dumps(reply).encode() + b'\n'
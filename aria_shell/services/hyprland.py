@@ -1,12 +1,13 @@
 import json
 import os
+from collections import deque
 from collections.abc import Callable
 from pathlib import Path
 from typing import NamedTuple
 
 from aria_shell.services import AriaService
 from aria_shell.utils import Singleton
-from aria_shell.utils.socket import SocketClient
+from aria_shell.utils.socket import SocketClient, split_view
 from aria_shell.utils.logger import get_loggers
 from aria_shell.utils.env import XDG_RUNTIME_DIR
 
@@ -16,6 +17,19 @@ DBG, INF, WRN, ERR, CRI = get_loggers(__name__)
 
 CommandCallback = Callable[[str|list|dict], None]
 
+# max number of queued commands to pack in a single [[BATCH]] request
+BATCH_MAX = 32
+
+# hyprland separates the replies of the batched commands with this
+BATCH_SEPARATOR = b'\n\n\n'
+
+# max number of requests sent without waiting for the previous replies,
+# must be 1: parallel requests would complete (and reply) in any order
+CMD_MAX_IN_FLIGHT = 1
+
+# seconds to wait for the reply of a request
+CMD_TIMEOUT = 5
+
 
 class HyprCommand(NamedTuple):
     command: str
@@ -23,11 +37,26 @@ class HyprCommand(NamedTuple):
 
 
 class HyprlandService(AriaService, metaclass=Singleton):
-    """ Implementation of the hyprland IPC sockets """
+    """ Implementation of the hyprland IPC sockets
+
+    Hyprland serve a single request for each connection, and the requests
+    are sent one at a time: the callbacks must be called in the commands
+    order (fe: the active window after the clients list). The commands
+    queued while a request is waiting for its reply are packed in a single
+    [[BATCH]] request, and the reply is split back to each command
+    callback. Set batch_max to 1 to disable batching.
+
+    NOTE: no pool of ready connections is used, hyprland blocks waiting
+    for the request as soon as it accepts a connection.
+    """
+    batch_max = BATCH_MAX
 
     def __init__(self):
         """ raise RuntimeError if hyprland is not available """
-        self._commands_queue: list[HyprCommand] = []
+        self._commands_queue: deque[HyprCommand] = deque()
+        self.commands_sent = 0
+        self.commands_merged = 0
+        self.requests_sent = 0
 
         # get hyprland current instance signature
         hypr_sig = os.getenv('HYPRLAND_INSTANCE_SIGNATURE')
@@ -45,7 +74,9 @@ class HyprlandService(AriaService, metaclass=Singleton):
         self._cmd_socket_path = hypr_dir / '.socket.sock'
         if not self._cmd_socket_path.is_socket():
             raise RuntimeError(f'Cannot find hyprland socket {self._cmd_socket_path}')
-        self._cmd_socket = SocketClient(self._cmd_socket_path)
+        self._cmd_socket = SocketClient(self._cmd_socket_path, oneshot=True,
+                                        max_in_flight=CMD_MAX_IN_FLIGHT,
+                                        timeout=CMD_TIMEOUT, zero_copy=True)
 
         # create the event socket
         self._evt_socket_path = hypr_dir / '.socket2.sock'
@@ -54,7 +85,7 @@ class HyprlandService(AriaService, metaclass=Singleton):
         self._evt_socket = SocketClient(self._evt_socket_path, line_buffered=True)
 
     def shutdown(self):
-        self._commands_queue = []
+        self._commands_queue.clear()
         if self._cmd_socket:
             self._cmd_socket.disconnect()
             self._cmd_socket = None
@@ -62,51 +93,106 @@ class HyprlandService(AriaService, metaclass=Singleton):
             self._evt_socket.disconnect()
             self._evt_socket = None
 
+    def stats(self) -> dict:
+        return {
+            'commands_sent': self.commands_sent,
+            'commands_merged': self.commands_merged,
+            'requests_sent': self.requests_sent,
+            'commands_queued': len(self._commands_queue),
+            'socket': self._cmd_socket.stats() if self._cmd_socket else {},
+            'events_socket': self._evt_socket.stats() if self._evt_socket else {},
+        }
+
     def send_command(self, command: str, callback: CommandCallback = None):
         cmd = HyprCommand(command, callback)
+        # queries (j/...) have no side effects, an identical one still in
+        # the queue will already give the fresh data to the same callback
+        if command.startswith('j/') and cmd in self._commands_queue:
+            DBG('Merged duplicated hyprland command: %s', command)
+            self.commands_merged += 1
+            return
         self._commands_queue.append(cmd)
         self._process_queue()
 
     def _process_queue(self):
-        if self._commands_queue and not self._cmd_socket.busy:
-            cmd = self._commands_queue.pop(0)
-            self._send_command(cmd)
-
-    def _send_command(self, cmd: HyprCommand):
-        DBG('Sending hyprland command: %s', cmd.command)
-
-        def _receive_cb(raw_data):
-            # NOTE: The hyprland socket MUST be closed after each request,
-            # otherwise hypr will block ..."luckily" our socket abstraction
-            # auto-reconnect on next operation.
-            self._cmd_socket.disconnect()
-
-            # pass decoded data to the user callback
-            if callable(cmd.callback) and raw_data:
-                try:
-                    if cmd.command.startswith('j/'):
-                        data = json.loads(raw_data)
-                    else:
-                        data = raw_data.decode()
-                except Exception as e:
-                    ERR('Cannot decode response! Error: %s', e)
-                else:
-                    cmd.callback(data)
+        queue = self._commands_queue
+        socket = self._cmd_socket
+        while queue and socket and socket.pending < socket.max_in_flight:
+            # take the first commands that can be batched (no ; inside)
+            count = 1
+            while (count < min(self.batch_max, len(queue))
+                   and ';' not in queue[0].command
+                   and ';' not in queue[count].command):
+                count += 1
+            cmds = [queue.popleft() for _ in range(count)]
+            self.commands_sent += count
+            self.requests_sent += 1
+            self._send_commands(cmds)
+
+    def _send_commands(self, cmds: list[HyprCommand]):
+        if len(cmds) == 1:
+            request = cmds[0].command
+        else:
+            request = '[[BATCH]]' + ';'.join(cmd.command for cmd in cmds)
+        DBG('Sending hyprland command: %s', request)
+
+        def _reply_cb(raw_data: memoryview | None):
+            # raw_data is a view of the socket buffer, only valid in here
+            if len(cmds) == 1:
+                self._dispatch_reply(cmds[0], raw_data)
+            else:
+                replies = split_view(raw_data, BATCH_SEPARATOR) if raw_data else []
+                # the last command reply is followed by a separator too
+                if (len(replies) == len(cmds) + 1
+                        and not bytes(replies[-1]).strip()):
+                    replies.pop()
+                if len(replies) != len(cmds):
+                    ERR('Invalid batch reply, %d replies for %d commands',
+                        len(replies), len(cmds))
+                    replies = [None] * len(cmds)
+                for cmd, reply in zip(cmds, replies):
+                    self._dispatch_reply(cmd, reply)
 
             # process next request in queue
             self._process_queue()
 
-        self._cmd_socket.send_and_receive(cmd.command, _receive_cb)
+        self._cmd_socket.request(request, _reply_cb)
+
+    @staticmethod
+    def _dispatch_reply(cmd: HyprCommand, raw_data: memoryview | None):
+        """Pass the decoded reply to the command callback."""
+        if callable(cmd.callback) and raw_data:
+            try:
+                # decode straight from the view, without a bytes copy
+                data = str(raw_data, 'utf-8')
+                if cmd.command.startswith('j/'):
+                    data = json.loads(data)
+            except Exception as e:
+                ERR('Cannot decode response! Error: %s', e)
+            else:
+                cmd.callback(data)
+
+    def watch_events(self, callback: Callable,
+                     on_reconnect: Callable[[], None] | None = None):
+        """Call callback(event, data) for each hyprland event.
 
-    def watch_events(self, callback: Callable):
+        The events socket is reconnected if lost, on_reconnect is then
+        called to fetch again the state that could have been missed.
+        """
         def _monitor_cb(data: bytes|None):
-            if data and b'>>' in data:
+            if data is None:
+                WRN('Lost the hyprland events socket')
+            elif b'>>' in data:
                 event, event_data = data.decode().split('>>', 1)
                 DBG('Received hyprland event: %s "%s"', event, event_data)
                 callback(event, event_data)
             else:
                 WRN('Invalid event from hyprland: "%s"', data)
 
-        self._evt_socket.monitor(_monitor_cb)
+        def _reconnected():
+            if callable(on_reconnect):
+                on_reconnect()
+
+        self._evt_socket.monitor(_monitor_cb, _reconnected)
 
     # TODO: unwatch, or class shutdown?
\ No newline at end of file
@@ -0,0 +1,196 @@
+"""
+
+A shared cache of icon paintables, looked up from the XDG icon theme.
+
+Icons are cached by (icon_name, size, scale), the least recently used
+ones are dropped when the cache is full. Icons not yet in the cache are
+looked up in a worker thread, so a bunch of new icons (fe: scrolling
+the launcher list) does not stall the main loop.
+
+Images filled with set_image() are looked up again when their scale
+factor change, fe: when realized on a HiDPI monitor.
+
+Usage:
+> IconCacheService().set_image(image, 'firefox', 48)
+
+"""
+from collections import OrderedDict
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from weakref import WeakSet
+
+from gi.repository import GLib, Gdk, Gtk
+
+from aria_shell.services import AriaService
+from aria_shell.utils import Singleton
+from aria_shell.utils.logger import get_loggers
+
+
+DBG, INF, WRN, ERR, CRI = get_loggers(__name__)
+
+
+# max number of paintables to keep in the cache
+ICON_CACHE_SIZE = 512
+
+# size used for images without a pixel_size, images scale icons to fit
+DEFAULT_ICON_SIZE = 32
+
+# attribute of the images filled by set_image(): (icon_name, size, handler).
+# Kept on the widget, as python attributes make PyGObject return the same
+# wrapper for the widget (fe: from get_first_child()) as long as it lives
+IMAGE_ICON_ATTR = '_aria_icon'
+
+
+IconKey = tuple[str, int, int]  # (icon_name, size, scale)
+IconCallback = Callable[[Gtk.IconPaintable], None]
+
+
+class IconCacheService(AriaService, metaclass=Singleton):
+    """
+    A size keyed LRU cache of icon paintables.
+    """
+    def __init__(self):
+        self.icon_theme = Gtk.IconTheme.get_for_display(Gdk.Display.get_default())
+        self._theme_handler = self.icon_theme.connect(
+            'changed', self._on_icon_theme_changed
+        )
+        self._cache: OrderedDict[IconKey, Gtk.IconPaintable] = OrderedDict()
+        self._pending: dict[IconKey, list[IconCallback]] = {}
+        # images filled with set_image(), to disconnect them on shutdown
+        self._images: WeakSet[Gtk.Image] = WeakSet()
+        self._executor = ThreadPoolExecutor(max_workers=1,
+                                            thread_name_prefix='aria-icons')
+        # counters
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self.icon_theme.disconnect(self._theme_handler)
+        self.icon_theme = None
+        self._cache.clear()
+        self._pending.clear()
+        for image in list(self._images):
+            image.disconnect(getattr(image, IMAGE_ICON_ATTR)[2])
+            delattr(image, IMAGE_ICON_ATTR)
+        self._images.clear()
+
+    def stats(self) -> dict:
+        return {
+            'size': len(self._cache),
+            'max_size': ICON_CACHE_SIZE,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
+
+    def lookup(self, icon_name: str, size: int, scale: int = 1) -> Gtk.IconPaintable:
+        """Get an icon paintable, blocking on cache misses."""
+        key = (icon_name, size, scale)
+        if paintable := self._cache_get(key):
+            return paintable
+        self.misses += 1
+        paintable = self._lookup_icon(key)
+        self._cache_put(key, paintable)
+        return paintable
+
+    def lookup_async(self, icon_name: str, size: int, callback: IconCallback,
+                     scale: int = 1):
+        """Get an icon paintable, callback(paintable) is called on the main
+        loop. On cache hits the callback is called immediately."""
+        key = (icon_name, size, scale)
+        if paintable := self._cache_get(key):
+            callback(paintable)
+            return
+        self.misses += 1
+        if callbacks := self._pending.get(key):
+            callbacks.append(callback)  # already looking up the same icon
+            return
+        self._pending[key] = [callback]
+
+        def _thread_started():
+            paintable = self._lookup_icon(key)
+            GLib.idle_add(_thread_done, paintable)
+
+        def _thread_done(paintable: Gtk.IconPaintable):
+            if key in self._pending:  # not shut down in the meantime
+                self._cache_put(key, paintable)
+                for cb in self._pending.pop(key):
+                    cb(paintable)
+            return False  # one-shot idle
+
+        self._executor.submit(_thread_started)
+
+    def set_image(self, image: Gtk.Image, icon_name: str | None,
+                  size: int | None = None):
+        """Show the named icon in image, using the cache.
+
+        The image is cleared while a not cached icon is loading. If size is
+        not given the pixel_size of the image is used.
+        """
+        entry = getattr(image, IMAGE_ICON_ATTR, None)
+        if not icon_name:
+            if entry:
+                image.disconnect(entry[2])
+                delattr(image, IMAGE_ICON_ATTR)
+                self._images.discard(image)
+            image.clear()
+            return
+        if size is None:
+            size = image.get_pixel_size()
+            if size <= 0:
+                size = DEFAULT_ICON_SIZE
+
+        def _icon_ready(paintable: Gtk.IconPaintable):
+            # the image could have been reused for another icon meanwhile
+            if getattr(image, IMAGE_ICON_ATTR, ())[:2] == (icon_name, size):
+                image.set_from_paintable(paintable)
+
+        if entry:
+            handler = entry[2]
+        else:
+            # the scale is only known when realized, and can change later
+            handler = image.connect('notify::scale-factor',
+                                    self._on_image_scale_changed)
+            self._images.add(image)
+        setattr(image, IMAGE_ICON_ATTR, (icon_name, size, handler))
+        scale = image.get_scale_factor()
+        if (icon_name, size, scale) not in self._cache:
+            image.clear()
+        self.lookup_async(icon_name, size, _icon_ready, scale=scale)
+
+    def clear(self):
+        """Drop all the cached icons."""
+        self._cache.clear()
+
+    def _cache_get(self, key: IconKey) -> Gtk.IconPaintable | None:
+        paintable = self._cache.get(key)
+        if paintable is not None:
+            self._cache.move_to_end(key)
+            self.hits += 1
+        return paintable
+
+    def _cache_put(self, key: IconKey, paintable: Gtk.IconPaintable):
+        self._cache[key] = paintable
+        self._cache.move_to_end(key)
+        while len(self._cache) > ICON_CACHE_SIZE:
+            self._cache.popitem(last=False)
+            self.evictions += 1
+
+    def _lookup_icon(self, key: IconKey) -> Gtk.IconPaintable:
+        """Search the icon in the theme, GtkIconTheme is thread safe."""
+        icon_name, size, scale = key
+        return self.icon_theme.lookup_icon(
+            icon_name, None, size, scale, Gtk.TextDirection.NONE,
+            Gtk.IconLookupFlags.PRELOAD,
+        )
+
+    def _on_image_scale_changed(self, image: Gtk.Image, _pspec):
+        if entry := getattr(image, IMAGE_ICON_ATTR, None):
+            icon_name, size, _ = entry
+            self.set_image(image, icon_name, size)
+
+    def _on_icon_theme_changed(self, _theme: Gtk.IconTheme):
+        DBG('Icon theme changed, clearing the icon cache')
+        self._cache.clear()
@@ -8,11 +8,12 @@ from dasbus.server.interface import (
     returns_multiple_arguments  # noqa   (dasbus issue #139)
 )
 
-from gi.repository import GObject, Gio, GdkPixbuf
+from gi.repository import GObject, GdkPixbuf
 
 from aria_shell import __version__ as aria_version
 from aria_shell.services import AriaService
-from aria_shell.utils import Singleton, Timer
+from aria_shell.services.commands import publish
+from aria_shell.utils import Singleton, Timer, IndexedListStore
 from aria_shell.utils.logger import get_loggers
 
 
@@ -95,28 +96,43 @@ SPEC_VERSION = '1.3'
 class NotificationService(AriaService, metaclass=Singleton):
     """ Implementation of the DBUS Notification Server
 
-    The service keep an updated ListStore of Notification objects.
+    The service keep an updated ListStore of Notification objects, newest
+    first and indexed by notification id. When there are more than
+    max_notifications the oldest ones are closed (as expired).
 
     User can watch/bind the store as a list or the single properties of
     the Notifications items.
     """
     def __init__(self):
         INF('Initializing NotificationService')
-        self._store = Gio.ListStore(item_type=Notification)
+        self._store = IndexedListStore(item_type=Notification, key_type=int)
         self._default_expire = 30
+        self._max_notifications = 50
         self._connected = False
+        # counters
+        self.evicted = 0
 
     def shutdown(self):
         self.stop_server()
         self._store = None
 
+    def stats(self) -> dict:
+        return {
+            'notifications': self._store.get_n_items() if self._store is not None else 0,
+            'max_notifications': self._max_notifications,
+            'evicted': self.evicted,
+        }
+
     #---------------------------------------------------------------------------
     # Python Api
     #---------------------------------------------------------------------------
-    def start_server(self, default_expire: int = None):
+    def start_server(self, default_expire: int = None,
+                     max_notifications: int = None):
         """Publish self on the bus, and register the service name."""
         if default_expire is not None:
             self._default_expire = default_expire
+        if max_notifications is not None:
+            self._max_notifications = max_notifications
         if not self._connected:
             DBG(f'Publishing {DBUS_SERVICE} on D-Bus')
             try:
@@ -136,7 +152,7 @@ class NotificationService(AriaService, metaclass=Singleton):
             self._store.remove_all()
             self._connected = False
 
-    def get_list_model(self) -> Gio.ListStore:
+    def get_list_model(self) -> IndexedListStore[Notification, int]:
         """Get the model filled with Notification objects."""
         return self._store
 
@@ -144,24 +160,36 @@ class NotificationService(AriaService, metaclass=Singleton):
         """An action ha been selected by the user. Emit the signal on DBUS."""
         self.ActionInvoked.emit(notification.id, action.id)
 
-    def close_notification(self, notification: Notification, reason: CloseReason):
-        """Emit the NotificationClosed DBUS signal and remove Notification from the store."""
+    def close_notification(self, notification: Notification, reason: CloseReason,
+                           position: int | None = None):
+        """Emit the NotificationClosed DBUS signal and remove Notification from the store.
+
+        If the position of notification in the store is known it is removed
+        directly, without searching it.
+        """
         DBG('Close %s %s', notification, reason.name)
         # cleanup the Notification object
         notification.shutdown()
         # emit the signal on DBUS
         self.NotificationClosed.emit(notification.id, reason.value)
         # remove the item from the store
-        found, pos = self._store.find(notification)
-        if found and pos >= 0:
-            self._store.remove(pos)
-
-    def _find_notification_by_id(self, notification_id: int) -> Notification | None:
-        notification: Notification
-        for notification in self._store:
-            if notification.id == notification_id:
-                return notification
-        return None
+        if position is None:
+            self._store.remove_key(notification.id)
+        else:
+            self._store.remove(position)
+        publish('notification', {
+            'action': 'closed',
+            'id': notification.id,
+            'reason': reason.name,
+        })
+
+    def _evict_oldest(self):
+        """Close the oldest notifications, to stay in max_notifications."""
+        while (n_items := self._store.get_n_items()) > self._max_notifications:
+            oldest = self._store.get_item(n_items - 1)
+            DBG('Too many notifications, evicting %s', oldest)
+            self.evicted += 1
+            self.close_notification(oldest, CloseReason.EXPIRED, n_items - 1)
 
     #---------------------------------------------------------------------------
     # Api automatically exposed on DBUS
@@ -213,7 +241,8 @@ class NotificationService(AriaService, metaclass=Singleton):
         # create a new Notification object or reuse and existing one
         notification: Notification | None = None
         if replaces_id > 0:
-            notification = self._find_notification_by_id(replaces_id)
+            notification = self._store.get(replaces_id)
+        replaced = notification is not None
 
         if notification is None:
             notification = Notification(
@@ -223,6 +252,7 @@ class NotificationService(AriaService, metaclass=Singleton):
                 expire_in=expire_timeout,
             )
             self._store.insert(0, notification)
+            self._evict_oldest()
 
         # update reactive properties on the Notification object
         notification.summary = summary
@@ -231,14 +261,22 @@ class NotificationService(AriaService, metaclass=Singleton):
         notification.icon_data = pixbuf
         notification.urgency = urgency
 
+        publish('notification', {
+            'action': 'replaced' if replaced else 'added',
+            'id': notification.id,
+            'app_name': app_name,
+            'summary': summary,
+            'body': body,
+            'urgency': urgency,
+        })
+
         # return the notification ID
         return UInt32(notification.id)
 
     def CloseNotification(self, notification_id: UInt32):
         """A client request to close an existing notification."""
         DBG('CloseNotification(%s)', notification_id)
-        notification = self._find_notification_by_id(notification_id)
-        if notification:
+        if notification := self._store.get(notification_id):
             self.close_notification(notification, CloseReason.CLOSED)
 
     @dbus_signal
@@ -7,6 +7,7 @@ Implementation of the Sway IPC sockets.
 import json
 import os
 import enum
+import struct
 import sys
 from collections.abc import Callable
 from typing import Any, NamedTuple
@@ -23,6 +24,15 @@ DBG, INF, WRN, ERR, CRI = get_loggers(__name__)
 PAYLOAD_MAGIC_STRING = b'i3-ipc'
 EVT_OFFSET = 0x80000000
 
+# magic string, payload length and payload type, in native byte order
+HEADER = struct.Struct(f'={len(PAYLOAD_MAGIC_STRING)}sII')
+
+# max number of messages sent without waiting for the previous replies
+CMD_MAX_IN_FLIGHT = 8
+
+# seconds to wait for the reply of a message
+CMD_TIMEOUT = 5
+
 
 class MessageType(enum.Enum):
     RUN_COMMAND = 0
@@ -56,27 +66,28 @@ class SwayMessage(NamedTuple):
     data: str | dict | list | None
 
 
-class QueueItem(NamedTuple):
-    type: MessageType
-    data: str | dict | list | None
-    callback: MessageCallback
-
-
 MessageCallback = Callable[[dict|list|None], None]  # msg_cb(response: dict|list|None) -> None
 EventCallback   = Callable[[SwayMessage], None]     # event_cb(event: SwayMessage) -> None
 
 
 class SwayService(AriaService, metaclass=Singleton):
-    """ Implementation of the sway IPC sockets """
+    """ Implementation of the sway IPC sockets
+
+    Sway replies to the messages in order, so they are pipelined on the
+    command socket: up to CMD_MAX_IN_FLIGHT messages are sent without
+    waiting for the previous replies.
+    """
 
     def __init__(self):
         """Raise RuntimeError if sway is not available."""
         swaysock = os.getenv('SWAYSOCK')
         if not swaysock:
             raise RuntimeError('No SWAYSOCK found in environment')
-        self._cmd_socket = SocketClient(swaysock)
-        self._evt_socket = SocketClient(swaysock)
-        self._send_queue: list[QueueItem] = []
+        self._cmd_socket = SocketClient(swaysock, framer=SwayFramer(),
+                                        max_in_flight=CMD_MAX_IN_FLIGHT,
+                                        timeout=CMD_TIMEOUT, zero_copy=True)
+        self._evt_socket = SocketClient(swaysock, zero_copy=True)
+        self._evt_framer = SwayFramer()
 
     def shutdown(self):
         if self._cmd_socket:
@@ -85,46 +96,42 @@ class SwayService(AriaService, metaclass=Singleton):
         if self._evt_socket:
             self._evt_socket.disconnect()
             self._evt_socket = None
-        self._send_queue = []
+
+    def stats(self) -> dict:
+        return {
+            'socket': self._cmd_socket.stats() if self._cmd_socket else {},
+            'events_socket': self._evt_socket.stats() if self._evt_socket else {},
+        }
 
     def send_message(self,
                      mtype: MessageType,
                      payload: Any = '',
                      callback: MessageCallback = None):
         """Send a message to Sway, callback will be called with the response."""
-        cmd = QueueItem(mtype, payload, callback)
-        self._send_queue.append(cmd)
-        self._process_queue()
-
-    def _process_queue(self):
-        if self._send_queue and not self._cmd_socket.busy:
-            cmd = self._send_queue.pop(0)
-            self._send_message(cmd)
-
-    def _send_message(self, item: QueueItem):
-        DBG('Sway IPC send: %s %s', item.type, item.data)
-
-        def _recv_cb(data: bytes|None):
-            if not data:
-                if callable(item.callback):
-                    item.callback(None)
+        DBG('Sway IPC send: %s %s', mtype, payload)
+
+        def _reply_cb(response: SwayMessage | None):
+            if response is None:
+                data = None
+            elif response.type != mtype:
+                ERR('IPC response type %s does not match sent type %s',
+                    response.type, mtype)
                 return
+            else:
+                data = response.data
+            if callable(callback):
+                callback(data)
 
-            for response in self._deserialize(data):
-                if response.type != item.type:
-                    ERR('IPC response type %s does not match sent type %s',
-                        response.type, item.type)
-                elif callable(item.callback):
-                    item.callback(response.data)
-
-            # process next request in queue
-            self._process_queue()
+        message = self._serialize(mtype, payload)
+        self._cmd_socket.request(message, _reply_cb)
 
-        message = self._serialize(item.type, item.data)
-        self._cmd_socket.send_and_receive(message, _recv_cb)
+    def subscribe(self, events: list[str], callback: EventCallback,
+                  on_reconnect: Callable[[], None] | None = None):
+        """Subscribe to the given events, ex: window,workspace,...
 
-    def subscribe(self, events: list[str], callback: EventCallback):
-        """Subscribe to the given events, ex: window,workspace,..."""
+        The events socket is reconnected (and subscribed again) if lost,
+        on_reconnect is then called to fetch again the missed state.
+        """
 
         def _process_event(event: SwayMessage):
             if event.type == MessageType.SUBSCRIBE:
@@ -135,12 +142,21 @@ class SwayService(AriaService, metaclass=Singleton):
             else:
                 callback(event)
 
-        def _monitor_cb(b: bytes):
-            for event in self._deserialize(b):
+        def _monitor_cb(b: memoryview | None):
+            if b is None:
+                self._evt_framer.reset()
+                return
+            for event in self._evt_framer.feed(b):
                 _process_event(event)
 
+        def _reconnected():
+            self._evt_framer.reset()
+            self._evt_socket.send(message)
+            if callable(on_reconnect):
+                on_reconnect()
+
         message = self._serialize(MessageType.SUBSCRIBE, json.dumps(events))
-        self._evt_socket.monitor(_monitor_cb)
+        self._evt_socket.monitor(_monitor_cb, _reconnected)
         self._evt_socket.send(message)
 
     ## ---------------------
@@ -174,32 +190,72 @@ class SwayService(AriaService, metaclass=Singleton):
             payload
         ])
 
-    @staticmethod
-    def _deserialize(received: bytes) -> list[SwayMessage]:
-        """Return the list of SwayMessage decoded from the received bytes."""
-        magic_len = len(PAYLOAD_MAGIC_STRING)
+
+class SwayFramer:
+    """
+    Incremental decoder of the sway IPC messages received from a socket.
+
+    Received chunks are appended to a persistent buffer, the header is
+    parsed as soon as it is complete and the payload is decoded only when
+    fully received, so messages can be split across any number of reads.
+    Consumed bytes are dropped from the buffer lazily, the payloads are
+    decoded straight from a view of the buffer, without extra copies.
+    """
+    # compact the buffer when at least this many bytes have been consumed
+    COMPACT_SIZE = 64 * 1024
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._start = 0  # offset of the first not consumed byte
+        self._header: tuple[int, int] | None = None  # (length, type_id)
+
+    def __len__(self) -> int:
+        """Number of received bytes not yet consumed."""
+        return len(self._buffer) - self._start
+
+    def reset(self):
+        """Forget all the buffered data, fe: after a socket error."""
+        self._buffer.clear()
+        self._start = 0
+        self._header = None
+
+    def feed(self, data: bytes | memoryview) -> list[SwayMessage]:
+        """Add received data, return the messages completed by it."""
+        self._buffer += data
         messages = []
-        start = 0
-        while received and start < len(received):
+        while True:
+            if self._header is None:
+                if len(self) < HEADER.size:
+                    break
+                magic, length, type_id = HEADER.unpack_from(self._buffer, self._start)
+                if magic != PAYLOAD_MAGIC_STRING:
+                    # cannot find the next message anymore, start from scratch
+                    ERR('Invalid sway message header, dropping %d bytes', len(self))
+                    self.reset()
+                    break
+                self._start += HEADER.size
+                self._header = (length, type_id)
+
+            length, type_id = self._header
+            if len(self) < length:
+                break  # wait for the rest of the payload
+
+            begin = self._start
+            self._start += length
+            self._header = None
             try:
-                # check and skip the magic string
-                assert received[start:start+magic_len] == PAYLOAD_MAGIC_STRING
-                start += magic_len
-
-                # extract len, type and raw payload
-                length = int.from_bytes(received[start:start+4], byteorder=sys.byteorder)
-                type_id = int.from_bytes(received[start+4:start+8], byteorder=sys.byteorder)
-                payload = received[start+8:start+8+length]
-
-                # JSON decode the payload and store in list
-                data = json.loads(payload)
-                msg = SwayMessage(MessageType(type_id), data)
-                messages.append(msg)
-            except Exception as e:
+                with memoryview(self._buffer) as view:
+                    payload = str(view[begin:self._start], 'utf-8')
+                messages.append(SwayMessage(MessageType(type_id), json.loads(payload)))
+            except ValueError as e:
                 ERR('Cannot deserialize sway message. Error %s', e)
-                return []
 
-            # jump to next message (if available)
-            start = start + 8 + length
+        # drop the consumed bytes, only when it is cheap enough
+        if self._start == len(self._buffer):
+            self._buffer.clear()
+            self._start = 0
+        elif self._start >= self.COMPACT_SIZE:
+            del self._buffer[:self._start]
+            self._start = 0
 
         return messages
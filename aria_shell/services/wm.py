@@ -9,12 +9,13 @@ from abc import abstractmethod, ABC
 from functools import cached_property
 from typing import Any
 
-from gi.repository import Gio, GObject, Gtk
+from gi.repository import Gio, GObject
 
 from aria_shell.services import AriaService
+from aria_shell.services.commands import publish
 from aria_shell.services.hyprland import HyprlandService
 from aria_shell.services.sway import SwayService, SwayMessage, MessageType as SwayMessageType
-from aria_shell.utils import Singleton, IndexedListStore
+from aria_shell.utils import Singleton, IndexedListStore, Coalescer
 from aria_shell.utils.logger import get_loggers
 
 
@@ -40,9 +41,7 @@ class Workspace(GObject.Object):
     @cached_property
     def windows(self) -> Gio.ListModel[Window]:
         """Get the list of Windows that belong to this Workspace."""
-        filter_ = Gtk.CustomFilter.new(lambda win: win.workspace_id == self.id)
-        model = Gtk.FilterListModel(model=WINDOWS_STORE, filter=filter_)
-        return model
+        return WORKSPACE_WINDOWS.get_store(self.id)
 
     def activate(self):
         """Ask the window manager to activate this workspace."""
@@ -59,7 +58,7 @@ class Window(GObject.Object):
     id: str = GObject.Property(type=str)
     name: str = GObject.Property(type=str) # this is the window class (class cannot be used)
     title: str = GObject.Property(type=str)
-    monitor_id: str = GObject.Property(type=str)
+    monitor_id: str = GObject.Property(type=str)  # the monitor (output) name
     workspace_id: str = GObject.Property(type=str)
     active: bool = GObject.Property(type=bool, default=False)
     urgent: bool = GObject.Property(type=bool, default=False)
@@ -75,6 +74,98 @@ class Window(GObject.Object):
 WORKSPACES_STORE: IndexedListStore[Workspace] = IndexedListStore(item_type=Workspace)
 WINDOWS_STORE: IndexedListStore[Window] = IndexedListStore(item_type=Window)
 
+# props copied from the backends snapshots (active is managed by the backends)
+WORKSPACE_PROPS = ('name', 'monitor', 'urgent')
+WINDOW_PROPS = ('name', 'title', 'monitor_id', 'workspace_id', 'urgent')
+
+
+class WorkspaceWindowsIndex:
+    """
+    Keep a ListStore of windows for each workspace, following the changes
+    of WINDOWS_STORE and of the workspace_id of each window. Views of a
+    workspace only receive the changes of their own windows.
+
+    Windows are listed in the order they joined the workspace, that is not
+    always the order of WINDOWS_STORE (fe: a window moved from another
+    workspace is always the last one). The list of a workspace is dropped
+    when the workspace is removed and no windows are left in it.
+    """
+    def __init__(self, windows: IndexedListStore[Window],
+                 workspaces: IndexedListStore[Workspace]):
+        self._windows = windows
+        self._workspaces = workspaces
+        self._mirror: list[Window] = []  # to know the removed windows
+        self._stores: dict[str, Gio.ListStore] = {}
+        self._tracked: dict[Window, tuple[str, int]] = {}  # (ws_id, handler)
+        windows.connect('items-changed', self._on_items_changed)
+        workspaces.connect('items-changed', self._on_workspaces_changed)
+
+    def get_store(self, workspace_id: str) -> Gio.ListStore:
+        """The (live) list of windows of the given workspace."""
+        store = self._stores.get(workspace_id)
+        if store is None:
+            store = Gio.ListStore(item_type=Window)
+            self._stores[workspace_id] = store
+        return store
+
+    def _on_workspaces_changed(self, workspaces: IndexedListStore[Workspace],
+                               _position: int, removed: int, _added: int):
+        if removed:
+            for workspace_id in self._stores.keys() - workspaces.keys():
+                self._prune(workspace_id)
+
+    def _prune(self, workspace_id: str):
+        """Drop the list of a removed workspace, once empty."""
+        store = self._stores.get(workspace_id)
+        if (store is not None and store.get_n_items() == 0
+                and workspace_id not in self._workspaces.keys()):
+            del self._stores[workspace_id]
+
+    def _on_items_changed(self, windows: Gio.ListStore,
+                          position: int, removed: int, added: int):
+        old = self._mirror[position:position + removed]
+        new = [windows.get_item(i) for i in range(position, position + added)]
+        self._mirror[position:position + removed] = new
+
+        new_set = set(new)
+        for window in old:
+            if window not in new_set:
+                self._untrack(window)
+        for window in new:
+            if window not in self._tracked:
+                self._track(window)
+            else:
+                self._on_workspace_changed(window)
+
+    def _track(self, window: Window):
+        handler = window.connect('notify::workspace-id', self._on_workspace_changed)
+        self._tracked[window] = (window.workspace_id, handler)
+        self.get_store(window.workspace_id).append(window)
+
+    def _untrack(self, window: Window):
+        workspace_id, handler = self._tracked.pop(window)
+        window.disconnect(handler)
+        self._remove(window, workspace_id)
+
+    def _on_workspace_changed(self, window: Window, *_):
+        workspace_id, handler = self._tracked[window]
+        if window.workspace_id != workspace_id:
+            self._remove(window, workspace_id)
+            self._tracked[window] = (window.workspace_id, handler)
+            self.get_store(window.workspace_id).append(window)
+
+    def _remove(self, window: Window, workspace_id: str):
+        """Remove window from the list of workspace_id."""
+        store = self._stores.get(workspace_id)
+        if store is not None:
+            found, position = store.find(window)
+            if found:
+                store.remove(position)
+            self._prune(workspace_id)
+
+
+WORKSPACE_WINDOWS = WorkspaceWindowsIndex(WINDOWS_STORE, WORKSPACES_STORE)
+
 
 class WindowManagerService(AriaService, metaclass=Singleton):
     """
@@ -107,6 +198,9 @@ class WindowManagerService(AriaService, metaclass=Singleton):
         """Get the list of Windows."""
         return WINDOWS_STORE
 
+    def stats(self) -> dict:
+        return self._backend.stats() if self._backend else {}
+
     def activate_workspace(self, workspace: Workspace):
         """Ask the window manager to activate the given workspace."""
         if self._backend:
@@ -129,6 +223,10 @@ class WindowManagerBackend(ABC):
     def __str__(self):
         return f'<{self.__class__.__name__}>'
 
+    def stats(self) -> dict:
+        """Runtime statistics of the backend."""
+        return {}
+
     #
     # methods that must be implemented in backends
     #
@@ -157,6 +255,12 @@ class WindowManagerBackend(ABC):
             if workspace:
                 workspace.active = True
             self.active_workspace = workspace
+            if workspace:
+                publish('workspace', {
+                    'id': workspace.id,
+                    'name': workspace.name,
+                    'monitor': workspace.monitor,
+                })
 
     def _set_active_window(self, window: Window | str | None):
         if isinstance(window, str):
@@ -174,10 +278,18 @@ class WindowManagerBackend(ABC):
 ###  hyprland backend  #########################################################
 ################################################################################
 class HyprlandBackend(WindowManagerBackend):
+    """
+    Windows and workspaces are updated in place using the events payload,
+    the full clients and workspaces lists are requested only at startup
+    and when an event does not carry enough information (resync).
+
+    Hyprland send bursts of events (fe: on workspace switch), property
+    updates and resync requests are coalesced and applied once per frame.
+    """
     ignored_events = (
         # v2 available
         'activewindow', 'focusedmon', 'movewindow', 'windowtitle',
-        'workspace', 'createworkspace', 'destroyworkspace',
+        'workspace', 'createworkspace', 'destroyworkspace', 'moveworkspace',
         # other
         'openlayer', 'closelayer',
     )
@@ -185,74 +297,187 @@ class HyprlandBackend(WindowManagerBackend):
     def __init__(self):
         """ Raise RuntimeError if hyprland is not available """
         super().__init__()
+        self.coalescer = Coalescer()
         self.hypr = HyprlandService()
-        self.hypr.watch_events(self._hypr_events_cb)
-        self.hypr.send_command('j/workspaces', self._workspaces_cb)
-        self.hypr.send_command('j/clients', self._clients_cb)
-        self.hypr.send_command('j/activeworkspace', self._activeworkspace_cb)
-        self.hypr.send_command('j/activewindow', self._activewindow_cb)
+        self.hypr.watch_events(self._hypr_events_cb, on_reconnect=self._resync)
+        self._resync()
 
     def shutdown(self):
+        self.coalescer.cancel()
         if self.hypr:
             # self.hypr.unwatch_events(self._hypr_events_cb)  # TODO !!!
             self.hypr = None
 
+    def stats(self) -> dict:
+        return {'events': self.coalescer.stats()}
+
     def _hypr_events_cb(self, event: str, data: str):
         match event:
             case 'activewindowv2':
-                self._set_active_window(data)
-            case 'openwindow' | 'closewindow' | 'movewindowv2':
-                # TODO: how to request only the changed client?
-                self.hypr.send_command('j/clients', self._clients_cb)
-            case 'createworkspacev2' | 'destroyworkspacev2':
-                self.hypr.send_command('j/workspaces', self._workspaces_cb)
-                self.hypr.send_command('j/clients', self._clients_cb)
+                self.coalescer.schedule('active-window',
+                                        self._set_active_window, data)
+            case 'openwindow':
+                # WINDOWADDRESS,WORKSPACENAME,WINDOWCLASS,WINDOWTITLE
+                self._window_opened(*data.split(',', 3))
+            case 'closewindow':
+                # WINDOWADDRESS
+                self._window_closed(data)
+            case 'movewindowv2':
+                # WINDOWADDRESS,WORKSPACEID,WORKSPACENAME
+                self._window_moved(*data.split(',', 2))
+            case 'windowtitlev2':
+                # WINDOWADDRESS,WINDOWTITLE
+                address, _, title = data.partition(',')
+                self.coalescer.schedule(('title', address),
+                                        self._set_window_title, address, title)
+            case 'createworkspacev2':
+                # the payload miss the monitor, fetch (only) the workspaces
+                self._resync_workspaces()
+            case 'destroyworkspacev2':
+                # WORKSPACEID,WORKSPACENAME
+                workspace_id, _, _ = data.partition(',')
+                if self.active_workspace and self.active_workspace.id == workspace_id:
+                    self._set_active_workspace(None)
+                WORKSPACES_STORE.remove_key(workspace_id)
+            case 'moveworkspacev2':
+                # WORKSPACEID,WORKSPACENAME,MONNAME
+                workspace_id, _, rest = data.partition(',')
+                _, _, monitor = rest.partition(',')
+                if workspace := WORKSPACES_STORE.get(workspace_id):
+                    workspace.monitor = monitor
+                # the windows follow their workspace
+                for window in WINDOWS_STORE:
+                    if window.workspace_id == workspace_id:
+                        window.monitor_id = monitor
+            case 'renameworkspace':
+                # WORKSPACEID,NEWNAME
+                workspace_id, _, name = data.partition(',')
+                if workspace := WORKSPACES_STORE.get(workspace_id):
+                    workspace.name = name
             case 'focusedmonv2':
                 if data and ',' in data:
                     _, workspace_id = data.split(',', 1)
-                    self._set_active_workspace(workspace_id)
+                    self.coalescer.schedule('active-workspace',
+                                            self._set_active_workspace,
+                                            workspace_id)
             case 'workspacev2':
                 if data and ',' in data:
                     workspace_id, _ = data.split(',', 1)
-                    self._set_active_workspace(workspace_id)
+                    self.coalescer.schedule('active-workspace',
+                                            self._set_active_workspace,
+                                            workspace_id)
             case _:
                 if event not in self.ignored_events:
                     print("HYPR EVENT", event, data)
 
-    def _workspaces_cb(self, workspaces: list[dict[str, str|int|bool]]):
-        # remember the active workspace (if any)
-        active_ws_id = self.active_workspace.id if self.active_workspace else None
-        WORKSPACES_STORE.remove_all()
+    @staticmethod
+    def _address(address: str) -> str:
+        """Window id from an hyprland address, with or without the 0x."""
+        return address.lstrip('0x')
+
+    def _resync(self):
+        """Fetch the full state, fe: after the events have been lost."""
+        self._resync_workspaces()
+        self._resync_clients()
+        self.coalescer.schedule('resync-active-workspace', self.hypr.send_command,
+                                'j/activeworkspace', self._activeworkspace_cb)
+        self.coalescer.schedule('resync-active-window', self.hypr.send_command,
+                                'j/activewindow', self._activewindow_cb)
+
+    def _resync_workspaces(self):
+        """Fetch the full workspaces list, once per events burst."""
+        self.coalescer.schedule('resync-workspaces', self.hypr.send_command,
+                                'j/workspaces', self._workspaces_cb)
+
+    def _resync_clients(self):
+        """Fetch the full clients list, once per events burst."""
+        self.coalescer.schedule('resync-clients', self.hypr.send_command,
+                                'j/clients', self._clients_cb)
+
+    def _set_window_title(self, address: str, title: str):
+        if window := WINDOWS_STORE.get(self._address(address)):
+            window.title = title
+
+    def _window_opened(self, address: str, workspace_name: str = '',
+                       wclass: str = '', title: str = ''):
+        workspace = next((ws for ws in WORKSPACES_STORE
+                          if ws.name == workspace_name), None)
+        if workspace is None:
+            # workspace not (yet) known, let hyprland tell us the truth
+            DBG('Window opened on unknown workspace %s', workspace_name)
+            self._resync_clients()
+            return
+
+        window = Window()
+        window.id = self._address(address)
+        window.name = wclass
+        window.title = title
+        window.workspace_id = workspace.id
+        window.monitor_id = workspace.monitor
+        self._add_window(window)
+
+    def _window_closed(self, address: str):
+        window_id = self._address(address)
+        if self.active_window and self.active_window.id == window_id:
+            self._set_active_window(None)
+        WINDOWS_STORE.remove_key(window_id)
+
+    def _window_moved(self, address: str, workspace_id: str = '', _name: str = ''):
+        window = WINDOWS_STORE.get(self._address(address))
+        workspace = WORKSPACES_STORE.get(workspace_id)
+        if window is None or workspace is None:
+            self._resync_clients()
+        elif window.workspace_id != workspace_id:
+            window.workspace_id = workspace_id
+            window.monitor_id = workspace.monitor
 
+    @staticmethod
+    def _add_window(window: Window):
+        """Add a new window, or replace the one with the same id."""
+        if old := WINDOWS_STORE.get(window.id):
+            WINDOWS_STORE.remove_item(old)
+        WINDOWS_STORE.append(window)
+
+    def _workspaces_cb(self, workspaces: list[dict[str, str|int|bool]]):
+        snapshot = []
         for ws in workspaces or []:
-            wid = str(ws['id'])
             workspace = Workspace()
-            workspace.id = wid
+            workspace.id = str(ws['id'])
             workspace.name = ws['name']
             workspace.monitor = ws['monitor']
-            WORKSPACES_STORE.append(workspace)
+            snapshot.append(workspace)
 
-        # restore previously active workspace (if any)
-        self._set_active_workspace(active_ws_id)
+        # forget the active workspace if it is gone
+        if self.active_workspace:
+            if self.active_workspace.id not in {ws.id for ws in snapshot}:
+                self._set_active_workspace(None)
+        WORKSPACES_STORE.reconcile(snapshot, WORKSPACE_PROPS)
 
-    def _clients_cb(self, clients: list[dict[str, str|int|bool|list|dict]]):
-        # remember the active win (if any)
-        active_win_id = self.active_window.id if self.active_window else None
-        WINDOWS_STORE.remove_all()
+        # the windows follow their workspace monitor
+        monitors = {ws.id: ws.monitor for ws in snapshot}
+        for window in WINDOWS_STORE:
+            monitor = monitors.get(window.workspace_id)
+            if monitor is not None and window.monitor_id != monitor:
+                window.monitor_id = monitor
 
+    def _clients_cb(self, clients: list[dict[str, str|int|bool|list|dict]]):
+        snapshot = []
         for cli in clients or []:
-            cid = cli['address']
-            cid = cid.lstrip('0x')
             window = Window()
-            window.id = cid
+            window.id = self._address(cli['address'])
             window.name = cli['class']
             window.title = cli['title']
             window.workspace_id = str(cli['workspace']['id'])
-            window.monitor_id = str(cli['monitor'])
-            WINDOWS_STORE.append(window)
+            # the monitor name, like sway (clients only have the monitor number)
+            if workspace := WORKSPACES_STORE.get(window.workspace_id):
+                window.monitor_id = workspace.monitor
+            snapshot.append(window)
 
-        # restore previously active window (if any)
-        self._set_active_window(active_win_id)
+        # forget the active window if it is gone
+        if self.active_window:
+            if self.active_window.id not in {win.id for win in snapshot}:
+                self._set_active_window(None)
+        WINDOWS_STORE.reconcile(snapshot, WINDOW_PROPS)
 
     def _activeworkspace_cb(self, ws: dict[str, Any]):
         ws_id = str(ws['id'])
@@ -273,20 +498,49 @@ class HyprlandBackend(WindowManagerBackend):
 ### Sway backend  ##############################################################
 ################################################################################
 class SwayBackend(WindowManagerBackend):
+    """
+    Events are applied directly when the payload is enough, the full tree
+    is requested only at startup and when the payload does not tell where
+    a window is. Tree requests are coalesced, one for each burst of events,
+    and the result is reconciled with the existing objects.
+
+    The window events do not carry the window workspace, but a visible
+    window is on the visible workspace of the output under its rect. So
+    the full tree is needed only for:
+    - windows created or moved while not visible: placed by rules on a
+      hidden workspace, moved to a hidden workspace or to the scratchpad,
+      or in a hidden tab
+    - windows (or workspaces) not known yet
+    - workspaces moved to another output: the output they left shows
+      another workspace, that the payload does not tell
+    """
     sway_events = ['window', 'workspace']
 
     def __init__(self):
         """ Raise RuntimeError if sway is not available """
         super().__init__()
+        self.coalescer = Coalescer()
+        # output name => (x, y, width, height), and its visible workspace id
+        self._outputs: dict[str, tuple[int, int, int, int]] = {}
+        self._visible_workspaces: dict[str, str] = {}
         self.sway = SwayService()
-        self.sway.subscribe(self.sway_events, self._sway_events_cb)
+        self.sway.subscribe(self.sway_events, self._sway_events_cb,
+                            on_reconnect=self._resync)
         self.sway.get_tree(self._tree_cb)
 
     def shutdown(self):
+        self.coalescer.cancel()
         if self.sway:
             # self.sway.unsubscribe() # TODO
             self.sway = None
 
+    def stats(self) -> dict:
+        return {'events': self.coalescer.stats()}
+
+    def _resync(self):
+        """Fetch the whole tree, once per events burst."""
+        self.coalescer.schedule('resync', self.sway.get_tree, self._tree_cb)
+
     def activate_workspace(self, workspace: Workspace):
         self.sway.run_command(f'workspace "{workspace.name}"')
 
@@ -299,43 +553,59 @@ class SwayBackend(WindowManagerBackend):
 
         parent_monitor: str = ''
         parent_workspace: Workspace | None = None
-
-        WORKSPACES_STORE.remove_all()
-        WINDOWS_STORE.remove_all()
-
-        self._set_active_window(None)
-        self._set_active_workspace(None)
-
-        # list of nodes to precess, will be recursively filled in the loop
+        workspaces: list[Workspace] = []
+        windows: list[Window] = []
+        outputs: dict[str, tuple[int, int, int, int]] = {}
+        visible_workspaces: dict[str, str] = {}
+        active_workspace_id: str | None = None
+        active_window: Window | None = None
+
+        # stack of nodes to process, children are pushed in reverse order
+        # so that nodes are visited in tree order (parents first)
         nodes: list[dict] = [root_node]
-        while len(nodes) > 0:
-            # pop a node to process from the list of nodes
-            node = nodes.pop(0)
-
-            # recursively add child nodes to the list of nodes
-            nodes = node['nodes'] + node['floating_nodes'] + nodes
+        while nodes:
+            node = nodes.pop()
+            nodes.extend(reversed(node['floating_nodes']))
+            nodes.extend(reversed(node['nodes']))
 
             # monitor
             if node['type'] == 'output':
                 parent_monitor = node.get('name', '')
+                # (the __i3 output holds the scratchpad, never visible)
+                if (rect := node.get('rect')) and not parent_monitor.startswith('__'):
+                    outputs[parent_monitor] = (rect['x'], rect['y'],
+                                               rect['width'], rect['height'])
+                # the first focused child is the visible workspace
+                if focus := node.get('focus'):
+                    visible_workspaces[parent_monitor] = str(focus[0])
 
             # workspace
             elif node['type'] == 'workspace':
                 if workspace := self._make_workspace(node):
+                    workspaces.append(workspace)
                     parent_workspace = workspace
                     if node.get('focused', False):
-                        self._set_active_workspace(workspace)
+                        active_workspace_id = workspace.id
 
             # window
             elif node['type'] in ('con', 'floating_con'):
                 if win := self._make_window(node, parent_monitor,
                                             parent_workspace):
+                    windows.append(win)
                     if node.get('focused', False):
-                        self._set_active_window(win.id)
+                        active_window = win
 
         # ensure a workspace is active
-        if not self.active_workspace and self.active_window.workspace_id:
-            self._set_active_workspace(self.active_window.workspace_id)
+        if not active_workspace_id and active_window:
+            active_workspace_id = active_window.workspace_id
+
+        # apply the snapshot, keeping the objects already known
+        self._outputs = outputs
+        self._visible_workspaces = visible_workspaces
+        WORKSPACES_STORE.reconcile(workspaces, WORKSPACE_PROPS)
+        WINDOWS_STORE.reconcile(windows, WINDOW_PROPS)
+        self._set_active_workspace(active_workspace_id)
+        self._set_active_window(active_window.id if active_window else None)
 
     @staticmethod
     def _make_workspace(node: dict) -> Workspace | None:
@@ -349,7 +619,7 @@ class SwayBackend(WindowManagerBackend):
         workspace.id = str(wid)
         workspace.name = node['name']
         workspace.monitor = node['output']
-        WORKSPACES_STORE.append(workspace)
+        workspace.urgent = node.get('urgent', False)
         return workspace
 
     @staticmethod
@@ -366,7 +636,6 @@ class SwayBackend(WindowManagerBackend):
             return None
 
         # visible = node.get('visible', False)
-        # urgent = node.get('urgent', False)
         # focused = node.get('focused', False)
         window = Window()
         window.id=str(wid)
@@ -374,10 +643,65 @@ class SwayBackend(WindowManagerBackend):
         window.title = node['name']
         window.workspace_id = workspace.id
         window.monitor_id = monitor
-        WINDOWS_STORE.append(window)
-
+        window.urgent = node.get('urgent', False)
         return window
 
+    def _container_workspace(self, container: dict) -> Workspace | None:
+        """The workspace of a visible container, None if not visible."""
+        if not container.get('visible', False):
+            return None
+        if len(self._outputs) == 1:
+            output = next(iter(self._outputs))
+        elif rect := container.get('rect'):
+            # the output under the center of the container
+            x = rect['x'] + rect['width'] // 2
+            y = rect['y'] + rect['height'] // 2
+            output = next((name for name, (ox, oy, w, h) in self._outputs.items()
+                           if ox <= x < ox + w and oy <= y < oy + h), None)
+        else:
+            return None
+        return WORKSPACES_STORE.get(self._visible_workspaces.get(output, ''))
+
+    def _window_new(self, container: dict):
+        # NOTE: data do not contain the ws this new win belong, and rules
+        # (assign, for_window) can place it on any workspace
+        window = None
+        if workspace := self._container_workspace(container):
+            window = self._make_window(container, workspace.monitor, workspace)
+        if window is None:
+            self._resync()
+        elif window.id not in WINDOWS_STORE.keys():
+            WINDOWS_STORE.append(window)
+
+    def _window_moved(self, container: dict):
+        # NOTE: data do not contain the destination workspace
+        window = WINDOWS_STORE.get(str(container['id']))
+        workspace = self._container_workspace(container)
+        if window is None or workspace is None:
+            self._resync()
+        elif window.workspace_id != workspace.id:
+            window.workspace_id = workspace.id
+            window.monitor_id = workspace.monitor
+
+    def _workspace_focused(self, current: dict):
+        ws_id = str(current['id'])
+        if output := current.get('output'):
+            self._visible_workspaces[output] = ws_id
+        self._set_active_workspace(ws_id)
+
+    def _workspace_moved(self, current: dict):
+        ws_id = str(current['id'])
+        workspace = WORKSPACES_STORE.get(ws_id)
+        output = current.get('output')
+        if workspace and output:
+            # show the windows on the new monitor at once...
+            workspace.monitor = output
+            for window in WINDOWS_STORE:
+                if window.workspace_id == ws_id:
+                    window.monitor_id = output
+        # ...but only the tree tells what the old monitor shows now
+        self._resync()
+
     def _sway_events_cb(self, event: SwayMessage):
         change = event.data.get('change', None)
         DBG('Received Sway event: %s %s', event.type.name, change)
@@ -386,9 +710,10 @@ class SwayBackend(WindowManagerBackend):
             if ws_id := str(event.data.get('current', {}).get('id', '')):
                 match change:
                     case 'init':
-                        self._make_workspace(event.data['current'])
+                        if ws := self._make_workspace(event.data['current']):
+                            WORKSPACES_STORE.append(ws)
                     case 'focus':
-                        self._set_active_workspace(ws_id)
+                        self._workspace_focused(event.data['current'])
                     case 'urgent':
                         if ws := WORKSPACES_STORE.get(ws_id):
                             ws.urgent = event.data['current'].get('urgent', False)
@@ -398,8 +723,7 @@ class SwayBackend(WindowManagerBackend):
                         if ws := WORKSPACES_STORE.get(ws_id):
                             ws.name = event.data['current'].get('name', '')
                     case 'move':
-                        # refetch the whole tree  # TODO better?
-                        self.sway.get_tree(self._tree_cb)
+                        self._workspace_moved(event.data['current'])
                     case _:
                         INF('NOT MANAGED WORKSPACE CHANGE %s', change)
 
@@ -413,12 +737,10 @@ class SwayBackend(WindowManagerBackend):
                             win.urgent = event.data['container'].get('urgent', False)
                     case 'close':
                         WINDOWS_STORE.remove_key(win_id)
-                    case 'new'|'move':
-                        # NOTE: data do not contain the ws this new win belong
-                        # I'm not able to create the win here, need to
-                        # refetch the whole tree (async!)  grrr...
-                        # self._make_window(event.data['container'], None, None)
-                        self.sway.get_tree(self._tree_cb)  # TODO better ??
+                    case 'new':
+                        self._window_new(event.data['container'])
+                    case 'move':
+                        self._window_moved(event.data['container'])
                     case 'title':
                         if win := WINDOWS_STORE.get(win_id):
                             win.title = event.data['container'].get('name', '')
@@ -1,53 +1,73 @@
+import json
+import os
+from collections.abc import Iterable
+from dataclasses import dataclass, astuple
+from functools import lru_cache
 from operator import attrgetter
+from pathlib import Path
+from threading import Thread
 
-from gi.repository import Gtk, Gdk, Gio, GioUnix
+from gi.repository import GLib, Gtk, Gdk, Gio, GioUnix
 
 from aria_shell.config import AriaConfig
 from aria_shell.services import AriaService
-from aria_shell.utils import Singleton, PerfTimer, exec_detached
+from aria_shell.utils import Singleton, Signalable, Timer, PerfTimer, exec_detached
+from aria_shell.utils.env import ARIA_CACHE_HOME, XDG_DATA_HOME, XDG_DATA_DIRS
 from aria_shell.utils.logger import get_loggers
 
 
 DBG, INF, WRN, ERR, CRI = get_loggers(__name__)
 
 
-class DesktopApp:
-    def __init__(self, gapp: GioUnix.DesktopAppInfo):
-        self._gapp = gapp
+# bump when the cache format or the DesktopApp fields change
+APPS_CACHE_VERSION = 3
+APPS_CACHE_FILE = ARIA_CACHE_HOME / 'desktop-apps.json'
 
-    def __repr__(self):
-        return f"<DesktopApp id='{self.id}' name='{self.name}'>"
-
-    @property
-    def id(self) -> str:
-        return self._gapp.get_id() or self.name
+# where .desktop files are searched, by priority
+APPS_DIRS = [path / 'applications' for path in (XDG_DATA_HOME, *XDG_DATA_DIRS)]
 
-    @property
-    def name(self) -> str:
-        return self._gapp.get_name() or self.id
+# seconds to wait after the last apps change before rewriting the cache
+APPS_CACHE_SAVE_DELAY = 3
 
-    @property
-    def display_name(self) -> str:
-        return self._gapp.get_display_name() or self.name or self.id
+# how many window class => icon name lookups to remember
+CLASS_ICON_CACHE_SIZE = 256
 
-    @property
-    def description(self) -> str | None:
-        return self._gapp.get_description()
 
-    @property
-    def command_line(self) -> str | None:
-        return self._gapp.get_commandline()
+@dataclass
+class DesktopApp:
+    """ A .desktop application, only the data needed by aria is kept """
+    id: str
+    name: str
+    display_name: str
+    description: str | None = None
+    command_line: str | None = None
+    executable: str | None = None
+    icon_name: str | None = None
+    startup_wm_class: str | None = None
 
-    @property
-    def executable(self) -> str | None:
-        return self._gapp.get_executable()
+    def __repr__(self):
+        return f"<DesktopApp id='{self.id}' name='{self.name}'>"
 
-    @property
-    def icon_name(self) -> str | None:
-        icon: Gio.ThemedIcon = self._gapp.get_icon()  # noqa
+    @classmethod
+    def from_gapp(cls, gapp: GioUnix.DesktopAppInfo,
+                  desktop_id: str | None = None) -> DesktopApp:
+        icon_name = None
+        icon: Gio.ThemedIcon = gapp.get_icon()  # noqa
         if icon and hasattr(icon, 'get_names'):
             if names := icon.get_names():
-                return names[0]
+                icon_name = names[0]
+        aid = desktop_id or gapp.get_id() or gapp.get_name()
+        name = gapp.get_name() or aid
+        return cls(
+            id=aid,
+            name=name,
+            display_name=gapp.get_display_name() or name,
+            description=gapp.get_description(),
+            command_line=gapp.get_commandline(),
+            executable=gapp.get_executable(),
+            icon_name=icon_name,
+            startup_wm_class=gapp.get_startup_wm_class(),
+        )
 
     def get_icon(self) -> Gtk.Image:
         return Gtk.Image.new_from_icon_name(self.icon_name)
@@ -75,33 +95,69 @@ class DesktopApp:
 
 
 
-class XDGDesktopService(AriaService, metaclass=Singleton):
-    """ Implement XDG DesktopFile and XDGIcons """
+class XDGDesktopService(AriaService, Signalable, metaclass=Singleton):
+    """ Implement XDG DesktopFile and XDGIcons
+
+    Signals:
+        app-added(app): a new .desktop app has been installed
+        app-changed(app): an existing app has been changed
+        app-removed(app): the app has been uninstalled (or is now hidden)
+    """
+    __signals__ = ['app-added', 'app-changed', 'app-removed']
+
     def __init__(self):
         # hack for clients with unusual window class
         self.apps_class_map = AriaConfig().section_dict('apps_class_map')
 
         # init icon theme
         self.icon_theme = Gtk.IconTheme.get_for_display(Gdk.Display.get_default())
+        self._icon_theme_handler = self.icon_theme.connect(
+            'changed', self._on_icon_theme_changed
+        )
         INF(f'Using XDG icon theme: {self.icon_theme.get_theme_name()}')
 
-        # init .desktop apps "database"
-        t = PerfTimer()
-        self.apps: dict[str, DesktopApp] = {}
-        for gapp in Gio.AppInfo.get_all():
-            if not gapp.should_show():
-                continue
-            aid = gapp.get_id() or gapp.get_name()
-            aid = aid.removesuffix('.desktop').lower()
-            self.apps[aid] = DesktopApp(gapp=gapp)  # noqa
-        INF(f'Loaded {len(self.apps)} .desktop apps (in {t.elapsed})')
+        # window class lookups, both invalidated on apps database changes
+        self._class_index: dict[str, DesktopApp] | None = None
+        self._class_icon_cache = lru_cache(CLASS_ICON_CACHE_SIZE)(
+            self._resolve_window_class_icon
+        )
 
-        # TODO: Gio.AppInfoMonitor to keep db uptodate
+        # init .desktop apps "database", from the cache if still valid
+        t = PerfTimer()
+        self._cancellable = Gio.Cancellable()
+        if cache := self._load_cache():
+            self.apps, files = cache
+            INF(f'Loaded {len(self.apps)} .desktop apps from cache (in {t.elapsed})')
+            # the cache can miss files edited in place, check in background
+            Thread(target=self._revalidate_thread, args=(files,),
+                   daemon=True).start()
+        else:
+            mtimes = self._apps_dirs_mtimes()
+            self.apps = self._scan_apps()
+            INF(f'Loaded {len(self.apps)} .desktop apps (in {t.elapsed})')
+            Thread(target=self._save_cache, args=(dict(self.apps), mtimes),
+                   daemon=True).start()
+
+        # keep the database updated, one .desktop file at a time
+        self._save_cache_timer: Timer | None = None
+        self._monitors: list[Gio.FileMonitor] = []
+        for path in self._apps_dirs_mtimes():
+            self._monitor_apps_dir(Path(path))
 
     def shutdown(self):
+        self._cancellable.cancel()
+        for monitor in self._monitors:
+            monitor.cancel()
+        self._monitors = []
+        if self._save_cache_timer:
+            self._save_cache_timer.stop()
+            self._save_cache_timer = None
         self.apps_class_map = {}
+        self.icon_theme.disconnect(self._icon_theme_handler)
         self.icon_theme = None
         self.apps = {}
+        self._class_index = None
+        self._class_icon_cache.cache_clear()
 
     def get_icon(self, icon_name: str | list[str] | tuple[str, ...]) -> Gtk.Image:
         """ Create an icon by icon name(s), respect XDG IconTheme
@@ -116,7 +172,10 @@ class XDGDesktopService(AriaService, metaclass=Singleton):
         return Gtk.Image.new_from_icon_name('icon-not-found')
 
     def get_icon_name_for_window_class(self, class_name: str) -> str:
-        """ Search an icon for the given window class """
+        """ Search an icon for the given window class (memoized) """
+        return self._class_icon_cache(class_name)
+
+    def _resolve_window_class_icon(self, class_name: str) -> str:
         # search an app with the given name
         app = self.search_app(class_name)
         if not app and (fixed_name := self.apps_class_map.get(class_name)):
@@ -136,12 +195,31 @@ class XDGDesktopService(AriaService, metaclass=Singleton):
         else:
             return list(self.apps.values())
 
+    @property
+    def class_index(self) -> dict[str, DesktopApp]:
+        """Apps by lowercase StartupWMClass, executable, id and name."""
+        if self._class_index is None:
+            index = {}
+            # in priority order, the first app for each key wins
+            for app in self.apps.values():
+                if app.startup_wm_class:
+                    index.setdefault(app.startup_wm_class.lower(), app)
+            for app in self.apps.values():
+                if app.executable:
+                    index.setdefault(os.path.basename(app.executable).lower(), app)
+            for app in self.apps.values():
+                index.setdefault(app.id.removesuffix('.desktop').lower(), app)
+            for app in self.apps.values():
+                index.setdefault(app.name.lower(), app)
+            self._class_index = index
+        return self._class_index
+
     def search_app(self, text: str) -> DesktopApp | None:
         """ Search in apps database """
         text = text.lower()
 
-        # a fast perfect id match
-        if app := self.apps.get(text):
+        # a fast perfect id, window class, executable or name match
+        if app := self.apps.get(text) or self.class_index.get(text):
             return app
 
         # search text in .id and .name
@@ -159,3 +237,208 @@ class XDGDesktopService(AriaService, metaclass=Singleton):
                 return app
 
         return None
+
+    @staticmethod
+    def _scan_apps() -> dict[str, DesktopApp]:
+        """Read all the .desktop files, slow on cold disk caches."""
+        apps = {}
+        for gapp in Gio.AppInfo.get_all():
+            if not gapp.should_show():
+                continue
+            app = DesktopApp.from_gapp(gapp)  # noqa
+            apps[app.id.removesuffix('.desktop').lower()] = app
+        return apps
+
+    @staticmethod
+    def _apps_dirs_mtimes() -> dict[str, int]:
+        """Modification time of all the applications dirs (and subdirs)."""
+        mtimes = {}
+        pending = [path.as_posix() for path in APPS_DIRS]
+        while pending:
+            path = pending.pop()
+            try:
+                mtimes[path] = os.stat(path).st_mtime_ns
+                with os.scandir(path) as entries:
+                    pending.extend(e.path for e in entries if e.is_dir())
+            except OSError:
+                continue
+        return mtimes
+
+    @staticmethod
+    def _desktop_files_mtimes(dirs: Iterable[str]) -> dict[str, int]:
+        """Modification time of the .desktop files in the given dirs."""
+        mtimes = {}
+        for path in dirs:
+            try:
+                with os.scandir(path) as entries:
+                    for entry in entries:
+                        if entry.name.endswith('.desktop') and entry.is_file():
+                            mtimes[entry.path] = entry.stat().st_mtime_ns
+            except OSError:
+                continue
+        return mtimes
+
+    @staticmethod
+    def _cache_locale() -> str:
+        # names and descriptions in the cache are translated
+        return GLib.get_language_names()[0]
+
+    def _load_cache(self) -> tuple[dict[str, DesktopApp], dict[str, int]] | None:
+        """The apps from the cache file, with the .desktop files mtimes when
+        it was written. None if missing or stale.
+
+        Only the dirs mtimes are checked here, the files ones are checked
+        later by the revalidation.
+        """
+        try:
+            with APPS_CACHE_FILE.open('rb') as f:
+                cache = json.load(f)
+            if (cache['version'] != APPS_CACHE_VERSION
+                    or cache['locale'] != self._cache_locale()
+                    or cache['mtimes'] != self._apps_dirs_mtimes()):
+                DBG('The .desktop apps cache is stale')
+                return None
+            apps = {aid: DesktopApp(*fields)
+                    for aid, fields in cache['apps'].items()}
+            return apps, cache['files']
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, TypeError, KeyError) as e:
+            WRN(f'Ignoring invalid apps cache {APPS_CACHE_FILE}: {e}')
+            return None
+
+    def _save_cache(self, apps: dict[str, DesktopApp], mtimes: dict[str, int]):
+        """Write the apps cache, atomically. Can be called from a thread."""
+        cache = {
+            'version': APPS_CACHE_VERSION,
+            'locale': self._cache_locale(),
+            'mtimes': mtimes,
+            'files': self._desktop_files_mtimes(mtimes),
+            'apps': {aid: astuple(app) for aid, app in apps.items()},
+        }
+        tmp = APPS_CACHE_FILE.with_suffix('.tmp')
+        try:
+            tmp.write_text(json.dumps(cache, separators=(',', ':')))
+            tmp.replace(APPS_CACHE_FILE)
+        except OSError as e:
+            ERR(f'Cannot save apps cache {APPS_CACHE_FILE}: {e}')
+
+    def _revalidate_thread(self, files: dict[str, int]):
+        mtimes = self._apps_dirs_mtimes()
+        # files edited in place change their mtime, but not the dir one
+        if self._desktop_files_mtimes(mtimes) == files:
+            DBG('The .desktop apps cache is up to date')
+            return
+        apps = self._scan_apps()
+        GLib.idle_add(self._revalidate_done, apps, mtimes, self._cancellable)
+
+    def _revalidate_done(self, apps: dict[str, DesktopApp],
+                         mtimes: dict[str, int], cancellable: Gio.Cancellable):
+        """Apply only the differences between the cache and the real apps."""
+        if cancellable.is_cancelled():
+            return False
+        removed = self.apps.keys() - apps.keys()
+        for key in removed:
+            self._set_app(key, None)
+        changed = 0
+        for key, app in apps.items():
+            if self.apps.get(key) != app:
+                self._set_app(key, app)
+                changed += 1
+        if removed or changed:
+            INF(f'Apps cache revalidated: {changed} apps changed'
+                f' and {len(removed)} removed')
+            Thread(target=self._save_cache, args=(apps, mtimes),
+                   daemon=True).start()
+        return False  # one-shot idle
+
+    def _set_app(self, key: str, app: DesktopApp | None):
+        """Add, replace or remove (if app is None) an app, emitting signals."""
+        old_app = self.apps.get(key)
+        if old_app != app:
+            self._class_index = None
+            self._class_icon_cache.cache_clear()
+        if app is None:
+            if old_app is not None:
+                del self.apps[key]
+                self.emit('app-removed', old_app)
+        elif old_app is None:
+            self.apps[key] = app
+            self.emit('app-added', app)
+        elif old_app != app:
+            self.apps[key] = app
+            self.emit('app-changed', app)
+
+    def _on_icon_theme_changed(self, _theme: Gtk.IconTheme):
+        self._class_icon_cache.cache_clear()
+
+    def _monitor_apps_dir(self, path: Path):
+        file = Gio.File.new_for_path(path.as_posix())
+        try:
+            monitor = file.monitor_directory(Gio.FileMonitorFlags.WATCH_MOVES,
+                                             self._cancellable)
+        except GLib.Error as e:
+            WRN(f'Cannot monitor apps dir {path}: {e.message}')
+            return
+        monitor.connect('changed', self._on_apps_dir_changed)
+        self._monitors.append(monitor)
+
+    def _on_apps_dir_changed(self, _monitor, file: Gio.File,
+                             other_file: Gio.File | None,
+                             event: Gio.FileMonitorEvent):
+        match event:
+            case (Gio.FileMonitorEvent.CHANGES_DONE_HINT
+                  | Gio.FileMonitorEvent.DELETED
+                  | Gio.FileMonitorEvent.MOVED_IN
+                  | Gio.FileMonitorEvent.MOVED_OUT):
+                self._reload_desktop_file(Path(file.get_path()))
+            case Gio.FileMonitorEvent.RENAMED:
+                self._reload_desktop_file(Path(file.get_path()))
+                self._reload_desktop_file(Path(other_file.get_path()))
+            case Gio.FileMonitorEvent.CREATED:
+                # new subdirs must be watched too, files will get CHANGES_DONE
+                path = Path(file.get_path())
+                if path.is_dir():
+                    self._monitor_apps_dir(path)
+
+    def _reload_desktop_file(self, path: Path):
+        """Update the app defined in the given (changed or deleted) file.
+
+        The same desktop id can be defined in more apps dirs, the first one
+        (by priority) that still exists wins, the others are shadowed.
+        """
+        if path.suffix != '.desktop':
+            return
+        for apps_dir in APPS_DIRS:
+            if path.is_relative_to(apps_dir):
+                relative = path.relative_to(apps_dir)
+                break
+        else:
+            return
+
+        app = None
+        desktop_id = relative.as_posix().replace('/', '-')
+        for apps_dir in APPS_DIRS:
+            filename = apps_dir / relative
+            if not filename.exists():
+                continue
+            gapp = GioUnix.DesktopAppInfo.new_from_filename(filename.as_posix())
+            if gapp and gapp.should_show():
+                app = DesktopApp.from_gapp(gapp, desktop_id)
+            break
+
+        DBG(f'Desktop file changed: {path} ({app})')
+        self._set_app(desktop_id.removesuffix('.desktop').lower(), app)
+        self._schedule_save_cache()
+
+    def _schedule_save_cache(self):
+        if self._save_cache_timer:
+            self._save_cache_timer.stop()
+        self._save_cache_timer = Timer(APPS_CACHE_SAVE_DELAY, self._save_cache_later)
+
+    def _save_cache_later(self) -> bool:
+        self._save_cache_timer = None
+        mtimes = self._apps_dirs_mtimes()
+        Thread(target=self._save_cache, args=(dict(self.apps), mtimes),
+               daemon=True).start()
+        return False  # one-shot timer
@@ -3,6 +3,7 @@ from ._basic import (
     Signalable,
     Observable,
     Timer,
+    Coalescer,
     FileMonitor,
     clamp,
     safe_format,
@@ -16,4 +17,5 @@ from ._basic import (
 from ._toolkit import (
     CleanupHelper,
     IndexedListStore,
+    splice_list_store,
 )
\ No newline at end of file
@@ -4,7 +4,7 @@ import shlex
 import subprocess
 from abc import ABCMeta
 from pathlib import Path
-from collections.abc import Callable, Sequence
+from collections.abc import Callable, Hashable, Sequence
 from typing import TypeVar
 
 from gi.repository import GLib, Gio
@@ -189,6 +189,81 @@ class Timer:
         return callback(*a, **ka)
 
 
+class Coalescer:
+    """ Collapse bursts of keyed updates, applying them about once per frame
+
+    Each scheduled update is identified by a key, if an update with the
+    same key is already pending it is replaced (merged) by the new one.
+    All the pending updates are run together, in scheduling order, when
+    the delay expires.
+
+    Args:
+        delay: seconds to wait before running the updates (default: 1 frame)
+
+    Usage:
+        coalescer = Coalescer()
+        coalescer.schedule(('title', win_id), set_title, win_id, title)
+    """
+    def __init__(self, delay: float = 0.016):
+        self.delay = delay
+        self._pending: dict[Hashable, tuple[Callable, tuple]] = {}
+        self._timer: Timer | None = None
+        # counters
+        self.scheduled = 0
+        self.merged = 0
+        self.flushes = 0
+
+    def __repr__(self):
+        return f'<Coalescer pending={len(self._pending)}>'
+
+    def schedule(self, key: Hashable, callback: Callable, *args):
+        """Run callback(*args) later, replacing a pending update with key."""
+        self.scheduled += 1
+        if self._pending.pop(key, None) is not None:
+            self.merged += 1
+        self._pending[key] = (callback, args)
+        if self._timer is None:
+            self._timer = Timer(self.delay, self._timer_cb)
+
+    def flush(self):
+        """Run all the pending updates now."""
+        if self._timer:
+            self._timer.stop()
+            self._timer = None
+        if self._pending:
+            self.flushes += 1
+            pending, self._pending = self._pending, {}
+            for callback, args in pending.values():
+                callback(*args)
+
+    def _timer_cb(self) -> bool:
+        self._timer = None
+        self.flush()
+        return False  # one-shot timer
+
+    def discard(self, key: Hashable):
+        """Forget the pending update with key, if any."""
+        self._pending.pop(key, None)
+        if not self._pending and self._timer:
+            self._timer.stop()
+            self._timer = None
+
+    def cancel(self):
+        """Forget all the pending updates."""
+        if self._timer:
+            self._timer.stop()
+            self._timer = None
+        self._pending.clear()
+
+    def stats(self) -> dict:
+        return {
+            'scheduled': self.scheduled,
+            'merged': self.merged,
+            'flushes': self.flushes,
+            'pending': len(self._pending),
+        }
+
+
 class FileMonitor:
     """A class to watch for changes on files.
 
@@ -1,4 +1,4 @@
-from collections.abc import Callable
+from collections.abc import Callable, Sequence
 from typing import TypeVar, Iterator, Hashable, Any, Iterable
 
 from gi.repository import Gio, GObject
@@ -71,6 +71,50 @@ class CleanupHelper:
         self._bindings.clear()
 
 
+################################################################################
+def splice_list_store(store: Gio.ListStore, items: Sequence[GObject.Object]):
+    """
+    Make the content of store equal to items, touching only changed rows.
+
+    Items are compared by identity, so this is useful only when the same
+    objects are reused between updates. Removed items are spliced out in
+    contiguous runs, new items are spliced in where they belong. Only when
+    the relative order of the kept items changes, the tail of the store
+    starting at the first out-of-order item is replaced in one go.
+    """
+    wanted = set(items)
+
+    # splice out the runs of items not wanted anymore (from the end)
+    position = store.get_n_items()
+    while position > 0:
+        position -= 1
+        if store.get_item(position) not in wanted:
+            end = position + 1
+            while position > 0 and store.get_item(position - 1) not in wanted:
+                position -= 1
+            store.splice(position, end - position, [])
+
+    # splice in the new items, walking both lists
+    current = set(store)
+    position = 0
+    n_items = store.get_n_items()
+    while position < len(items):
+        item = items[position]
+        if position < n_items and store.get_item(position) is item:
+            position += 1
+        elif item not in current:
+            end = position + 1
+            while end < len(items) and items[end] not in current:
+                end += 1
+            store.splice(position, 0, items[position:end])
+            n_items += end - position
+            position = end
+        else:
+            # order changed, replace everything from here
+            store.splice(position, n_items - position, items[position:])
+            break
+
+
 ################################################################################
 ItemObjectT = TypeVar('ItemObjectT', bound=GObject.Object)
 ItemKeyT = TypeVar('ItemKeyT', bound=Hashable)
@@ -155,3 +199,41 @@ class IndexedListStore[ItemObjectT, KeyPropT=str](Gio.ListStore):
         """Remove all items from the store."""
         super().remove_all()
         self._index.clear()
+
+    def splice(self, position: int, n_removals: int,
+               additions: Sequence[ItemObjectT]):
+        """Remove n_removals items at position and insert additions there."""
+        for i in range(position, position + n_removals):
+            del self._index[self._gkey(self.get_item(i))]
+        super().splice(position, n_removals, additions)
+        for item in additions:
+            self._index[self._gkey(item)] = item
+
+    def reconcile(self, items: Sequence[ItemObjectT],
+                  props: Iterable[str] = ()):
+        """
+        Make the store content equal to items, reusing the existing objects.
+
+        Useful to apply a full snapshot of the data without dropping the
+        state of the widgets built on the items. Items with a key already in
+        the store are not inserted: the existing object is kept, only the
+        props that changed are copied into it. Other items are added and
+        the missing ones removed, with the minimum number of splices.
+
+        Args:
+            items: the new content of the store, in order
+            props: names of the properties to copy in the existing objects
+        """
+        result = []
+        for item in items:
+            old = self._index.get(self._gkey(item))
+            if old is None:
+                result.append(item)
+                continue
+            for prop in props:
+                value = getattr(item, prop)
+                if getattr(old, prop) != value:
+                    setattr(old, prop, value)
+            result.append(old)
+
+        splice_list_store(self, result)
@@ -21,6 +21,15 @@ XDG_CONFIG_HOME = Path(
 XDG_CONFIG_DIRS = os.getenv('XDG_CONFIG_DIRS') or '/etc/xdg'
 XDG_CONFIG_DIRS = XDG_CONFIG_DIRS.split(':')
 XDG_CONFIG_DIRS = list(map(Path, XDG_CONFIG_DIRS))
+XDG_CACHE_HOME = Path(
+    os.getenv('XDG_CACHE_HOME') or HOME / '.cache'
+)
+XDG_DATA_HOME = Path(
+    os.getenv('XDG_DATA_HOME') or HOME / '.local' / 'share'
+)
+XDG_DATA_DIRS = os.getenv('XDG_DATA_DIRS') or '/usr/local/share:/usr/share'
+XDG_DATA_DIRS = XDG_DATA_DIRS.split(':')
+XDG_DATA_DIRS = list(map(Path, XDG_DATA_DIRS))
 
 
 #
@@ -31,6 +40,9 @@ ARIA_RUNTIME_DIR.mkdir(parents=True, exist_ok=True)
 ARIA_CONFIG_HOME = XDG_CONFIG_HOME / 'aria-shell'
 ARIA_CONFIG_HOME.mkdir(parents=True, exist_ok=True)
 
+ARIA_CACHE_HOME = XDG_CACHE_HOME / 'aria-shell'
+ARIA_CACHE_HOME.mkdir(parents=True, exist_ok=True)
+
 ARIA_PACKAGE_DIR = Path(__file__).resolve().parent.parent
 ARIA_ASSETS_DIR = ARIA_PACKAGE_DIR / 'assets'
 
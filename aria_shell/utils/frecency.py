@@ -0,0 +1,145 @@
+"""
+
+A tiny persistent database of how frequently and how recently things
+have been used (frecency), to rank search results by usage.
+
+Each key store a single score that decay exponentially over time, every
+use add 1 to the decayed score. Only the score and the time of the last
+use are saved, so the file stay small whatever the usage history.
+
+The file is loaded lazily, the first time a score is requested, and
+writes are batched: uses only mark the store as dirty and the file is
+written asynchronously a few seconds later. Call flush() on shutdown to
+write the pending changes synchronously.
+
+Usage:
+> store = FrecencyStore(ARIA_CONFIG_HOME / 'launcher.frecency')
+> store.bump('firefox.desktop')
+> store.boost('firefox.desktop')  # 0.5
+
+"""
+import json
+import math
+import time
+from pathlib import Path
+
+from gi.repository import GLib, Gio
+
+from aria_shell.utils import Timer
+from aria_shell.utils.logger import get_loggers
+
+
+DBG, INF, WRN, ERR, CRI = get_loggers(__name__)
+
+
+# after this time (in seconds) the score of a key is halved
+HALF_LIFE = 14 * 24 * 60 * 60
+
+# keys with a decayed score lower than this are dropped on save
+MIN_SCORE = 0.01
+
+# seconds to wait before writing the changes to disk
+SAVE_DELAY = 5
+
+
+class FrecencyStore:
+    """
+    Frecency scores of keys, persisted in a JSON file.
+
+    Args:
+        path: the file where to persist the scores
+        half_life: seconds needed for a score to decay to half its value
+    """
+    def __init__(self, path: Path, half_life: float = HALF_LIFE):
+        self.path = path
+        self._decay = math.log(2) / half_life
+        # key => (score, time of the last use), None until loaded
+        self._entries: dict[str, tuple[float, float]] | None = None
+        self._save_timer: Timer | None = None
+        self._dirty = False
+
+    def __repr__(self):
+        return f"<FrecencyStore '{self.path}'>"
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    @property
+    def entries(self) -> dict[str, tuple[float, float]]:
+        """All the stored (score, last_use) entries, loaded on first access."""
+        if self._entries is None:
+            self._entries = self._load()
+        return self._entries
+
+    def score(self, key: str, now: float | None = None) -> float:
+        """The decayed score of key, 0 if never used."""
+        entry = self.entries.get(key)
+        if entry is None:
+            return 0.0
+        score, last_use = entry
+        if now is None:
+            now = time.time()
+        return score * math.exp(-self._decay * max(now - last_use, 0))
+
+    def boost(self, key: str, now: float | None = None) -> float:
+        """The score of key mapped in the 0..1 range, to add to priorities."""
+        score = self.score(key, now)
+        return score / (score + 1)
+
+    def bump(self, key: str, now: float | None = None):
+        """Record a use of key, the file will be written a bit later."""
+        if now is None:
+            now = time.time()
+        self.entries[key] = (self.score(key, now) + 1, now)
+        self._dirty = True
+        if self._save_timer is None:
+            self._save_timer = Timer(SAVE_DELAY, self._save_async)
+
+    def flush(self):
+        """Write the pending changes now, blocking. Use on shutdown."""
+        if self._save_timer:
+            self._save_timer.stop()
+            self._save_timer = None
+        if self._dirty:
+            try:
+                self.path.write_bytes(self._serialize())
+            except OSError as e:
+                ERR(f'Cannot save frecency file {self.path}: {e}')
+
+    def _load(self) -> dict[str, tuple[float, float]]:
+        try:
+            with self.path.open('rb') as f:
+                data = json.load(f)
+            entries = {key: (float(score), float(last_use))
+                       for key, (score, last_use) in data.items()}
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError, TypeError, AttributeError) as e:
+            WRN(f'Ignoring invalid frecency file {self.path}: {e}')
+            return {}
+        DBG(f'Loaded {len(entries)} frecency entries from {self.path}')
+        return entries
+
+    def _serialize(self) -> bytes:
+        """The entries as JSON, also forgetting the ones decayed too much."""
+        self._dirty = False
+        now = time.time()
+        self._entries = {key: entry for key, entry in self.entries.items()
+                         if self.score(key, now) >= MIN_SCORE}
+        return json.dumps(self._entries, separators=(',', ':')).encode()
+
+    def _save_async(self) -> bool:
+        self._save_timer = None
+
+        def _save_done(file: Gio.File, result: Gio.AsyncResult):
+            try:
+                file.replace_contents_finish(result)
+            except GLib.Error as e:
+                ERR(f'Cannot save frecency file {self.path}: {e.message}')
+
+        file = Gio.File.new_for_path(self.path.as_posix())
+        file.replace_contents_bytes_async(
+            GLib.Bytes.new(self._serialize()), None, False,
+            Gio.FileCreateFlags.NONE, None, _save_done
+        )
+        return False  # one-shot timer
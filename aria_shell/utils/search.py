@@ -0,0 +1,534 @@
+"""
+
+A small in-memory search index, to answer text queries without scanning
+the whole dataset on each keystroke.
+
+Every entry is stored by key together with its text fields, lowered and
+with the position of the words already computed. Matches are ranked with
+the fuzzy_score() function, from 10 (exact match) down to ~1 (a loose
+subsequence match), and each kind of match has its own lookup table:
+
+- the texts, and their suffixes starting at each word, are kept sorted:
+  the prefix and the word start matches are found with a binary search
+- all the 1, 2 and 3 characters long substrings (grams) of the texts are
+  kept in posting tables: the substring matches are found by intersecting
+  a few small sets, instead of looking at every single entry
+- the acronyms are kept sorted, like the texts
+- only the subsequence matches must be scored one by one, on the few
+  entries that pass a filter on the grams
+
+So the matches are found from the best kind to the worst, and a search
+limited to the best N results stops as soon as it has found them: broad
+queries, that match most of the entries, are as fast as the narrow ones.
+
+The index also remember the last query: when the new query extends the
+previous one (the user typed one more char) only the previous matches
+are checked again.
+
+Usage:
+> index = SearchIndex()
+> index.add('firefox', 'Firefox', 'firefox.desktop', 'Browse the web')
+> index.search('fire')  # {'firefox': 8.57}
+> index.search('f', limit=10)  # only the 10 best matches
+
+"""
+from bisect import bisect_left, bisect_right
+from collections.abc import Callable, Collection, Hashable, Iterable, Iterator
+from itertools import count, repeat
+from operator import itemgetter
+from typing import NamedTuple
+
+
+GRAM_SIZE = 3
+
+# greater than any char, to find the end of a prefix range with bisect
+MAX_CHAR = '\U0010ffff'
+
+# max number of chars matched in the middle of a word for a fuzzy match
+# (SearchIndex._fuzzy_candidates() relies on this being at most 1)
+FUZZY_MAX_SCATTERED = 1
+
+# scores of the match kinds, see fuzzy_score()
+EXACT_SCORE = 10
+WORD_START_SCORE = 7
+SUBSTRING_SCORE = 6
+
+# subtracted from the score for each field before the matching one
+FIELD_PENALTY = 0.01
+
+# lowest score of each kind of match, best first, see score_tier(). A bit
+# lower than the fuzzy_score() ones, to make room for the FIELD_PENALTY
+TIER_FLOORS = (9.5, 7.5, 6.5, 5.75, 4.95, 0)
+
+
+class SearchField(NamedTuple):
+    """A text field, prepared for fast scoring."""
+    text: str             # the lowered text
+    starts: tuple         # positions of the words first char
+    acronym: str          # the first char of each word
+
+    @classmethod
+    def from_text(cls, text: str) -> SearchField:
+        """Split text in words at spaces, punctuation and camelCase humps."""
+        starts = []
+        prev = ''
+        for i, char in enumerate(text):
+            if char.isalnum() and (not prev.isalnum()
+                                   or (char.isupper() and prev.islower())):
+                starts.append(i)
+            prev = char
+        lowered = text.lower()
+        return cls(
+            text=lowered,
+            starts=tuple(starts),
+            acronym=''.join(lowered[i] for i in starts),
+        )
+
+
+def prefix_score(query_len: int, text_len: int) -> float:
+    """Score of a query found at the start of the text (shorter texts first)."""
+    if query_len == text_len:
+        return EXACT_SCORE
+    return 8 + query_len / text_len
+
+
+def acronym_score(query_len: int, acronym_len: int) -> float:
+    """Score of a query matching the first letters of the words."""
+    return 5 + query_len / acronym_len / 2
+
+
+def fuzzy_score(query: str, field: SearchField, fuzzy: bool = True) -> float:
+    """
+    How well query match the field, query must be lowercase.
+
+    Return:
+        10 for an exact match
+        8..9 if the field starts with query (shorter fields first)
+        7 if query is found at the start of a word
+        6 if query is found in the middle of a word
+        5..5.5 if query match the first letters of the words (acronym)
+        1..4.9 if all the query chars are found in order (subsequence)
+        0 if there is no match at all
+    """
+    text = field.text
+
+    # substring match
+    pos = text.find(query)
+    if pos == 0:
+        return prefix_score(len(query), len(text))
+    if pos > 0:
+        while pos >= 0:
+            if pos in field.starts:
+                return WORD_START_SCORE
+            pos = text.find(query, pos + 1)
+        return SUBSTRING_SCORE
+
+    if not fuzzy:
+        return 0
+
+    # acronym match, es: 'lo' => 'LibreOffice'
+    if field.acronym.startswith(query):
+        return acronym_score(len(query), len(field.acronym))
+
+    return subsequence_score(query, field)
+
+
+def subsequence_score(query: str, field: SearchField) -> float:
+    """The fuzzy_score() of query, when not found as substring or acronym.
+
+    The first char must be at the start of a word, the others should start
+    a word or follow the previous one. Penalize the chars scattered in the
+    middle of the words (and the number of chars skipped to reach them).
+    """
+    # (the acronym chars are the chars at the word starts)
+    text, starts, acronym = field
+    word = acronym.find(query[0])
+    if word < 0:
+        return 0
+    pos = starts[word]
+    score = 4.0
+    scattered = 0
+    for char in query[1:]:
+        next_pos = text.find(char, pos + 1)
+        if next_pos < 0:
+            return 0
+        at_start = next_pos in starts
+        if not at_start and next_pos != pos + 1:
+            # prefer the same char at the start of a following word
+            word = acronym.find(char, bisect_right(starts, next_pos))
+            if word >= 0:
+                next_pos = starts[word]
+                at_start = True
+            else:
+                scattered += 1
+                if scattered > FUZZY_MAX_SCATTERED:
+                    return 0
+                score -= (next_pos - pos) * 0.2
+        if at_start:
+            score += 0.25
+        pos = next_pos
+    return min(max(score, 1.0), 4.9)
+
+
+def score_tier(score: float) -> int:
+    """The kind of match of a score: 0 for exact matches, 1 for prefixes,
+    up to 5 for subsequences. Use it to rank by something else (es: usage)
+    without mixing up the kinds of match."""
+    for tier, floor in enumerate(TIER_FLOORS):
+        if score >= floor:
+            return tier
+    return len(TIER_FLOORS) - 1
+
+
+# (serial, score) of some matches, best first
+Matches = Iterable[tuple[int, float]]
+
+
+class SearchIndex[KeyT: Hashable]:
+    """
+    Index of text fields, searchable by substring or fuzzy match.
+
+    Queries must be already lowercase, fields are lowered by the index.
+
+    All the matches are ranked with the same scores of match(), the best
+    fuzzy_score() of the fields. New entries are appended to the sorted
+    tables, that are sorted again (or compacted, after many removals) by
+    prepare() or by the next search.
+
+    Args:
+        fuzzy_fields: number of fields (from the first one) where to do fuzzy
+                      matching, the other fields only match by substring.
+                      Long fields, like descriptions, should not be fuzzy
+                      matched as they would match almost any query.
+    """
+    def __init__(self, fuzzy_fields: int = 2):
+        self._fuzzy_fields = fuzzy_fields
+        # key => (field1, field2, ...)
+        self._fields: dict[KeyT, tuple[SearchField, ...]] = {}
+        # each version of an entry has its own serial, so the sorted tables
+        # can keep the removed ones until the next compaction
+        self._serials = count()
+        self._serial_of: dict[KeyT, int] = {}
+        self._entries: dict[int, tuple[KeyT, tuple[SearchField, ...]]] = {}
+        self._removed = 0
+        # one table for each field, (text, serial) sorted by text
+        self._texts: list[list[tuple[str, int]]] = []  # whole texts
+        self._words: list[list[tuple[str, int]]] = []  # from the other words
+        self._acronyms: list[list[tuple[str, int]]] = []  # fuzzy fields only
+        self._unsorted = False
+        # one table for each field, gram => {serial1, serial2, ...}
+        self._grams: list[dict[str, set[int]]] = []  # 1, 2 and 3 chars grams
+        self._starts: list[dict[str, set[int]]] = []  # words first char
+        # last query, its substring matches (by field) and all its matches
+        # (if the search was not stopped by the limit)
+        self._last_query = ''
+        self._last_contains: dict[int, set[int]] = {}
+        self._last_matches: set[int] | None = None
+
+    def __len__(self) -> int:
+        return len(self._fields)
+
+    def __contains__(self, key: KeyT) -> bool:
+        return key in self._fields
+
+    def keys(self) -> Iterable[KeyT]:
+        """All the keys in the index."""
+        return self._fields.keys()
+
+    def add(self, key: KeyT, *fields: str | None):
+        """Add (or replace) an entry in the index. Empty fields never match,
+        but keep their place (and so the preference of the other fields)."""
+        if key in self._fields:
+            self._unpost(key)
+        fields = tuple(SearchField.from_text(field or '') for field in fields)
+        serial = next(self._serials)
+        self._fields[key] = fields
+        self._serial_of[key] = serial
+        self._entries[serial] = (key, fields)
+        while len(self._texts) < len(fields):
+            for tables, table in ((self._texts, []), (self._words, []),
+                                  (self._acronyms, []), (self._grams, {}),
+                                  (self._starts, {})):
+                tables.append(table)
+
+        for i, field in enumerate(fields):
+            text = field.text
+            if not text:
+                continue
+            self._texts[i].append((text, serial))
+            self._words[i].extend((text[p:], serial) for p in field.starts if p)
+            grams = self._grams[i]
+            for gram in self._text_grams(text):
+                grams.setdefault(gram, set()).add(serial)
+            if i < self._fuzzy_fields:
+                self._acronyms[i].append((field.acronym, serial))
+                starts = self._starts[i]
+                for p in field.starts:
+                    starts.setdefault(text[p], set()).add(serial)
+        self._unsorted = True
+        self._forget_last_query()
+
+    def remove(self, key: KeyT):
+        """Remove an entry from the index, if present."""
+        if key in self._fields:
+            self._unpost(key)
+            del self._fields[key]
+            self._forget_last_query()
+
+    def clear(self):
+        """Remove all the entries from the index."""
+        self._fields.clear()
+        self._serial_of.clear()
+        self._entries.clear()
+        self._removed = 0
+        for tables in (self._texts, self._words, self._acronyms,
+                       self._grams, self._starts):
+            tables.clear()
+        self._forget_last_query()
+
+    def search(self, query: str, limit: int = 0) -> dict[KeyT, float]:
+        """Return the matching keys with their match priority.
+
+        With a limit only the best limit matches are returned (the ones
+        with the same priority of the last are chosen arbitrarily).
+        """
+        if not query:
+            self._forget_last_query()
+            return dict.fromkeys(self._fields, 1)
+
+        self.prepare()
+        last = self._last_query
+        narrow = bool(last) and query.startswith(last)
+        found: dict[int, float] = {}
+        contains: dict[int, set[int]] = {}
+        all_matches = None
+        matches = self._matches(query, contains, narrow)
+        if self._collect(matches, found, limit):
+            all_matches = set(found)
+            # the fuzzy matches are only needed when the others are not enough
+            if len(query) > 1 and self._fuzzy_fields:
+                fuzzy = self._fuzzy_matches(query, found, narrow)
+                all_matches.update(serial for serial, _ in fuzzy)
+                self._collect([fuzzy], found, limit)
+
+        self._last_query = query
+        self._last_contains = contains
+        self._last_matches = all_matches
+        entries = self._entries
+        return {entries[serial][0]: score for serial, score in found.items()}
+
+    def score(self, query: str, key: KeyT) -> float:
+        """Priority of query for the key entry, 0 if it does not match."""
+        fields = self._fields.get(key)
+        return self.match(query, fields) if fields else 0
+
+    def match(self, query: str, fields: tuple[SearchField, ...]) -> float:
+        """Best priority of query in fields, slightly preferring first fields."""
+        best = 0
+        for i, field in enumerate(fields):
+            if query in field.text:
+                score = fuzzy_score(query, field, fuzzy=False) - i * FIELD_PENALTY
+                if score > best:
+                    best = score
+        if best:
+            return best  # a substring match always beats the fuzzy ones
+
+        for i in range(min(self._fuzzy_fields, len(fields))):
+            score = fuzzy_score(query, fields[i])
+            if score:
+                score -= i * FIELD_PENALTY
+                if score > best:
+                    best = score
+        return best
+
+    def _matches(self, query: str, contains: dict[int, set[int]],
+                 narrow: bool) -> Iterator[Matches]:
+        """Yield the matches of query, grouped by kind, from the best kind,
+        but the fuzzy matches.
+
+        Every kind scores lower than the previous ones, so the first time a
+        serial is yielded it comes with its best score. The substring matches
+        of each field are stored in contains, for the next query.
+        """
+        live = self._entries
+        yield self._length_scored(self._texts, query, prefix_score)
+
+        for i, words in enumerate(self._words):
+            lo, hi = self._prefix_range(words, query)
+            serials = map(itemgetter(1), words[lo:hi])
+            if self._removed:
+                serials = (serial for serial in serials if serial in live)
+            yield zip(serials, repeat(WORD_START_SCORE - i * FIELD_PENALTY))
+
+        for i in range(len(self._grams)):
+            contains[i] = self._substring_matches(query, i, narrow)
+            yield zip(contains[i], repeat(SUBSTRING_SCORE - i * FIELD_PENALTY))
+
+        # a single char always match as a substring
+        if len(query) > 1 and self._fuzzy_fields:
+            yield self._length_scored(self._acronyms[:self._fuzzy_fields],
+                                      query, acronym_score)
+
+    def _substring_matches(self, query: str, i: int, narrow: bool) -> set[int]:
+        """Serials with query in the field i."""
+        grams = self._grams[i]
+        if len(query) <= GRAM_SIZE:
+            return grams.get(query, set())
+        if narrow and i in self._last_contains:
+            pool = self._last_contains[i]
+        else:
+            pool = self._intersect([grams.get(query[p:p + GRAM_SIZE])
+                                    for p in range(len(query) - GRAM_SIZE + 1)])
+        entries = self._entries
+        return {serial for serial in pool if query in entries[serial][1][i].text}
+
+    def _length_scored(self, tables: list[list[tuple[str, int]]], query: str,
+                       score: Callable[[int, int], float]) -> Matches:
+        """Entries of the tables starting with query, scored by
+        score(query length, text length) minus the field penalty."""
+        matches = []
+        for i, table in enumerate(tables):
+            lo, hi = self._prefix_range(table, query)
+            if lo == hi:
+                continue
+            texts = table[lo:hi]
+            # broad queries match a lot of texts, but only a few lengths
+            lengths = list(map(len, map(itemgetter(0), texts)))
+            penalty = i * FIELD_PENALTY
+            scores = {length: score(len(query), length) - penalty
+                      for length in set(lengths)}
+            matches.extend(zip(map(itemgetter(1), texts),
+                               map(scores.__getitem__, lengths)))
+        if self._removed:
+            live = self._entries
+            matches = [match for match in matches if match[0] in live]
+        matches.sort(key=itemgetter(1), reverse=True)
+        return matches
+
+    def _fuzzy_matches(self, query: str, found: dict[int, float],
+                       narrow: bool) -> Matches:
+        """Subsequence matches in the fuzzy fields, of the serials not found
+        by the better kinds of match."""
+        entries = self._entries
+        best: dict[int, float] = {}
+        for i in range(min(self._fuzzy_fields, len(self._grams))):
+            if narrow and self._last_matches is not None:
+                # matches of a query always match all its prefixes too
+                pool = self._last_matches.intersection(self._starts[i].get(query[0], ()))
+            else:
+                pool = self._fuzzy_candidates(query, i)
+            penalty = i * FIELD_PENALTY
+            for serial in pool.difference(found):
+                # not a substring or an acronym, or it would be found
+                if score := subsequence_score(query, entries[serial][1][i]):
+                    score -= penalty
+                    if score > best.get(serial, 0):
+                        best[serial] = score
+        return sorted(best.items(), key=itemgetter(1), reverse=True)
+
+    def _fuzzy_candidates(self, query: str, i: int) -> set[int]:
+        """Serials that can match query as a subsequence of the field i.
+        Can have false positives.
+
+        The first char must start a word and each following char must
+        follow the previous one or start a word, except one scattered char.
+        """
+        starts, grams = self._starts[i], self._grams[i]
+        pool = self._intersect([starts.get(query[0])] +
+                               [grams.get(char) for char in set(query[1:])])
+        if not pool or len(query) < 3:
+            return pool  # a single pair can always be the scattered one
+
+        # serials where each pair is contiguous or the second char starts a word
+        empty = set()
+        pairs = [pool & grams.get(query[p:p + 2], empty) |
+                 pool & starts.get(query[p + 1], empty)
+                 for p in range(len(query) - 1)]
+        # serials where all the pairs but (at most) one are good
+        result = set()
+        before = pool
+        for p, pair in enumerate(pairs):
+            after = before.intersection(*pairs[p + 1:])
+            result |= after
+            before = before & pair
+            if not before:
+                break
+        return result
+
+    @staticmethod
+    def _collect(matches: Iterable[Matches], found: dict[int, float],
+                 limit: int) -> bool:
+        """Add the matches not yet found, until limit (if any) is reached.
+        Return False if stopped by the limit."""
+        for kind in matches:
+            for serial, score in kind:
+                if serial not in found:
+                    found[serial] = score
+                    if len(found) == limit:
+                        return False
+        return True
+
+    @staticmethod
+    def _prefix_range(table: list[tuple[str, int]], prefix: str) -> tuple[int, int]:
+        """Slice of the sorted table with the texts starting with prefix."""
+        lo = bisect_left(table, (prefix,))
+        return lo, bisect_left(table, (prefix + MAX_CHAR,), lo)
+
+    @staticmethod
+    def _intersect(postings: list[Collection[int] | None]) -> set[int]:
+        """Serials that are in all the postings."""
+        if not postings or not all(postings):
+            return set()
+        # intersect starting from the smallest
+        postings.sort(key=len)
+        return set(postings[0]).intersection(*postings[1:])
+
+    @staticmethod
+    def _text_grams(text: str) -> set[str]:
+        return {text[p:p + size]
+                for size in range(1, GRAM_SIZE + 1)
+                for p in range(len(text) - size + 1)}
+
+    def prepare(self):
+        """Sort the tables with new entries, drop the removed ones.
+
+        The next search does it anyway, call it after adding a lot of
+        entries to not slow down the first search.
+        """
+        tables = self._texts + self._words + self._acronyms
+        if self._removed > len(self._entries):
+            live = self._entries
+            for table in tables:
+                table[:] = [entry for entry in table if entry[1] in live]
+            self._removed = 0
+        if self._unsorted:
+            # new entries are appended, timsort merges them in linear time
+            for table in tables:
+                table.sort()
+            self._unsorted = False
+
+    def _unpost(self, key: KeyT):
+        """Remove key from the posting tables, the sorted tables keep it
+        until the next compaction."""
+        serial = self._serial_of.pop(key)
+        _, fields = self._entries.pop(serial)
+        self._removed += 1
+        for i, field in enumerate(fields):
+            if not field.text:
+                continue
+            tables = [(self._grams[i], self._text_grams(field.text))]
+            if i < self._fuzzy_fields:
+                tables.append((self._starts[i],
+                               {field.text[p] for p in field.starts}))
+            for table, grams in tables:
+                for gram in grams:
+                    posting = table.get(gram)
+                    if posting is not None:
+                        posting.discard(serial)
+                        if not posting:
+                            del table[gram]
+
+    def _forget_last_query(self):
+        self._last_query = ''
+        self._last_contains = {}
+        self._last_matches = None
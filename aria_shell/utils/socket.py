@@ -1,7 +1,14 @@
+import os
+import re
+import time
+from collections import deque
 from collections.abc import Callable
+from dataclasses import dataclass
 from pathlib import Path
+from typing import Any, Protocol
 from gi.repository import GLib, Gio
 
+from aria_shell.utils import Timer
 from aria_shell.utils.logger import get_loggers
 
 
@@ -10,6 +17,64 @@ DBG, INF, WRN, ERR, CRI = get_loggers(__name__)
 
 SocketSendCallback = Callable[[bool], None]        # send_cb(result: bool)
 SocketRecvCallback = Callable[[bytes|None], None]  # recv_cb(data: bytes|None)
+SocketReplyCallback = Callable[[Any], None]        # reply_cb(reply: Any|None)
+
+# seconds to wait before reconnecting a lost monitored connection, the
+# delay is doubled after each failed attempt, up to the max
+RECONNECT_MIN_DELAY = 1
+RECONNECT_MAX_DELAY = 30
+
+
+class SocketFramer(Protocol):
+    """Split the received bytes in messages, fe: SwayFramer."""
+    def feed(self, data: bytes) -> list: ...
+    def reset(self): ...
+
+
+def split_view(view: memoryview, separator: bytes) -> list[memoryview]:
+    """Split view at separator, without copying the data."""
+    parts = []
+    start = 0
+    for match in re.finditer(re.escape(separator), view):
+        parts.append(view[start:match.start()])
+        start = match.end()
+    parts.append(view[start:])
+    return parts
+
+
+class BufferPool:
+    """
+    Reusable receive buffers, to not allocate (and zero) a big buffer for
+    each reply. Buffers bigger than max_size are not kept.
+    """
+    def __init__(self, size: int, max_size: int, max_free: int = 4):
+        self.size = size
+        self.max_size = max_size
+        self.max_free = max_free
+        self._free: list[bytearray] = []
+
+    def take(self) -> bytearray:
+        """A buffer of at least size bytes."""
+        return self._free.pop() if self._free else bytearray(self.size)
+
+    def give(self, buffer: bytearray):
+        """Return a buffer to the pool, no views of it must be around."""
+        if len(buffer) <= self.max_size and len(self._free) < self.max_free:
+            self._free.append(buffer)
+
+
+@dataclass(eq=False, slots=True)
+class SocketRequest:
+    """A request in the SocketClient pipeline."""
+    data: bytes
+    callback: SocketReplyCallback | None
+    timeout: float | None
+    timer: Timer | None = None
+    connection: Gio.SocketConnection | None = None  # oneshot only
+    cancellable: Gio.Cancellable | None = None      # oneshot only
+    reply: bytearray | None = None                  # oneshot only
+    watch: int = 0                                  # oneshot zero_copy only
+    done: bool = False
 
 
 def autoconnect(func):
@@ -34,19 +99,57 @@ class SocketClient:
         and would make the usage of the class far more complex. As the class is used
         for local socket only this should not be a problem.
 
+    REQUESTS:
+        request() queue the data in a pipeline, up to max_in_flight requests
+        are sent without waiting for the previous replies, and each reply is
+        given to the callback of its request. On errors or when the request
+        timeout expires the callback receive None.
+
+        On a persistent connection the replies are split by the framer (one
+        reply for each received chunk without a framer), and the callbacks
+        are called in the requests order. A timeout, or any other error,
+        closes the connection and fails all the requests in flight, as the
+        following replies cannot be matched anymore.
+
+        With oneshot=True each request use its own connection, and the reply
+        is all the data received until the server close it. The requests in
+        flight are served in parallel, so with max_in_flight > 1 the
+        callbacks are called in the order the replies complete, not in the
+        requests order. Use max_in_flight=1 when the order matters.
+
+    ZERO COPY:
+        With zero_copy=True the data is read straight from the file
+        descriptor into reusable buffers, and the callbacks of request() and
+        monitor() receive a memoryview of it, instead of a new bytes copy.
+        The view is only valid during the callback (it is released after),
+        parsers must decode or copy what they need. Framers receive the
+        views too.
+
     WARNING:
-        During an async request no other sync and async calls are allowed,
-        result in a CRITICAL error and a None bytes data received in callback.
+        The send/receive/monitor calls allow a single async operation at a
+        time, other calls result in a CRITICAL error and a None bytes data
+        received in callback. Do not mix them with request() on the same
+        persistent connection.
 
     """
     PRIORITY = GLib.PRIORITY_DEFAULT
     BUFFER_SIZE = 1024 * 1024
 
-    def __init__(self, socket_path: Path | str, line_buffered = False):
+    def __init__(self, socket_path: Path | str, line_buffered = False, *,
+                 framer: SocketFramer | None = None,
+                 oneshot: bool = False,
+                 max_in_flight: int = 1,
+                 timeout: float | None = None,
+                 zero_copy: bool = False):
         """
         Args:
             socket_path: the unix path of the socket to connect
-            line_buffered: read the socket line by line
+            line_buffered: read the socket line by line (no empty lines)
+            framer: split the replies of the requests on a persistent connection
+            oneshot: the server close the connection after each reply
+            max_in_flight: max number of requests waiting for a reply
+            timeout: default timeout of the requests, in seconds
+            zero_copy: pass views of reusable buffers to the callbacks
         Raise:
             RuntimeError: if the socket is not valid
         """
@@ -63,7 +166,38 @@ class SocketClient:
         self._istream: Gio.InputStream | None = None
         self._ostream: Gio.OutputStream | None = None
         self._dstream: Gio.DataInputStream | None = None
-        self._cancellable: Gio.Cancellable | None = None
+        self._cancellable = Gio.Cancellable()
+        self._generation = 0  # incremented on disconnect, to ignore stale reads
+
+        # requests pipeline
+        self._framer = framer
+        self._oneshot = oneshot
+        self.max_in_flight = max_in_flight
+        self.timeout = timeout
+        self._requests: deque[SocketRequest] = deque()   # waiting to be sent
+        self._in_flight: deque[SocketRequest] = deque()  # waiting the reply
+        self._to_write: deque[SocketRequest] = deque()   # persistent only
+        self._reading_replies = False
+
+        # zero copy reads
+        self.zero_copy = zero_copy
+        self._buffers = BufferPool(self.BUFFER_SIZE, 4 * self.BUFFER_SIZE)
+        self._recv_buffer: bytearray | None = None  # persistent connection
+        self._read_watch = 0
+
+        # supervised monitor
+        self._monitor_cb: SocketRecvCallback | None = None
+        self._on_reconnect: Callable[[], None] | None = None
+        self._reconnect_timer: Timer | None = None
+        self._reconnect_delay = RECONNECT_MIN_DELAY
+        self._down_since = 0.0
+
+        # counters
+        self.reconnects = 0
+        self.downtime = 0.0  # seconds spent reconnecting
+        self.requests_sent = 0
+        self.requests_failed = 0
+        self.requests_timed_out = 0
 
     def __repr__(self):
         return f'<SocketClient fd={self.fd} path={self.path}>'
@@ -71,7 +205,6 @@ class SocketClient:
     def connect(self):
         """Open the socket connection."""
         if not self.connected:
-            self._cancellable = Gio.Cancellable()
             self._connection = self._client.connect(self._address, self._cancellable)
             self._ostream = self._connection.get_output_stream()
             self._istream = self._connection.get_input_stream()
@@ -80,19 +213,40 @@ class SocketClient:
             DBG('Socket connected %s', self)
 
     def disconnect(self):
-        """Close the socket connection."""
+        """Close the socket connection, also dropping the pending requests."""
+        for req in (*self._requests, *self._in_flight):
+            self._stop_timer(req)
+            self._abort_oneshot(req)
+            req.done = True
+        self._requests.clear()
+        self._in_flight.clear()
+        self._to_write.clear()
+        self._monitor_cb = self._on_reconnect = None
+        if self._reconnect_timer:
+            self._reconnect_timer.stop()
+            self._reconnect_timer = None
+        self._close()
+
+    def _close(self):
+        """Close the connection (and cancel all the async operations)."""
         # NOTE: not really sure about this implementation... :/
+        self._cancellable.cancel()
+        self._cancellable = Gio.Cancellable()
+        self._generation += 1
+        self._reading_replies = False
+        if self._read_watch:
+            GLib.source_remove(self._read_watch)
+            self._read_watch = 0
         if self.connected:
             DBG('Closing socket %s', self)
-            self._cancellable.cancel()
             for stream in (self._ostream, self._istream, self._dstream):
                 if stream and stream.has_pending():
                     stream.clear_pending()
                 if stream:
                     stream.close()
             self._connection.close()
-            self._connection = self._cancellable = None
-            self._ostream = self._istream = self._dstream = None
+        self._connection = None
+        self._ostream = self._istream = self._dstream = None
 
     @property
     def connected(self) -> bool:
@@ -102,10 +256,30 @@ class SocketClient:
     @property
     def busy(self) -> bool:
         """True if an async operation is in progress"""
-        return self.connected and (
+        return self.pending > 0 or self.connected and (
             self._ostream.has_pending() or self._istream.has_pending()
         )
 
+    @property
+    def pending(self) -> int:
+        """Number of requests queued or waiting for the reply."""
+        return len(self._requests) + len(self._in_flight)
+
+    def stats(self) -> dict:
+        downtime = self.downtime
+        if self._down_since:
+            downtime += time.monotonic() - self._down_since
+        return {
+            'connected': bool(self.connected),
+            'reconnects': self.reconnects,
+            'downtime': round(downtime, 3),
+            'requests_sent': self.requests_sent,
+            'requests_failed': self.requests_failed,
+            'requests_timed_out': self.requests_timed_out,
+            'requests_queued': len(self._requests),
+            'requests_in_flight': len(self._in_flight),
+        }
+
     @property
     def path(self) -> str:
         """The address path as a string."""
@@ -153,38 +327,415 @@ class SocketClient:
         self.send(data, lambda _: self.receive(callback))
 
     @autoconnect
-    def monitor(self, callback: SocketRecvCallback):
-        """Keep an eye on the socket."""
+    def monitor(self, callback: SocketRecvCallback,
+                on_reconnect: Callable[[], None] | None = None):
+        """Keep an eye on the socket.
+
+        If on_reconnect is given the connection is supervised: when lost
+        (the callback receive None) it is established again, retrying with
+        an exponential backoff, and then on_reconnect is called, fe: to
+        subscribe again and to resync the state lost in the meantime.
+        """
         DBG('Monitoring socket %s', self)
+        self._monitor_cb = callback
+        self._on_reconnect = on_reconnect
         self._read_async(callback, monitor=True)
 
+    def _monitor_lost(self):
+        """The monitored connection is gone, reconnect if supervised."""
+        if self._on_reconnect is None or self._reconnect_timer:
+            return
+        WRN('Connection lost on socket %s, reconnecting', self)
+        self._close()
+        self._down_since = time.monotonic()
+        self._reconnect_delay = RECONNECT_MIN_DELAY
+        self._reconnect_timer = Timer(self._reconnect_delay, self._reconnect)
+
+    def _reconnect(self) -> bool:
+        self._reconnect_timer = None
+        try:
+            self.connect()
+        except GLib.Error as e:
+            self._reconnect_delay = min(self._reconnect_delay * 2,
+                                        RECONNECT_MAX_DELAY)
+            DBG('Cannot reconnect socket %s, retry in %ds. Error: %s',
+                self, self._reconnect_delay, e)
+            self._reconnect_timer = Timer(self._reconnect_delay, self._reconnect)
+            return False
+        self.reconnects += 1
+        self.downtime += time.monotonic() - self._down_since
+        self._down_since = 0.0
+        INF('Socket reconnected %s', self)
+        self._read_async(self._monitor_cb, monitor=True)
+        self._on_reconnect()
+        return False  # one-shot timer
+
+    def request(self, data: str | bytes, callback: SocketReplyCallback = None,
+                timeout: float | None = None):
+        """Send data and give the reply to callback (None on errors).
+
+        Requests are sent in order, see the class doc for the details.
+        The timeout (in seconds) default to the timeout of the client.
+        """
+        req = SocketRequest(
+            data=data.encode() if isinstance(data, str) else data,
+            callback=callback,
+            timeout=self.timeout if timeout is None else timeout,
+        )
+        self._requests.append(req)
+        self._process_requests()
+
+    # ------------------
+    # requests pipeline
+    # ------------------
+    def _process_requests(self):
+        while self._requests and len(self._in_flight) < self.max_in_flight:
+            req = self._requests.popleft()
+            self._in_flight.append(req)
+            self.requests_sent += 1
+            if req.timeout:
+                req.timer = Timer(req.timeout, self._request_timeout, req)
+            if self._oneshot:
+                self._send_oneshot(req)
+            else:
+                self._to_write.append(req)
+                self._write_next()
+
+    def _finish(self, req: SocketRequest, reply: Any):
+        """Complete the request, its callback is called only once."""
+        if req.done:
+            return
+        req.done = True
+        self._stop_timer(req)
+        if reply is None:
+            self.requests_failed += 1
+        if callable(req.callback):
+            req.callback(reply)
+
+    @staticmethod
+    def _stop_timer(req: SocketRequest):
+        if req.timer:
+            req.timer.stop()
+            req.timer = None
+
+    def _request_timeout(self, req: SocketRequest) -> bool:
+        req.timer = None  # the timer stop itself returning False
+        WRN('Request timed out on socket %s', self)
+        self.requests_timed_out += 1
+        if self._oneshot:
+            self._in_flight.remove(req)
+            self._abort_oneshot(req)
+            self._finish(req, None)
+        else:
+            self._fail_in_flight()
+        self._process_requests()
+        return False
+
+    def _fail_in_flight(self):
+        """Close the persistent connection, failing the requests in flight."""
+        failed = list(self._in_flight)
+        self._in_flight.clear()
+        self._to_write.clear()
+        self._close()
+        if self._framer is not None:
+            self._framer.reset()
+        for req in failed:
+            self._finish(req, None)
+
+    def _split_replies(self, data: bytes | memoryview) -> list:
+        """The replies completed by data, a single one without a framer."""
+        if self._framer is None:  # NOTE: framers can be falsy when empty
+            return [data]
+        return self._framer.feed(data)
+
+    # persistent connection: writes one after the other, a single read loop
+    def _write_next(self):
+        if not self._to_write or self._ostream and self._ostream.has_pending():
+            return
+        try:
+            self.connect()
+        except GLib.Error as e:
+            ERR('Cannot connect socket %s. Error: %s', self, e)
+            self._fail_in_flight()
+            return
+        req = self._to_write.popleft()
+        generation = self._generation
+
+        def _write_done(stream: Gio.OutputStream, result: Gio.AsyncResult):
+            if generation != self._generation:
+                return  # connection closed in the meantime
+            try:
+                stream.write_all_finish(result)
+            except GLib.Error as e:
+                ERR('Cannot send request on socket %s. Error: %s', self, e)
+                self._fail_in_flight()
+                self._process_requests()
+                return
+            self._write_next()
+            self._read_replies()
+
+        self._ostream.write_all_async(
+            req.data, self.PRIORITY, self._cancellable, _write_done
+        )
+
+    def _read_replies(self):
+        if self._reading_replies or not self._in_flight:
+            return
+        self._reading_replies = True
+        if self.zero_copy:
+            self._watch_replies()
+            return
+        generation = self._generation
+
+        def _read_done(stream: Gio.InputStream, result: Gio.AsyncResult):
+            if generation != self._generation:
+                return  # connection closed in the meantime
+            self._reading_replies = False
+            try:
+                data: bytes = stream.read_bytes_finish(result).get_data()
+            except GLib.Error as e:
+                ERR('Cannot read replies from socket %s. Error: %s', self, e)
+                data = b''
+            if not data:
+                self._fail_in_flight()
+            else:
+                replies = self._split_replies(data)
+                for reply in replies:
+                    if not self._in_flight:
+                        WRN('Unexpected reply on socket %s', self)
+                        break
+                    self._finish(self._in_flight.popleft(), reply)
+                self._read_replies()
+            self._process_requests()
+
+        self._istream.read_bytes_async(
+            self.BUFFER_SIZE, self.PRIORITY, self._cancellable, _read_done
+        )
+
+    def _watch_replies(self):
+        """Read the replies straight into the receive buffer."""
+        if self._recv_buffer is None:
+            self._recv_buffer = bytearray(self.BUFFER_SIZE)
+        fd = self.fd
+
+        def _readable() -> bool:
+            with memoryview(self._recv_buffer) as view:
+                try:
+                    size = self._read_into(fd, view)
+                except OSError as e:
+                    ERR('Cannot read replies from socket %s. Error: %s', self, e)
+                    size = 0
+                if size is None:
+                    return True  # nothing to read yet
+                generation = self._generation
+                if size == 0:
+                    self._fail_in_flight()
+                else:
+                    with view[:size] as chunk:
+                        replies = self._split_replies(chunk)
+                        for reply in replies:
+                            if not self._in_flight:
+                                WRN('Unexpected reply on socket %s', self)
+                                break
+                            self._finish(self._in_flight.popleft(), reply)
+            if generation != self._generation:
+                keep_watching = False  # closed, the watch is already removed
+            elif self._in_flight:
+                keep_watching = True
+            else:
+                self._read_watch = 0
+                self._reading_replies = False
+                keep_watching = False
+            self._process_requests()
+            return keep_watching
+
+        self._read_watch = self._add_read_watch(fd, _readable)
+
+    @staticmethod
+    def _read_into(fd: int, view: memoryview) -> int | None:
+        """Read into view, return the number of bytes read (0 at EOF)
+        or None if the non-blocking fd has no data ready."""
+        try:
+            return os.readv(fd, (view,))
+        except BlockingIOError:
+            return None
+
+    def _add_read_watch(self, fd: int, callback: Callable[[], bool]) -> int:
+        """Call callback when fd is readable, until it returns False."""
+        return GLib.io_add_watch(
+            fd, self.PRIORITY,
+            GLib.IOCondition.IN | GLib.IOCondition.HUP | GLib.IOCondition.ERR,
+            lambda _fd, _condition: callback()
+        )
+
+    # oneshot: a connection for each request, the reply is read until EOF
+    def _send_oneshot(self, req: SocketRequest):
+        try:
+            req.connection = self._client.connect(self._address, self._cancellable)
+        except GLib.Error as e:
+            ERR('Cannot connect socket %s. Error: %s', self, e)
+            self._in_flight.remove(req)
+            self._finish(req, None)
+            return
+        req.reply = bytearray()
+        req.cancellable = cancellable = Gio.Cancellable()
+
+        def _done(reply: bytes | None):
+            req.connection.close()
+            if req in self._in_flight:
+                self._in_flight.remove(req)
+                self._finish(req, reply)
+                self._process_requests()
+
+        def _write_done(stream: Gio.OutputStream, result: Gio.AsyncResult):
+            try:
+                stream.write_all_finish(result)
+            except GLib.Error as e:
+                if req.done:
+                    req.connection.close()
+                    return
+                ERR('Cannot send request on socket %s. Error: %s', self, e)
+                _done(None)
+            else:
+                if self.zero_copy:
+                    _watch_reply()
+                else:
+                    _read_next(req.connection.get_input_stream())
+
+        def _watch_reply():
+            buffer = self._buffers.take()
+            size = 0
+            fd = req.connection.get_socket().get_fd()
+
+            def _readable() -> bool:
+                nonlocal size
+                if size == len(buffer):
+                    buffer.resize(2 * len(buffer))  # grow in place, no copy
+                with memoryview(buffer) as view:
+                    try:
+                        read = self._read_into(fd, view[size:])
+                    except OSError as e:
+                        ERR('Cannot read reply from socket %s. Error: %s', self, e)
+                        read = 0
+                        size = -1
+                if read is None:
+                    return True  # nothing to read yet
+                if read > 0:
+                    size += read
+                    return True
+                req.watch = 0
+                if size < 0:
+                    _done(None)
+                else:
+                    with memoryview(buffer) as view, view[:size] as reply:
+                        _done(reply)
+                self._buffers.give(buffer)
+                return False
+
+            req.watch = self._add_read_watch(fd, _readable)
+
+        def _read_next(stream: Gio.InputStream):
+            stream.read_bytes_async(
+                self.BUFFER_SIZE, self.PRIORITY, cancellable, _read_done
+            )
+
+        def _read_done(stream: Gio.InputStream, result: Gio.AsyncResult):
+            try:
+                data: bytes = stream.read_bytes_finish(result).get_data()
+            except GLib.Error as e:
+                if req.done:
+                    req.connection.close()
+                else:
+                    ERR('Cannot read reply from socket %s. Error: %s', self, e)
+                    _done(None)
+                return
+            if data:
+                req.reply += data
+                _read_next(stream)
+            else:
+                _done(bytes(req.reply))
+
+        req.connection.get_output_stream().write_all_async(
+            req.data, self.PRIORITY, cancellable, _write_done
+        )
+
+    @staticmethod
+    def _abort_oneshot(req: SocketRequest):
+        """Stop the async operations of a oneshot request."""
+        if req.cancellable:
+            req.cancellable.cancel()  # the connection is closed by the callbacks
+        if req.watch:
+            GLib.source_remove(req.watch)
+            req.watch = 0
+            req.connection.close()
+
     # ----------------------
     # internal async readers
     # ----------------------
     def _read_async(self, callback: SocketRecvCallback, monitor=False):
-        if self._istream.has_pending():
+        if self._istream.has_pending() or self._read_watch:
             CRI(f'Cannot read data, socket is busy! {self}')
             if callable(callback):
                 callback(None)
         else:
             if self._line_buffered:
                 self._read_line_async(callback, monitor)
+            elif self.zero_copy:
+                self._read_bytes_into(callback, monitor)
             else:
                 self._read_bytes_async(callback, monitor)
 
+    def _read_bytes_into(self, callback: SocketRecvCallback, monitor=False):
+        """read bytes from the fd into the receive buffer"""
+        if self._recv_buffer is None:
+            self._recv_buffer = bytearray(self.BUFFER_SIZE)
+        fd = self.fd
+
+        def _readable() -> bool:
+            with memoryview(self._recv_buffer) as view:
+                try:
+                    size = self._read_into(fd, view)
+                except OSError as e:
+                    ERR('Cannot read bytes from socket %s. Error: %s', self, e)
+                    size = 0
+                if size is None:
+                    return True  # nothing to read yet
+                if size == 0:
+                    self._read_watch = 0
+                    callback(None)
+                    if monitor:
+                        self._monitor_lost()
+                    return False
+                DBG('Received %d bytes from socket %s', size, self)
+                with view[:size] as data:
+                    callback(data)
+            if not monitor:
+                self._read_watch = 0
+            return monitor
+
+        self._read_watch = self._add_read_watch(fd, _readable)
+
     def _read_bytes_async(self, callback: SocketRecvCallback, monitor=False):
         """read bytes from the InputStream self._istream"""
+        generation = self._generation
+
         def _read_next():
             self._istream.read_bytes_async(
                 self.BUFFER_SIZE, self.PRIORITY, self._cancellable, _read_done
             )
 
         def _read_done(stream: Gio.InputStream, result: Gio.AsyncResult):
+            if generation != self._generation:
+                return  # connection closed in the meantime
             try:
                 data: bytes = stream.read_bytes_finish(result).get_data()
             except GLib.Error as e:
                 ERR('Cannot read bytes from socket %s. Error: %s', self, e)
+                data = None
+            if not data:  # error or connection closed
                 callback(None)
+                if monitor:
+                    self._monitor_lost()
             else:
                 DBG('Received %d bytes from socket %s', len(data), self)
                 callback(data)
@@ -195,17 +746,27 @@ class SocketClient:
 
     def _read_line_async(self, callback: SocketRecvCallback, monitor=False):
         """read a line from the DataInputStream self._dstream"""
+        generation = self._generation
+
         def _read_next():
             self._dstream.read_line_async(
                 self.PRIORITY, self._cancellable, _read_done
             )
 
         def _read_done(stream: Gio.DataInputStream, result: Gio.AsyncResult):
+            if generation != self._generation:
+                return  # connection closed in the meantime
             try:
                 data, data_len = stream.read_line_finish(result)
             except GLib.Error as e:
                 ERR('Cannot read line from socket %s. Error: %s', self, e)
+                data = None
+            # NOTE: pygobject gives b'' both for an empty line and at the
+            # end of the stream, empty lines are taken as the end
+            if not data:  # error or connection closed
                 callback(None)
+                if monitor:
+                    self._monitor_lost()
             else:
                 DBG('Received %d bytes from socket %s', data_len, self)
                 callback(data)
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+
+Benchmark the round trip of a command sent with the aria-shell script.
+
+A fake aria shell is served on a temporary commands socket, replying OK
+to each request. The aria-shell script is then run N times, like a
+keybinding does, and the time of each run (process start, imports,
+request and reply) is reported. The time needed to just import the
+shell (and GTK) is reported for comparison, if gi is available, and the
+command runs are checked to not import gi at all.
+
+Usage:
+  python benchmarks/bench_cli_command.py [-n 30]
+
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+
+ROOT = Path(__file__).resolve().parent.parent
+SCRIPT = ROOT / 'aria_shell' / 'bin' / 'aria-shell'
+
+
+def fake_shell(runtime_dir: Path) -> socket.socket:
+    """Serve a fake commands socket in runtime_dir/aria-shell/cmd.sock."""
+    (runtime_dir / 'aria-shell').mkdir()
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind((runtime_dir / 'aria-shell' / 'cmd.sock').as_posix())
+    server.listen(16)
+
+    def _handle(conn: socket.socket):
+        with conn, conn.makefile('rb') as stream:
+            for line in stream:
+                if line.startswith(b'{'):
+                    request = json.loads(line)
+                    reply = {'v': 1, 'id': request['id'], 'ok': True, 'result': None}
+                    conn.sendall(json.dumps(reply).encode() + b'\n')
+                else:
+                    conn.sendall(b'OK\n')
+
+    def _serve():
+        while True:
+            conn, _ = server.accept()
+            threading.Thread(target=_handle, args=(conn,), daemon=True).start()
+
+    threading.Thread(target=_serve, daemon=True).start()
+    return server
+
+
+def timed_runs(cmd: list[str], count: int, env: dict) -> list[float]:
+    """Run cmd count times, return the seconds of each run."""
+    times = []
+    for _ in range(count):
+        t = time.perf_counter()
+        proc = subprocess.run(cmd, env=env, capture_output=True, text=True)
+        times.append(time.perf_counter() - t)
+        if proc.returncode != 0:
+            raise RuntimeError(f'{cmd} failed: {proc.stdout}{proc.stderr}')
+    return times
+
+
+def imported_modules(cmd: list[str], env: dict) -> list[str]:
+    """The modules imported by cmd, using python -X importtime."""
+    proc = subprocess.run([sys.executable, '-X', 'importtime', *cmd[1:]],
+                          env=env, capture_output=True, text=True)
+    return [line.rpartition('|')[2].strip()
+            for line in proc.stderr.splitlines()
+            if line.startswith('import time:') and '|' in line][1:]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='aria-shell command benchmark')
+    parser.add_argument('-n', '--runs', type=int, default=30,
+                        help='number of runs for each case')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as runtime_dir:
+        server = fake_shell(Path(runtime_dir))
+        env = dict(os.environ, XDG_RUNTIME_DIR=runtime_dir)
+
+        command = [sys.executable, SCRIPT.as_posix(), 'launcher', 'toggle']
+        cases = [
+            ('python startup', [sys.executable, '-c', 'pass']),
+            ('aria-shell launcher toggle', command),
+        ]
+        try:
+            import gi  # noqa: F401
+            cases.append((
+                'import the shell (avoided)',
+                [sys.executable, '-c', 'import aria_shell.ariashell'],
+            ))
+        except ImportError:
+            print('gi not available, not timing the shell import\n')
+
+        print(f'{"case":<28} {"mean ms":>8} {"median ms":>9} {"max ms":>8}')
+        for name, cmd in cases:
+            times = timed_runs(cmd, args.runs, dict(env, PYTHONPATH=ROOT.as_posix()))
+            print(f'{name:<28} {statistics.mean(times) * 1000:>8.2f}'
+                  f' {statistics.median(times) * 1000:>9.2f}'
+                  f' {max(times) * 1000:>8.2f}')
+
+        modules = imported_modules(command, env)
+        gi_modules = [m for m in modules if m == 'gi' or m.startswith('gi.')]
+        print(f'\nmodules imported by a command: {len(modules)},'
+              f' gi modules: {len(gi_modules)}')
+        server.close()
+        if gi_modules:
+            print('ERROR: the command mode imported gi')
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
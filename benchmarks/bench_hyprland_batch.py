@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+
+Benchmark the HyprlandService command throughput, with and without
+[[BATCH]] requests.
+
+A fake Hyprland is served on temporary unix sockets: like the real one
+it serves a single request for each connection, replying "ok" to each
+command (joined with the batch separator for batch requests). A burst
+of dispatch commands is then sent and the time needed to receive all
+the replies is reported.
+
+Usage:
+  python benchmarks/bench_hyprland_batch.py [-n 1000] [-d 0.1]
+
+"""
+import argparse
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+
+SIGNATURE = 'aria_benchmark'
+
+
+def fake_hyprland(runtime_dir: Path, latency: float) -> Path:
+    """Start a fake hyprland on the sockets in runtime_dir/hypr/SIGNATURE.
+
+    latency (in ms) is added to each request, to simulate the compositor
+    doing its work.
+    """
+    hypr_dir = runtime_dir / 'hypr' / SIGNATURE
+    hypr_dir.mkdir(parents=True)
+
+    cmd_socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    cmd_socket.bind((hypr_dir / '.socket.sock').as_posix())
+    cmd_socket.listen(16)
+
+    # the events socket is only needed to exist
+    evt_socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    evt_socket.bind((hypr_dir / '.socket2.sock').as_posix())
+    evt_socket.listen(1)
+
+    def _serve():
+        while True:
+            conn, _ = cmd_socket.accept()
+            with conn:
+                request = conn.recv(65536).decode()
+                if request.startswith('[[BATCH]]'):
+                    commands = request[9:].split(';')
+                else:
+                    commands = [request]
+                time.sleep(latency / 1000)
+                conn.sendall('\n\n\n'.join('ok' for _ in commands).encode())
+
+    threading.Thread(target=_serve, daemon=True).start()
+    return hypr_dir
+
+
+def run(service, count: int, batch_max: int) -> float:
+    """Send count commands, return the seconds needed to get all replies."""
+    from gi.repository import GLib
+
+    loop = GLib.MainLoop()
+    replies = []
+
+    def _reply_cb(reply: str):
+        replies.append(reply)
+        if len(replies) == count:
+            loop.quit()
+
+    service.batch_max = batch_max
+    t = time.perf_counter()
+    for i in range(count):
+        service.send_command(f'dispatch workspace {i % 10}', _reply_cb)
+    loop.run()
+    elapsed = time.perf_counter() - t
+    assert replies == ['ok'] * count, 'some replies got lost'
+    return elapsed
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Hyprland batch benchmark')
+    parser.add_argument('-n', '--commands', type=int, default=1000,
+                        help='number of commands to send')
+    parser.add_argument('-d', '--latency', type=float, default=0.1,
+                        help='simulated hyprland latency for each request, in ms')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as runtime_dir:
+        fake_hyprland(Path(runtime_dir), args.latency)
+
+        # must be set before importing aria_shell, that read them on import
+        os.environ['XDG_RUNTIME_DIR'] = runtime_dir
+        os.environ['HYPRLAND_INSTANCE_SIGNATURE'] = SIGNATURE
+        sys.path.insert(0, Path(__file__).resolve().parent.parent.as_posix())
+        from aria_shell.services.hyprland import HyprlandService, BATCH_MAX
+        service = HyprlandService()
+
+        print(f'{"mode":<12} {"commands":>8} {"requests":>8} {"time ms":>9} {"cmd/s":>9}')
+        for mode, batch_max in (('single', 1), ('batch', BATCH_MAX)):
+            requests_before = service.requests_sent
+            elapsed = run(service, args.commands, batch_max)
+            requests = service.requests_sent - requests_before
+            print(f'{mode:<12} {args.commands:>8} {requests:>8}'
+                  f' {elapsed * 1000:>9.1f} {args.commands / elapsed:>9.0f}')
+        service.shutdown()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+
+Benchmark the launcher search index.
+
+A synthetic database of desktop apps is indexed, then a set of queries is
+replayed one keystroke at a time, like a user typing in the launcher.
+The time needed to answer each keystroke is reported, searching the best
+--limit results like the launcher does (0 to search all the matches).
+
+Usage:
+  python benchmarks/bench_launcher_search.py [-n 5000] [-s 42] [-l 50]
+
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, Path(__file__).resolve().parent.parent.as_posix())
+from aria_shell.utils.search import SearchIndex  # noqa: E402
+
+
+SYLLABLES = [
+    'ka', 'lo', 'fi', 're', 'fox', 'gi', 'mp', 'li', 'bre', 'of', 'fice',
+    'ter', 'mi', 'nal', 'vi', 'de', 'o', 'au', 'dio', 'pho', 'to', 'ed',
+    'it', 'or', 'net', 'work', 'sys', 'tem', 'ma', 'na', 'ger', 'pad',
+]
+WORDS = [
+    'the', 'a', 'and', 'of', 'for', 'with', 'your', 'files', 'images',
+    'music', 'video', 'web', 'browser', 'editor', 'viewer', 'manager',
+    'terminal', 'settings', 'system', 'network', 'office', 'document',
+    'player', 'recorder', 'simple', 'fast', 'modern', 'open', 'source',
+]
+VENDORS = ['org.gnome', 'org.kde', 'com.github', 'io.elementary', 'net.sf']
+
+QUERIES = [
+    'firefox', 'libreoffice writer', 'terminal', 'lo', 'gimp', 'vsc',
+    'system monitor', 'audio', 'settings', 'xyz',
+]
+
+
+def make_word(rnd: random.Random) -> str:
+    return ''.join(rnd.choices(SYLLABLES, k=rnd.randint(1, 3)))
+
+
+def make_apps(count: int, rnd: random.Random) -> list[tuple[str, str, str, str]]:
+    """Return a list of (key, name, id, description) of fake desktop apps."""
+    apps = [
+        ('firefox', 'Firefox', 'firefox.desktop', 'Browse the World Wide Web'),
+        ('writer', 'LibreOffice Writer', 'libreoffice-writer.desktop',
+         'Create and edit text and graphics in letters and reports'),
+        ('gimp', 'GNU Image Manipulation Program', 'gimp.desktop',
+         'Create images and edit photographs'),
+        ('code', 'Visual Studio Code', 'code.desktop', 'Code Editing. Redefined.'),
+    ]
+    while len(apps) < count:
+        words = [make_word(rnd).capitalize() for _ in range(rnd.randint(1, 3))]
+        name = ' '.join(words)
+        app_id = f'{rnd.choice(VENDORS)}.{"".join(words)}.desktop'
+        description = ' '.join(rnd.choices(WORDS, k=rnd.randint(3, 10)))
+        apps.append((f'app{len(apps)}', name, app_id, description.capitalize()))
+    return apps
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Launcher search benchmark')
+    parser.add_argument('-n', '--apps', type=int, default=5000,
+                        help='number of synthetic desktop apps')
+    parser.add_argument('-s', '--seed', type=int, default=42,
+                        help='seed for the random generator')
+    parser.add_argument('-l', '--limit', type=int, default=50,
+                        help='max number of results for each search')
+    args = parser.parse_args()
+
+    apps = make_apps(args.apps, random.Random(args.seed))
+
+    t = time.perf_counter()
+    index = SearchIndex(fuzzy_fields=1)  # like the launcher
+    for key, name, app_id, description in apps:
+        index.add(key, name, app_id, description)
+    index.prepare()
+    build_time = time.perf_counter() - t
+    print(f'Indexed {len(index)} apps in {build_time * 1000:.1f} ms')
+    print()
+
+    # replay each query one keystroke at a time
+    all_times = []
+    print(f'{"query":<20} {"keys":>4} {"results":>8} {"mean ms":>8} {"max ms":>8}')
+    for query in QUERIES:
+        times = []
+        matches = {}
+        index.search('')
+        for i in range(1, len(query) + 1):
+            t = time.perf_counter()
+            matches = index.search(query[:i], args.limit)
+            times.append(time.perf_counter() - t)
+        all_times.extend(times)
+        print(f'{query:<20} {len(times):>4} {len(matches):>8}'
+              f' {statistics.mean(times) * 1000:>8.3f} {max(times) * 1000:>8.3f}')
+
+    all_times.sort()
+    p95 = all_times[int(len(all_times) * 0.95)]
+    print()
+    print(f'{len(all_times)} keystrokes:'
+          f' mean {statistics.mean(all_times) * 1000:.3f} ms,'
+          f' median {statistics.median(all_times) * 1000:.3f} ms,'
+          f' p95 {p95 * 1000:.3f} ms,'
+          f' max {all_times[-1] * 1000:.3f} ms')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
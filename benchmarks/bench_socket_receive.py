@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+
+Benchmark the SocketClient receive path, with and without zero_copy.
+
+Fake servers reply to each request with a big payload, like the
+Hyprland j/clients reply (a oneshot connection, read until closed) and
+the Sway GET_TREE reply (a persistent connection, split by the sway
+framer). Each reply is decoded from JSON, like the services do, and the
+time needed for the whole request is reported. With --no-decode the
+hyprland replies are not decoded, to only time the receive path.
+
+Usage:
+  python benchmarks/bench_socket_receive.py [-n 50] [-w 200] [--no-decode]
+
+"""
+import argparse
+import json
+import socket
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, Path(__file__).resolve().parent.parent.as_posix())
+from aria_shell.utils.socket import SocketClient  # noqa: E402
+from aria_shell.services.sway import (  # noqa: E402
+    SwayFramer, SwayService, MessageType, HEADER
+)
+
+
+def make_clients(count: int) -> bytes:
+    """A fake hyprland j/clients reply with count windows."""
+    return json.dumps([{
+        'address': f'0x{i:012x}',
+        'mapped': True,
+        'hidden': False,
+        'at': [i % 1920, i % 1080],
+        'size': [800, 600],
+        'workspace': {'id': i % 10, 'name': str(i % 10)},
+        'floating': False,
+        'monitor': 0,
+        'class': f'org.example.App{i}',
+        'title': f'A window title number {i} - Example Application',
+        'initialClass': f'org.example.App{i}',
+        'initialTitle': f'Example Application {i}',
+        'pid': 1000 + i,
+        'xwayland': False,
+        'pinned': False,
+        'fullscreen': 0,
+        'grouped': [],
+        'tags': [],
+        'swallowing': '0x0',
+        'focusHistoryID': i,
+    } for i in range(count)], indent=4).encode()
+
+
+def make_tree(count: int) -> bytes:
+    """A fake sway GET_TREE reply with count windows."""
+    windows = [{
+        'id': 100 + i,
+        'type': 'con',
+        'name': f'A window title number {i} - Example Application',
+        'app_id': f'org.example.App{i}',
+        'pid': 1000 + i,
+        'focused': False,
+        'urgent': False,
+        'rect': {'x': 0, 'y': 0, 'width': 800, 'height': 600},
+        'nodes': [],
+        'floating_nodes': [],
+    } for i in range(count)]
+    workspaces = [{'id': 10 + w, 'type': 'workspace', 'name': str(w),
+                   'nodes': windows[w::10], 'floating_nodes': []}
+                  for w in range(10)]
+    tree = {'id': 1, 'type': 'root', 'nodes': [
+        {'id': 2, 'type': 'output', 'name': 'eDP-1', 'nodes': workspaces}
+    ]}
+    return SwayService._serialize(MessageType.GET_TREE, json.dumps(tree, indent=4))
+
+
+def serve(path: str, handler) -> socket.socket:
+    """Serve each connection with handler(conn) in a thread."""
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(path)
+    server.listen(16)
+
+    def _serve():
+        while True:
+            conn, _ = server.accept()
+            with conn:
+                handler(conn)
+
+    threading.Thread(target=_serve, daemon=True).start()
+    return server
+
+
+def hyprland_handler(reply: bytes):
+    def _handler(conn: socket.socket):
+        conn.recv(1024)
+        conn.sendall(reply)
+    return _handler
+
+
+def sway_handler(reply: bytes):
+    def _handler(conn: socket.socket):
+        with conn.makefile('rb') as f:
+            while header := f.read(HEADER.size):
+                _, length, _ = HEADER.unpack(header)
+                f.read(length)
+                conn.sendall(reply)
+    return _handler
+
+
+def run(client: SocketClient, request: bytes, count: int, decode) -> list[float]:
+    """Send count requests one after the other, return the time of each."""
+    from gi.repository import GLib
+
+    loop = GLib.MainLoop()
+    times = []
+    start = 0.0
+
+    def _send():
+        nonlocal start
+        start = time.perf_counter()
+        client.request(request, _reply_cb)
+
+    def _reply_cb(reply):
+        decode(reply)
+        times.append(time.perf_counter() - start)
+        if len(times) < count:
+            _send()
+        else:
+            loop.quit()
+
+    _send()
+    loop.run()
+    return times
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='SocketClient receive benchmark')
+    parser.add_argument('-n', '--requests', type=int, default=50,
+                        help='number of requests for each case')
+    parser.add_argument('-w', '--windows', type=int, default=200,
+                        help='number of windows in the replies')
+    parser.add_argument('--no-decode', action='store_true',
+                        help='do not decode the hyprland replies')
+    args = parser.parse_args()
+
+    clients = make_clients(args.windows)
+    tree = make_tree(args.windows)
+
+    def _decode_hyprland(reply):
+        if not args.no_decode:
+            json.loads(str(reply, 'utf-8'))
+
+    def _decode_sway(reply):
+        assert reply is not None and reply.data
+
+    print(f'{"case":<28} {"reply KiB":>9} {"mean ms":>8} {"median ms":>9} {"max ms":>8}')
+    with tempfile.TemporaryDirectory() as tmp:
+        hypr_path = f'{tmp}/hyprland.sock'
+        sway_path = f'{tmp}/sway.sock'
+        servers = [serve(hypr_path, hyprland_handler(clients)),
+                   serve(sway_path, sway_handler(tree))]
+
+        for zero_copy in (False, True):
+            mode = 'zero_copy' if zero_copy else 'bytes'
+            cases = (
+                (f'hyprland j/clients {mode}', len(clients), _decode_hyprland,
+                 SocketClient(hypr_path, oneshot=True, zero_copy=zero_copy),
+                 b'j/clients'),
+                (f'sway GET_TREE {mode}', len(tree), _decode_sway,
+                 SocketClient(sway_path, framer=SwayFramer(), zero_copy=zero_copy),
+                 SwayService._serialize(MessageType.GET_TREE, '')),
+            )
+            for name, size, decode, client, request in cases:
+                times = run(client, request, args.requests, decode)
+                client.disconnect()
+                print(f'{name:<28} {size / 1024:>9.0f}'
+                      f' {statistics.mean(times) * 1000:>8.2f}'
+                      f' {statistics.median(times) * 1000:>9.2f}'
+                      f' {max(times) * 1000:>8.2f}')
+
+        for server in servers:
+            server.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
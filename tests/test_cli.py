@@ -0,0 +1,106 @@
+import json
+import socket
+import threading
+from importlib.machinery import SourceFileLoader
+from importlib.util import module_from_spec, spec_from_loader
+from pathlib import Path
+
+import pytest
+
+
+SCRIPT = Path(__file__).parent.parent / 'aria_shell' / 'bin' / 'aria-shell'
+
+
+def load_cli():
+    """Import the aria-shell script as a module."""
+    loader = SourceFileLoader('aria_shell_cli', SCRIPT.as_posix())
+    module = module_from_spec(spec_from_loader(loader.name, loader))
+    loader.exec_module(module)
+    return module
+
+
+cli = load_cli()
+
+
+def serve(path: Path, handler) -> socket.socket:
+    """Serve a single connection with handler(requests) -> reply lines.
+
+    All the requests are read (until the client shutdown its write side)
+    before replying, so the client must pipeline them.
+    """
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(path.as_posix())
+    server.listen(1)
+
+    def _serve():
+        conn, _ = server.accept()
+        conn.settimeout(2)
+        with conn, conn.makefile('rb') as stream:
+            requests = [json.loads(line) for line in stream]
+            for reply in handler(requests):
+                conn.sendall(json.dumps(reply).encode() + b'\n')
+
+    threading.Thread(target=_serve, daemon=True).start()
+    return server
+
+
+@pytest.fixture
+def runtime_dir(tmp_path, monkeypatch) -> Path:
+    monkeypatch.setenv('XDG_RUNTIME_DIR', tmp_path.as_posix())
+    (tmp_path / 'aria-shell').mkdir()
+    return tmp_path
+
+
+@pytest.fixture
+def socket_path(runtime_dir) -> Path:
+    return runtime_dir / 'aria-shell' / 'cmd.sock'
+
+
+def reply(request: dict, ok: bool = True) -> dict:
+    if ok:
+        return {'v': 1, 'id': request['id'], 'ok': True, 'result': request['cmd']}
+    return {'v': 1, 'id': request['id'], 'ok': False, 'error': 'failed'}
+
+
+def test_send_commands_in_order(socket_path: Path, capsys):
+    def _reversed(requests: list[dict]) -> list[dict]:
+        # reply in the opposite order, the client must print them in order
+        return [reply(request, ok=request['cmd'] != 'bad')
+                for request in reversed(requests)]
+
+    server = serve(socket_path, _reversed)
+    assert cli.send_commands(['first', 'bad', 'third'])
+    server.close()
+    assert capsys.readouterr().out.splitlines() == [
+        'OK first', 'ERR failed', 'OK third',
+    ]
+
+
+def test_send_commands_requests(socket_path: Path):
+    received = []
+
+    def _record(requests: list[dict]) -> list[dict]:
+        received.extend(requests)
+        return [reply(request) for request in requests]
+
+    server = serve(socket_path, _record)
+    assert cli.send_commands(cmd for cmd in ('a', 'b c'))  # any iterable
+    server.close()
+    assert received == [
+        {'v': 1, 'id': 1, 'cmd': 'a'},
+        {'v': 1, 'id': 2, 'cmd': 'b c'},
+    ]
+
+
+def test_send_commands_missing_replies(socket_path: Path, capsys):
+    server = serve(socket_path, lambda requests: [reply(requests[0])])
+    assert not cli.send_commands(['first', 'second', 'third'])
+    server.close()
+    assert capsys.readouterr().out.splitlines() == [
+        'OK first', 'ERR: Missing replies for 2 commands',
+    ]
+
+
+def test_send_commands_no_shell(runtime_dir: Path, capsys):
+    assert not cli.send_commands(['first'])
+    assert capsys.readouterr().out.startswith('ERR: Cannot find aria socket')
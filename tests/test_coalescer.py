@@ -0,0 +1,45 @@
+from aria_shell.utils import Coalescer
+
+
+def test_merge_and_flush():
+    calls = []
+    coalescer = Coalescer()
+    coalescer.schedule('title', calls.append, 'first')
+    coalescer.schedule('active', calls.append, 'active')
+    coalescer.schedule('title', calls.append, 'second')
+    assert calls == []  # nothing run before the flush
+
+    coalescer.flush()
+    # only the last update for each key, in scheduling order
+    assert calls == ['active', 'second']
+    assert coalescer.stats() == {
+        'scheduled': 3, 'merged': 1, 'flushes': 1, 'pending': 0,
+    }
+
+    coalescer.flush()  # nothing pending
+    assert coalescer.flushes == 1
+
+
+def test_cancel():
+    calls = []
+    coalescer = Coalescer()
+    coalescer.schedule('key', calls.append, 'value')
+    coalescer.cancel()
+    coalescer.flush()
+    assert calls == []
+
+
+def test_discard():
+    calls = []
+    coalescer = Coalescer()
+    coalescer.schedule('a', calls.append, 'a')
+    coalescer.schedule('b', calls.append, 'b')
+    coalescer.discard('a')
+    coalescer.discard('unknown')
+    coalescer.flush()
+    assert calls == ['b']
+
+    # the timer is stopped when nothing is left
+    coalescer.schedule('a', calls.append, 'a')
+    coalescer.discard('a')
+    assert coalescer._timer is None
@@ -0,0 +1,276 @@
+import asyncio
+import json
+import socket
+import threading
+from concurrent.futures import Future
+
+import pytest
+
+from gi.repository import GLib
+
+from aria_shell.config import AriaConfig
+from aria_shell.services import commands
+from aria_shell.services.commands import CommandsService, CommandFailed, SocketListener
+
+
+class Client:
+    """A client of the commands socket, driven by the GLib main loop."""
+    def __init__(self, path: str):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(path)
+        self.sock.setblocking(False)
+        self.received = b''
+        self.eof = False
+
+    def send(self, *lines: bytes):
+        self.sock.sendall(b''.join(line + b'\n' for line in lines))
+
+    def lines(self) -> list[bytes]:
+        return self.received.splitlines()
+
+    def wait(self, count: int = 0, eof: bool = False, timeout: int = 2000):
+        """Run the main loop until count lines (or eof) are received."""
+        loop = GLib.MainLoop()
+
+        def _check() -> bool:
+            try:
+                while data := self.sock.recv(65536):
+                    self.received += data
+                else:
+                    self.eof = True
+            except BlockingIOError:
+                pass
+            if (self.eof if eof else len(self.lines()) >= count):
+                loop.quit()
+            return True
+
+        sources = [GLib.timeout_add(5, _check),
+                   GLib.timeout_add(timeout, loop.quit)]
+        loop.run()
+        for source in sources:
+            GLib.source_remove(source)
+
+    def close(self):
+        self.sock.close()
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    monkeypatch.setattr(commands, 'ARIA_RUNTIME_DIR', tmp_path)
+    CommandsService.clear_instance()
+    SocketListener.clear_instance()
+    service = CommandsService()
+    yield service
+    service.shutdown()
+    CommandsService.clear_instance()
+    SocketListener.clear_instance()
+
+
+@pytest.fixture
+def client(service, tmp_path):
+    client = Client((tmp_path / 'cmd.sock').as_posix())
+    yield client
+    client.close()
+
+
+def wait_for(condition, timeout: int = 2000):
+    """Run the main loop until condition() is true."""
+    loop = GLib.MainLoop()
+    sources = [GLib.timeout_add(5, lambda: condition() and loop.quit() or True),
+               GLib.timeout_add(timeout, loop.quit)]
+    loop.run()
+    for source in sources:
+        GLib.source_remove(source)
+
+
+def run(service: CommandsService, command: str, params: list[str] | None = None,
+        timeout: int = 2000) -> tuple[bool, str | None] | None:
+    """Run the command with run_async(), return its (success, response)."""
+    results = []
+    service.run_async(command, params, lambda *result: results.append(result))
+    wait_for(lambda: results, timeout)
+    return results[0] if results else None
+
+
+def json_replies(client: Client) -> list[dict]:
+    return [json.loads(line) for line in client.lines()]
+
+
+def test_json_id_round_trip(client: Client):
+    client.send(b'{"v": 1, "id": "first", "cmd": "ping", "params": ["a b"]}',
+                b'{"id": [1, 2], "cmd": "ping c d"}')
+    client.wait(2)
+    assert json_replies(client) == [
+        {'v': 1, 'id': 'first', 'ok': True, 'result': "pong ['a b']"},
+        {'v': 1, 'id': [1, 2], 'ok': True, 'result': "pong ['c', 'd']"},
+    ]
+
+
+@pytest.mark.parametrize('line, request_id, error', [
+    (b'{"id": 1, "v": 2, "cmd": "ping"}', 1, 'unsupported protocol version 2'),
+    (b'{"id": 2, "cmd": 5}', 2, 'cmd must be a string'),
+    (b'{"id": 3, "cmd": "ping", "params": "a"}', 3, 'params must be a list of strings'),
+    (b'{"id": 4, "cmd": "ping", "params": [1]}', 4, 'params must be a list of strings'),
+    (b'{"id": 5', None, 'Expecting'),
+])
+def test_json_invalid_request(client: Client, line: bytes, request_id, error: str):
+    client.send(line)
+    client.wait(1)
+    [reply] = json_replies(client)
+    assert reply['id'] == request_id
+    assert reply['ok'] is False
+    assert reply['error'].startswith('Invalid request: ')
+    assert error in reply['error']
+
+
+def test_json_unknown_command(client: Client):
+    client.send(b'{"id": 1, "cmd": "nothere"}')
+    client.wait(1)
+    assert json_replies(client) == [
+        {'v': 1, 'id': 1, 'ok': False, 'error': 'Unknown command <nothere>'},
+    ]
+
+
+def test_plain_fallback(client: Client):
+    client.send(b'ping a b', b'nothere', b'{"id": 1, "cmd": "ping"}')
+    client.wait(3)
+    assert client.lines()[:2] == [b"OK pong ['a', 'b']",
+                                  b'ERR Unknown command <nothere>']
+    assert json.loads(client.lines()[2])['id'] == 1
+
+
+def test_close_after_pending_replies(service: CommandsService, client: Client):
+    future = Future()
+    service.register('later', lambda _cmd, _params: future)
+    client.send(b'{"id": 1, "cmd": "later"}', b'ping')
+    client.sock.shutdown(socket.SHUT_WR)  # the client is done sending
+    client.wait(1)
+    assert client.lines() == [b"OK pong []"]
+    assert not client.eof  # still waiting for the 'later' reply
+
+    GLib.timeout_add(50, lambda: future.set_result('done') or False)
+    client.wait(eof=True)
+    assert client.eof
+    assert json.loads(client.lines()[1]) == {'v': 1, 'id': 1, 'ok': True,
+                                             'result': 'done'}
+
+
+def test_events(service: CommandsService, client: Client):
+    client.send(b'subscribe workspace')
+    client.wait(1)
+    assert client.lines() == [b'OK']
+    service.publish('workspace', {'id': '1'})
+    service.publish('audio', {'cid': '2'})  # not subscribed
+    client.wait(2)
+    assert json.loads(client.lines()[1]) == {'v': 1, 'event': 'workspace',
+                                             'data': {'id': '1'}}
+    client.wait(3, timeout=100)
+    assert len(client.lines()) == 2
+
+
+def test_slow_client_dropped(service: CommandsService, client: Client,
+                             monkeypatch):
+    monkeypatch.setattr(commands, 'MAX_CLIENT_BUFFER', 1000)
+    client.send(b'subscribe')
+    client.wait(1)
+    [connection] = service._socket_listener.clients
+
+    # a burst of events, queued faster than they can be written
+    for i in range(50):
+        service.publish('audio', {'cid': str(i), 'name': 'x' * 50})
+    assert connection._closed
+    assert not service._socket_listener.clients
+    client.wait(eof=True)
+    assert client.eof
+
+
+def test_sync_runners(service: CommandsService):
+    def _failed(_cmd, _params):
+        raise CommandFailed('nope')
+
+    def _broken(_cmd, _params):
+        raise ValueError('boom')
+
+    service.register('failed', _failed)
+    service.register('broken', _broken)
+    results = []
+    for command in ('ping a', 'aria ping b', 'failed', 'broken', 'nothere', ''):
+        service.run_async(command, None, lambda *result: results.append(result))
+    # called immediately, without the main loop
+    assert results == [
+        (True, "pong ['a']"),
+        (True, "pong ['b']"),
+        (False, 'nope'),
+        (False, 'boom'),
+        (False, 'Unknown command <nothere>'),
+        (False, 'Empty command!'),
+    ]
+    stats = service.stats()
+    assert stats['in_flight'] == 0
+    assert stats['commands']['ping']['runs'] == 2
+    assert stats['commands']['failed']['failures'] == 1
+
+
+def test_threaded_runner(service: CommandsService):
+    def _where(_cmd, params):
+        return f'{threading.current_thread().name} {params}'
+
+    service.register('where', _where, threaded=True)
+    success, response = run(service, 'where', ['x'])
+    assert success
+    assert response.startswith('aria-commands')
+    assert response.endswith("['x']")
+    assert service.stats()['workers'] == AriaConfig().general.command_workers
+
+
+def test_future_runner(service: CommandsService):
+    future = Future()
+    service.register('later', lambda _cmd, _params: future)
+    GLib.timeout_add(20, lambda: future.set_result('done') or False)
+    assert run(service, 'later') == (True, 'done')
+
+    failing = Future()
+    service.register('later-fail', lambda _cmd, _params: failing)
+    GLib.timeout_add(20, lambda: failing.set_exception(CommandFailed('nope')) or False)
+    assert run(service, 'later-fail') == (False, 'nope')
+
+
+def test_coroutine_runner(service: CommandsService):
+    async def _coro(_cmd, params):
+        await asyncio.sleep(0.01)
+        return f'coro {params}'
+
+    service.register('coro', _coro)
+    assert run(service, 'coro a') == (True, "coro ['a']")
+
+
+def test_timeout(service: CommandsService, monkeypatch):
+    general = AriaConfig().general
+    monkeypatch.setattr(general, 'command_timeout', 1)
+    monkeypatch.setattr(general, 'command_workers', 1)
+    release = threading.Event()
+    service.register('hung', lambda _cmd, _params: release.wait(), threaded=True)
+    service.register('quick', lambda _cmd, _params: 'quick', threaded=True)
+
+    try:
+        assert run(service, 'hung', timeout=3000) == (False, 'Command <hung> timed out')
+        # the only worker is still hung, the next commands use a new pool
+        assert run(service, 'quick') == (True, 'quick')
+        stats = service.stats()
+        assert stats['hung_runners'] == 1
+        assert stats['commands']['hung']['timeouts'] == 1
+        assert stats['in_flight'] == 0
+    finally:
+        release.set()
+
+
+def test_plain_replies_in_order(service: CommandsService, client: Client):
+    future = Future()
+    service.register('later', lambda _cmd, _params: future)
+    client.send(b'later', b'ping')
+    client.wait(1, timeout=100)
+    assert client.lines() == []  # ping is done, but waits for 'later'
+
+    GLib.timeout_add(20, lambda: future.set_result('done') or False)
+    client.wait(2)
+    assert client.lines() == [b'OK done', b'OK pong []']
@@ -0,0 +1,51 @@
+from pathlib import Path
+
+import pytest
+
+from aria_shell.utils.frecency import FrecencyStore, HALF_LIFE
+
+
+NOW = 1_700_000_000
+
+
+@pytest.fixture
+def store(tmp_path: Path) -> FrecencyStore:
+    return FrecencyStore(tmp_path / 'test.frecency')
+
+
+def test_unknown_key(store: FrecencyStore):
+    assert store.score('firefox', NOW) == 0
+    assert store.boost('firefox', NOW) == 0
+    assert len(store) == 0
+
+
+def test_bump_and_decay(store: FrecencyStore):
+    store.bump('firefox', NOW)
+    store.bump('firefox', NOW)
+    assert store.score('firefox', NOW) == pytest.approx(2)
+    assert store.score('firefox', NOW + HALF_LIFE) == pytest.approx(1)
+    assert 0 < store.boost('firefox', NOW) < 1
+
+
+def test_frequent_vs_recent(store: FrecencyStore):
+    for _ in range(5):
+        store.bump('old', NOW - HALF_LIFE * 3)
+    store.bump('new', NOW)
+    assert store.boost('new', NOW) > store.boost('old', NOW)
+    assert store.boost('old', NOW - HALF_LIFE) > store.boost('new', NOW - HALF_LIFE)
+
+
+def test_persistence(store: FrecencyStore):
+    store.bump('firefox')
+    store.bump('gimp')
+    assert not store.path.exists()  # writes are batched
+    store.flush()
+
+    loaded = FrecencyStore(store.path)
+    assert loaded.entries.keys() == {'firefox', 'gimp'}
+    assert loaded.score('firefox') == pytest.approx(store.score('firefox'))
+
+
+def test_invalid_file(store: FrecencyStore):
+    store.path.write_text('not a json')
+    assert store.score('firefox') == 0
@@ -0,0 +1,138 @@
+import pytest
+
+from aria_shell.services.wm import (
+    HyprlandBackend, WindowManagerBackend, WORKSPACES_STORE, WINDOWS_STORE,
+)
+from aria_shell.utils import Coalescer
+
+
+class FakeHyprland:
+    def __init__(self, workspaces: list[dict], clients: list[dict]):
+        self.workspaces = workspaces
+        self.clients = clients
+        self.commands = []
+
+    def send_command(self, command: str, callback=None):
+        self.commands.append(command)
+        match command:
+            case 'j/workspaces':
+                callback(self.workspaces)
+            case 'j/clients':
+                callback(self.clients)
+            case 'j/activeworkspace':
+                callback(self.workspaces[0])
+            case 'j/activewindow':
+                callback(self.clients[0])
+
+
+def workspace(id_: int, monitor: str = 'DP-1') -> dict:
+    return {'id': id_, 'name': str(id_), 'monitor': monitor}
+
+
+def client(address: str, wclass: str, workspace_id: int, title: str = '') -> dict:
+    return {'address': f'0x{address}', 'class': wclass, 'title': title,
+            'workspace': {'id': workspace_id, 'name': str(workspace_id)}}
+
+
+@pytest.fixture
+def backend():
+    WINDOWS_STORE.remove_all()
+    WORKSPACES_STORE.remove_all()
+    backend = HyprlandBackend.__new__(HyprlandBackend)
+    WindowManagerBackend.__init__(backend)
+    backend.coalescer = Coalescer()
+    backend.hypr = FakeHyprland(
+        workspaces=[workspace(1), workspace(2, 'HDMI-A-1')],
+        clients=[client('a1', 'foot', 1, 'shell'), client('b2', 'firefox', 2)],
+    )
+    backend._resync()
+    backend.coalescer.flush()
+    backend.hypr.commands.clear()
+    yield backend
+    WINDOWS_STORE.remove_all()
+    WORKSPACES_STORE.remove_all()
+
+
+def send(backend: HyprlandBackend, event: str, data: str):
+    backend._hypr_events_cb(event, data)
+
+
+def test_resync(backend: HyprlandBackend):
+    assert list(WORKSPACES_STORE.keys()) == ['1', '2']
+    assert list(WINDOWS_STORE.keys()) == ['a1', 'b2']
+    assert WINDOWS_STORE.get('b2').workspace_id == '2'
+    assert WINDOWS_STORE.get('b2').monitor_id == 'HDMI-A-1'
+    assert backend.active_workspace is WORKSPACES_STORE.get('1')
+    assert backend.active_window is WINDOWS_STORE.get('a1')
+
+
+def test_window_events(backend: HyprlandBackend):
+    send(backend, 'openwindow', 'c3,2,gimp,GNU Image, Manipulation')
+    window = WINDOWS_STORE.get('c3')
+    assert (window.name, window.title) == ('gimp', 'GNU Image, Manipulation')
+    assert (window.workspace_id, window.monitor_id) == ('2', 'HDMI-A-1')
+
+    # titles are coalesced, only the last one is applied
+    send(backend, 'windowtitlev2', 'c3,one')
+    send(backend, 'windowtitlev2', 'c3,two, three')
+    assert window.title == 'GNU Image, Manipulation'
+    backend.coalescer.flush()
+    assert window.title == 'two, three'
+
+    send(backend, 'movewindowv2', 'c3,1,1')
+    assert (window.workspace_id, window.monitor_id) == ('1', 'DP-1')
+
+    send(backend, 'activewindowv2', 'c3')
+    backend.coalescer.flush()
+    assert backend.active_window is window and window.active
+
+    send(backend, 'closewindow', 'c3')
+    assert 'c3' not in WINDOWS_STORE.keys()
+    assert backend.active_window is None
+    assert backend.hypr.commands == []  # all from the events payload
+
+
+@pytest.mark.parametrize('event, data', [
+    ('openwindow', 'c3,9,gimp,GIMP'),  # on an unknown workspace
+    ('movewindowv2', 'c3,1,1'),        # an unknown window
+    ('movewindowv2', 'a1,9,9'),        # to an unknown workspace
+])
+def test_window_events_resync(backend: HyprlandBackend, event: str, data: str):
+    backend.hypr.clients.append(client('c3', 'gimp', 2))
+    send(backend, event, data)
+    send(backend, event, data)
+    backend.coalescer.flush()
+    assert backend.hypr.commands == ['j/clients']  # once per burst
+    assert WINDOWS_STORE.get('c3').workspace_id == '2'
+
+
+def test_workspace_events(backend: HyprlandBackend):
+    # the payload miss the monitor, only the workspaces are fetched
+    backend.hypr.workspaces.append(workspace(3, 'HDMI-A-1'))
+    send(backend, 'createworkspacev2', '3,3')
+    backend.coalescer.flush()
+    assert backend.hypr.commands == ['j/workspaces']
+    assert WORKSPACES_STORE.get('3').monitor == 'HDMI-A-1'
+
+    send(backend, 'workspacev2', '2,2')
+    send(backend, 'workspacev2', '3,3')
+    backend.coalescer.flush()
+    assert backend.active_workspace is WORKSPACES_STORE.get('3')
+    assert not WORKSPACES_STORE.get('1').active
+
+    send(backend, 'focusedmonv2', 'DP-1,1')
+    backend.coalescer.flush()
+    assert backend.active_workspace is WORKSPACES_STORE.get('1')
+
+    send(backend, 'renameworkspace', '3,web')
+    assert WORKSPACES_STORE.get('3').name == 'web'
+
+    # the windows follow their workspace
+    send(backend, 'moveworkspacev2', '2,2,DP-1')
+    assert WORKSPACES_STORE.get('2').monitor == 'DP-1'
+    assert WINDOWS_STORE.get('b2').monitor_id == 'DP-1'
+
+    send(backend, 'destroyworkspacev2', '1,1')
+    assert list(WORKSPACES_STORE.keys()) == ['2', '3']
+    assert backend.active_workspace is None
+    assert backend.hypr.commands == ['j/workspaces']
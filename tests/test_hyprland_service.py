@@ -0,0 +1,108 @@
+from collections import deque
+
+import pytest
+
+from aria_shell.services.hyprland import HyprlandService, BATCH_MAX
+
+
+class FakeSocket:
+    """A command socket where the replies are sent by the test."""
+    max_in_flight = 1
+
+    def __init__(self):
+        self.requests = []
+        self._callbacks = deque()
+
+    @property
+    def pending(self) -> int:
+        return len(self._callbacks)
+
+    def request(self, request: str, callback):
+        self.requests.append(request)
+        self._callbacks.append(callback)
+
+    def reply(self, data: bytes | None):
+        self._callbacks.popleft()(memoryview(data) if data else None)
+
+
+@pytest.fixture
+def service() -> HyprlandService:
+    service = HyprlandService.__new__(HyprlandService)
+    service._commands_queue = deque()
+    service.commands_sent = service.commands_merged = service.requests_sent = 0
+    service._cmd_socket = FakeSocket()
+    service._evt_socket = None
+    return service
+
+
+def test_batch_max(service: HyprlandService):
+    for n in range(BATCH_MAX + 10):
+        service.send_command(f'dispatch workspace {n}')
+    socket = service._cmd_socket
+    # the first command is sent alone, the others wait for its reply
+    assert socket.requests == ['dispatch workspace 0']
+    socket.reply(b'ok')
+    socket.reply(b'ok\n\n\n' * BATCH_MAX)
+    socket.reply(b'ok\n\n\n' * 9)
+    assert [r.count(';') + 1 for r in socket.requests] == [1, BATCH_MAX, 9]
+    assert socket.requests[1].startswith('[[BATCH]]dispatch workspace 1;')
+    assert (service.commands_sent, service.requests_sent) == (BATCH_MAX + 10, 3)
+
+
+def test_batch_commands_with_separator(service: HyprlandService):
+    socket = service._cmd_socket
+    service.send_command('j/monitors')
+    for command in ('j/clients', 'keyword a 1;keyword b 2', 'j/workspaces',
+                    'j/activewindow'):
+        service.send_command(command)
+    for _ in range(4):
+        socket.reply(b'[]\n\n\n[]')
+    # a command with a ; inside can only be sent alone
+    assert socket.requests == ['j/monitors', 'j/clients', 'keyword a 1;keyword b 2',
+                               '[[BATCH]]j/workspaces;j/activewindow']
+
+
+def test_merge_queries(service: HyprlandService):
+    replies = []
+    service.send_command('j/monitors')  # keep the socket busy
+    for _ in range(3):
+        service.send_command('j/clients', replies.append)
+        service.send_command('dispatch workspace 1')
+    service.send_command('j/clients', print)  # another callback
+    assert service.commands_merged == 2  # the queries, not the dispatches
+
+    socket = service._cmd_socket
+    socket.reply(b'[]')
+    assert socket.requests[1] == ('[[BATCH]]j/clients;dispatch workspace 1;'
+                                  'dispatch workspace 1;dispatch workspace 1;'
+                                  'j/clients')
+
+
+def test_batch_replies(service: HyprlandService):
+    replies = []
+    service.send_command('j/monitors')
+    service.send_command('j/clients', lambda data: replies.append(('clients', data)))
+    service.send_command('dispatch workspace 2', lambda data: replies.append(('ws', data)))
+    service.send_command('j/workspaces', lambda data: replies.append(('wss', data)))
+    socket = service._cmd_socket
+    socket.reply(b'[]')
+    # each reply is followed by the separator, the last one too
+    socket.reply(b'[{"address": "0xa1"}]\n\n\nok\n\n\n[{"id": 1}]\n\n\n')
+    assert replies == [('clients', [{'address': '0xa1'}]), ('ws', 'ok'),
+                       ('wss', [{'id': 1}])]
+
+
+def test_batch_invalid_reply(service: HyprlandService):
+    replies = []
+    service.send_command('j/monitors')
+    service.send_command('j/clients', replies.append)
+    service.send_command('j/workspaces', replies.append)
+    service.send_command('j/activewindow', replies.append)
+    socket = service._cmd_socket
+    socket.reply(b'[]')
+    socket.reply(b'[]\n\n\n[]')  # a reply is missing
+    assert replies == []
+    # the queue keeps going
+    service.send_command('j/clients', replies.append)
+    socket.reply(b'[1]')
+    assert replies == [[1]]
@@ -0,0 +1,93 @@
+import gc
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from weakref import WeakSet
+
+import pytest
+from gi.repository import GLib, GObject, Gdk, Gtk
+
+from aria_shell.services.icon_cache import IconCacheService, IMAGE_ICON_ATTR
+
+
+class FakeIconTheme:
+    def __init__(self):
+        self.lookups = []
+
+    def lookup_icon(self, icon_name, _fallbacks, size, scale, *_):
+        self.lookups.append((icon_name, size, scale))
+        return Gdk.Paintable.new_empty(size, size)
+
+
+@pytest.fixture
+def service():
+    """An icon cache on a fake icon theme."""
+    service = IconCacheService.__new__(IconCacheService)
+    service.icon_theme = FakeIconTheme()
+    service._cache = OrderedDict()
+    service._pending = {}
+    service._images = WeakSet()
+    service._executor = ThreadPoolExecutor(max_workers=1)
+    service.hits = service.misses = service.evictions = 0
+    yield service
+    service._executor.shutdown(wait=True)
+
+
+def run_pending(service: IconCacheService):
+    """Wait the lookups thread, then run its idle callbacks."""
+    service._executor.submit(lambda: None).result()
+    while GLib.MainContext.default().iteration(False):
+        pass
+
+
+def has_scale_handler(image: Gtk.Image) -> bool:
+    signal_id = GObject.signal_lookup('notify', Gtk.Image)
+    detail = GLib.quark_from_string('scale-factor')
+    return GObject.signal_has_handler_pending(image, signal_id, detail, True)
+
+
+def test_set_image(service: IconCacheService):
+    image = Gtk.Image()
+    service.set_image(image, 'firefox', 48)
+    assert image.get_paintable() is None  # cleared while loading
+    run_pending(service)
+    assert image.get_paintable() is not None
+    assert service.icon_theme.lookups == [('firefox', 48, 1)]
+
+    # cached: set immediately
+    other = Gtk.Image()
+    service.set_image(other, 'firefox', 48)
+    assert other.get_paintable() is image.get_paintable()
+    assert service.stats()['hits'] == 1
+
+
+def test_set_image_rebind(service: IconCacheService):
+    # the launcher rebinds rows with a new wrapper of the same image
+    box = Gtk.Box()
+    box.append(Gtk.Image())
+    for icon_name in ('firefox', 'gimp', 'foot'):
+        service.set_image(box.get_first_child(), icon_name, 48)
+        gc.collect()
+    run_pending(service)
+
+    image = box.get_first_child()
+    icon_name, size, handler = getattr(image, IMAGE_ICON_ATTR)
+    assert (icon_name, size) == ('foot', 48)
+    assert len(service._images) == 1
+
+    # a scale change looks up the last icon again
+    lookups = service.hits + service.misses
+    image.notify('scale-factor')
+    assert service.hits + service.misses == lookups + 1
+
+    # only one scale handler was connected
+    image.disconnect(handler)
+    assert not has_scale_handler(image)
+
+
+def test_set_image_clear(service: IconCacheService):
+    image = Gtk.Image()
+    service.set_image(image, 'firefox', 48)
+    service.set_image(image, None)
+    assert not hasattr(image, IMAGE_ICON_ATTR)
+    assert not has_scale_handler(image)
+    assert len(service._images) == 0
@@ -0,0 +1,71 @@
+import pytest
+
+from gi.repository import GObject
+
+from aria_shell.utils import IndexedListStore
+
+
+class Item(GObject.Object):
+    id: str = GObject.Property(type=str)
+    title: str = GObject.Property(type=str)
+
+    def __init__(self, id_: str, title: str = ''):
+        super().__init__()
+        self.id = id_
+        self.title = title
+
+    def __repr__(self):
+        return self.id
+
+
+def make_store(ids: str) -> tuple[IndexedListStore[Item], list]:
+    store = IndexedListStore(item_type=Item)
+    for id_ in ids:
+        store.append(Item(id_))
+    changes = []
+    store.connect('items-changed', lambda _s, *args: changes.append(args))
+    return store, changes
+
+
+def test_splice_keeps_index():
+    store, _ = make_store('abc')
+    store.splice(1, 1, [Item('x'), Item('y')])
+    assert [item.id for item in store] == ['a', 'x', 'y', 'c']
+    assert set(store.keys()) == {'a', 'x', 'y', 'c'}
+    assert store.get('b') is None
+    assert store.get('y') is store.get_item(2)
+
+
+@pytest.mark.parametrize('old, new, expected_changes', [
+    ('abc', 'abc', []),
+    ('abc', 'abcd', [(3, 0, 1)]),
+    ('abcd', 'abd', [(2, 1, 0)]),
+    ('abc', 'xbc', [(0, 1, 0), (0, 0, 1)]),
+])
+def test_reconcile(old: str, new: str, expected_changes: list):
+    store, changes = make_store(old)
+    kept = {item.id: item for item in store}
+
+    store.reconcile([Item(id_) for id_ in new], ('title',))
+
+    assert [item.id for item in store] == list(new)
+    assert set(store.keys()) == set(new)
+    assert changes == expected_changes
+    for item in store:
+        if item.id in kept:
+            assert item is kept[item.id]  # existing objects are reused
+
+
+def test_reconcile_props():
+    store, changes = make_store('abc')
+    b = store.get('b')
+    notified = []
+    b.connect('notify', lambda _obj, pspec: notified.append(pspec.name))
+
+    store.reconcile([Item('a'), Item('b', 'new title'), Item('c')], ('title',))
+
+    assert store.get('b') is b
+    assert b.title == 'new title'
+    assert notified == ['title']
+    assert changes == []
+
@@ -0,0 +1,298 @@
+import threading
+import time
+from types import SimpleNamespace
+
+from gi.repository import GLib, Gio
+
+from aria_shell.components.launcher import (
+    AriaLauncher, LauncherItem, LauncherProvider, ApplicationsProvider,
+    app_priority,
+)
+from aria_shell.gui import AriaWindow
+from aria_shell.utils import Coalescer
+from aria_shell.utils.frecency import FrecencyStore
+from aria_shell.utils.search import SearchIndex
+
+
+class FakeEntry:
+    def __init__(self):
+        self.text = ''
+
+    def get_text(self) -> str:
+        return self.text
+
+
+class RecordingProvider(LauncherProvider):
+    def __init__(self):
+        super().__init__()
+        self.searches = []
+
+    def search(self, text: str) -> list:
+        self.searches.append(text)
+        return []
+
+
+class FakeItem(LauncherItem):
+    def __init__(self, title: str):
+        super().__init__()
+        self._title = title
+
+    @property
+    def priority(self) -> float:
+        return 0
+
+    @property
+    def title(self) -> str:
+        return self._title
+
+
+class DeferredProvider(LauncherProvider):
+    """Keep the callbacks, to deliver the results later."""
+    def __init__(self):
+        super().__init__()
+        self.pending = []
+
+    def search_async(self, text, cancellable, callback):
+        self.pending.append((text, callback))
+
+
+class SlowProvider(LauncherProvider):
+    threaded = True
+
+    def __init__(self):
+        super().__init__()
+        self.searches = []
+
+    def search(self, text: str) -> list:
+        time.sleep(0.05)
+        self.searches.append((text, threading.current_thread().name))
+        return [FakeItem(text)]
+
+
+def make_launcher(search_delay: int = 50, provider: LauncherProvider = None
+                  ) -> tuple[AriaLauncher, LauncherProvider]:
+    """A launcher without a window, only the search machinery."""
+    launcher = AriaLauncher.__new__(AriaLauncher)
+    launcher.conf = SimpleNamespace(search_delay=search_delay)
+    launcher.search_entry = FakeEntry()
+    launcher.list_store = Gio.ListStore()
+    launcher.providers = [provider := provider or RecordingProvider()]
+    launcher._search_timer = None
+    launcher._search_cancellable = None
+    launcher._search_perf = None
+    launcher._results = {}
+    return launcher, provider
+
+
+def type_text(launcher: AriaLauncher, text: str):
+    launcher.search_entry.text = text
+    launcher._on_entry_changed()
+
+
+def run_loop(ms: int):
+    loop = GLib.MainLoop()
+    GLib.timeout_add(ms, loop.quit)
+    loop.run()
+
+
+def test_debounce():
+    launcher, provider = make_launcher()
+    for text in ('f', 'fi', 'fir'):
+        type_text(launcher, text)
+    assert provider.searches == []  # still waiting for the timer
+    run_loop(150)
+    assert provider.searches == ['fir']
+
+
+def test_empty_search_is_immediate():
+    launcher, provider = make_launcher()
+    type_text(launcher, 'fir')
+    type_text(launcher, '')
+    assert provider.searches == ['']
+    run_loop(150)
+    assert provider.searches == ['']  # the pending search was dropped
+
+
+def test_flush_search():
+    launcher, provider = make_launcher()
+    type_text(launcher, 'fire')
+    launcher._flush_search()
+    assert provider.searches == ['fire']
+    launcher._flush_search()  # nothing pending
+    run_loop(150)
+    assert provider.searches == ['fire']
+
+
+def test_no_delay():
+    launcher, provider = make_launcher(search_delay=0)
+    type_text(launcher, 'f')
+    type_text(launcher, 'fi')
+    assert provider.searches == ['f', 'fi']
+
+
+def titles(launcher: AriaLauncher) -> list[str]:
+    return [item.title for item in launcher.list_store]
+
+
+def test_stale_results_dropped():
+    launcher, provider = make_launcher(search_delay=0, provider=DeferredProvider())
+    type_text(launcher, 'f')
+    type_text(launcher, 'fi')
+    [(_, stale), (_, current)] = provider.pending
+    stale(provider, [FakeItem('stale')])  # late, 'f' was cancelled
+    assert titles(launcher) == []
+    current(provider, [FakeItem('fi')])
+    assert titles(launcher) == ['fi']
+
+
+def test_threaded_provider():
+    launcher, provider = make_launcher(search_delay=0, provider=SlowProvider())
+    type_text(launcher, 'f')
+    type_text(launcher, 'fi')
+    type_text(launcher, 'fir')
+    assert titles(launcher) == []  # not blocking the main loop
+    run_loop(300)
+    # 'f' started before being cancelled, 'fi' was stale before starting
+    assert [text for text, _ in provider.searches] == ['f', 'fir']
+    assert all(thread.startswith('aria-launcher')
+               for _, thread in provider.searches)
+    assert titles(launcher) == ['fir']
+    provider.shutdown()
+
+
+def test_threaded_provider_lock():
+    launcher, provider = make_launcher(search_delay=0, provider=SlowProvider())
+    with provider.lock:  # changing the provider state on the main loop
+        type_text(launcher, 'f')
+        run_loop(100)
+        assert provider.searches == []
+    run_loop(200)
+    assert titles(launcher) == ['f']
+    provider.shutdown()
+
+
+def test_app_priority():
+    index = SearchIndex()
+    index.add('files', 'Files', 'org.gnome.Nautilus.desktop')
+    index.add('firefox', 'Firefox', 'firefox.desktop')
+    index.add('writer', 'LibreOffice Writer', 'libreoffice-writer.desktop')
+    matches = index.search('fi')
+    assert matches['files'] > matches['firefox'] > matches['writer']
+    # a heavily used app never beats a better kind of match...
+    assert (app_priority(matches['firefox'], 0) >
+            app_priority(matches['writer'], 0.99))
+    # ...but wins against the same kind of match
+    assert (app_priority(matches['firefox'], 0.2) >
+            app_priority(matches['files'], 0))
+    assert (app_priority(matches['files'], 0) >
+            app_priority(matches['firefox'], 0))
+
+
+def make_apps_provider(tmp_path) -> ApplicationsProvider:
+    """An applications provider without the xdg service."""
+    provider = ApplicationsProvider.__new__(ApplicationsProvider)
+    provider.max_results = 0
+    provider.frecency = FrecencyStore(tmp_path / 'launcher.frecency')
+    provider.items = {}
+    provider.order = {}
+    provider.index = SearchIndex(fuzzy_fields=1)
+    provider._indexer = None
+    provider._order_updates = Coalescer()
+    return provider
+
+
+def fake_app(app_id: str, name: str) -> SimpleNamespace:
+    return SimpleNamespace(id=app_id, name=name, display_name=name,
+                           description=None, icon_name=None)
+
+
+def test_app_changes_sort_once(tmp_path):
+    provider = make_apps_provider(tmp_path)
+    for app_id, name in (('b', 'Bravo'), ('c', 'Charlie'), ('a', 'Alpha')):
+        provider._on_app_changed(fake_app(app_id, name))
+    provider._on_app_removed(fake_app('c', 'Charlie'))
+    assert provider.order == {}  # not sorted yet
+    assert provider._order_updates.merged == 3
+
+    # a search sort the pending changes first
+    results = provider.search('')
+    assert provider.order == {'a': 0, 'b': 1}
+    assert [item.title for item in results] == ['Alpha', 'Bravo']
+    assert provider._order_updates.flushes == 1
+
+
+def test_apps_max_results(tmp_path):
+    provider = make_apps_provider(tmp_path)
+    provider.max_results = 2
+    for app_id, name in (('a', 'Foo A'), ('b', 'Foo B'), ('c', 'Foo C'),
+                         ('x', 'XFoo')):
+        provider._on_app_changed(fake_app(app_id, name))
+    # only the best matches, but the used apps even with a worse match
+    provider.frecency.bump('x')
+    titles = [item.title for item in provider.search('foo')]
+    assert len(titles) == 3
+    assert 'XFoo' in titles
+    # no limit for the empty search
+    assert len(provider.search('')) == 4
+
+
+class FakeWindow:
+    """An AriaWindow without a surface: only the mapping is faked, the
+    prewarm state is read by the real AriaWindow methods."""
+    is_prewarming = AriaWindow.is_prewarming
+    is_shown = AriaWindow.is_shown
+
+    def __init__(self):
+        self.mapped = False
+        self._prewarm_state = None
+
+    def is_visible(self) -> bool:
+        return self.mapped
+
+    def show(self):
+        self._prewarm_state = None
+        self.mapped = True
+
+    def hide(self):
+        self._prewarm_state = None
+        self.mapped = False
+
+    def prewarm(self):
+        self._prewarm_state = 'painting'
+        self.mapped = True
+
+    def _prewarm_done(self):
+        if self._prewarm_state:
+            self.hide()
+
+    def grab_focus(self):
+        pass
+
+
+def test_toggle():
+    launcher, _ = make_launcher()
+    launcher.win = win = FakeWindow()
+    launcher.reset = lambda: None
+    launcher.the_launcher_command(None, ['toggle'])
+    assert win.is_shown()
+    launcher.the_launcher_command(None, [])
+    assert not win.is_visible()
+
+    # mapped only to prewarm, still invisible to the user
+    launcher._prewarm()
+    assert win.is_prewarming() and not win.is_shown()
+    launcher.the_launcher_command(None, ['toggle'])
+    assert win.is_shown() and not win.is_prewarming()
+
+    # never prewarm a visible window
+    launcher._prewarm()
+    assert win.is_shown() and not win.is_prewarming()
+    launcher.the_launcher_command(None, ['toggle'])
+    assert not win.is_visible()
+
+    # hidden again once the prewarm frame is painted
+    launcher._prewarm()
+    win._prewarm_done()
+    assert not win.is_visible() and not win.is_prewarming()
+    launcher.the_launcher_command(None, ['toggle'])
+    assert win.is_shown()
@@ -0,0 +1,69 @@
+import pytest
+
+from aria_shell.services.notifications import NotificationService, CloseReason
+
+
+@pytest.fixture
+def service() -> NotificationService:
+    """A notification server not published on the bus, for 3 notifications."""
+    service = NotificationService.__new__(NotificationService)
+    service.__init__()
+    service._max_notifications = 3
+    service.closed = []
+    service.NotificationClosed.connect(lambda *args: service.closed.append(args))
+    return service
+
+
+def notify(service: NotificationService, summary: str, replaces_id: int = 0) -> int:
+    return int(service.Notify('app', replaces_id, 'icon', summary, 'body',
+                              [], {}, 0))
+
+
+def summaries(service: NotificationService) -> list[str]:
+    return [notification.summary for notification in service.get_list_model()]
+
+
+def test_notify(service: NotificationService):
+    first = notify(service, 'one')
+    second = notify(service, 'two')
+    assert second == first + 1
+    assert summaries(service) == ['two', 'one']  # newest first
+    assert service.get_list_model().get(first).summary == 'one'
+
+
+def test_replaces_id(service: NotificationService):
+    first = notify(service, 'one')
+    notify(service, 'two')
+    assert notify(service, 'one again', replaces_id=first) == first
+    assert summaries(service) == ['two', 'one again']  # in place
+
+    # an unknown (fe: already closed) id gets a new notification
+    assert notify(service, 'three', replaces_id=1234) not in (first, 1234)
+    assert summaries(service) == ['three', 'two', 'one again']
+
+
+def test_close_notification(service: NotificationService):
+    first = notify(service, 'one')
+    notify(service, 'two')
+    service.CloseNotification(first)
+    service.CloseNotification(first)  # already closed
+    assert summaries(service) == ['two']
+    assert service.get_list_model().get(first) is None
+    assert service.closed == [(first, CloseReason.CLOSED.value)]
+
+
+def test_max_notifications(service: NotificationService, monkeypatch):
+    # the oldest are removed by position, without searching the store
+    monkeypatch.setattr(service.get_list_model(), 'find', None)
+    ids = [notify(service, str(n)) for n in range(5)]
+    assert summaries(service) == ['4', '3', '2']
+    assert service.closed == [(ids[0], CloseReason.EXPIRED.value),
+                              (ids[1], CloseReason.EXPIRED.value)]
+    assert service.get_list_model().get(ids[0]) is None
+    assert service.get_list_model().get(ids[2]).summary == '2'
+    assert service.stats()['evicted'] == 2
+
+    # replacing a notification does not evict
+    notify(service, '2 again', replaces_id=ids[2])
+    assert summaries(service) == ['4', '3', '2 again']
+    assert service.evicted == 2
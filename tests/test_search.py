@@ -0,0 +1,154 @@
+import pytest
+
+from aria_shell.utils.search import SearchIndex, SearchField, fuzzy_score, score_tier
+
+
+@pytest.fixture
+def index() -> SearchIndex[str]:
+    index = SearchIndex()
+    index.add('firefox', 'Firefox', 'firefox.desktop', 'Browse the World Wide Web')
+    index.add('gimp', 'GNU Image Manipulation Program', 'gimp.desktop', 'Create images')
+    index.add('files', 'Files', 'org.gnome.Nautilus.desktop', None)
+    index.add('term', 'Foot', 'foot.desktop', 'A fast Wayland terminal')
+    index.add('writer', 'LibreOffice Writer', 'libreoffice-writer.desktop', None)
+    return index
+
+
+def ranking(index: SearchIndex, query: str) -> list[str]:
+    matches = index.search(query)
+    return sorted(matches, key=lambda key: (-matches[key], key))
+
+
+def test_empty_query(index: SearchIndex):
+    assert index.search('') == dict.fromkeys(index.keys(), 1)
+
+
+@pytest.mark.parametrize('query, expected', [
+    ('firefox', ['firefox']),
+    ('fire', ['firefox']),
+    ('image', ['gimp']),
+    ('gimp', ['gimp']),
+    ('f', ['term', 'files', 'firefox', 'writer']),  # shorter names first
+    ('wayland', ['term']),
+    ('lo', ['writer']),
+    ('lw', ['writer']),
+    ('nothing', []),
+])
+def test_search(index: SearchIndex, query: str, expected: list[str]):
+    assert ranking(index, query) == expected
+
+
+def test_narrowing(index: SearchIndex):
+    results = [index.search(q) for q in ('f', 'fi', 'fil', 'file', 'files')]
+    assert results[0].keys() == {'firefox', 'files', 'term', 'writer'}
+    assert results[1].keys() == {'firefox', 'files', 'writer'}
+    assert results[-1] == {'files': 10}
+    # a new query that does not extend the previous one
+    assert list(index.search('gimp')) == ['gimp']
+
+
+@pytest.mark.parametrize('query', ['f', 'fi', 'fir', 'fire', 'o', 'of', 'lo', 'lw',
+                                   'gp', 'gmp', 'w', 'wwe', 'we', 'web'])
+def test_short_queries_score(index: SearchIndex, query: str):
+    # short queries use the precomputed tables, but must score like match()
+    expected = {}
+    for key in index.keys():
+        if priority := index.score(query, key):
+            expected[key] = priority
+    assert index.search(query) == pytest.approx(expected)
+
+
+@pytest.fixture
+def big_index() -> SearchIndex[int]:
+    words = ('fire', 'fox', 'files', 'office', 'image', 'term', 'foot', 'writer')
+    index = SearchIndex(fuzzy_fields=1)
+    for n in range(200):
+        name = ' '.join(words[(n * p) % len(words)] for p in (1, 3, 5)[:n % 3 + 1])
+        index.add(n, f'{name} {n}', f'org.app{n}.desktop')
+    return index
+
+
+@pytest.mark.parametrize('query', ['f', 'fi', 'fo', 'fire', 'o', 'ft', 'fw', 'ftr'])
+def test_limit(big_index: SearchIndex, query: str):
+    # the limited search must return the best of the full one
+    full = sorted(big_index.search(query).values(), reverse=True)
+    for limit in (1, 5, 50):
+        best = big_index.search(query, limit)
+        assert len(best) == min(limit, len(full))
+        assert sorted(best.values(), reverse=True) == full[:limit]
+
+
+def test_limit_narrowing(big_index: SearchIndex):
+    # extending a limited search must not lose the matches out of the limit
+    queries = ('f', 'fi', 'fil', 'file', 'files', 'filest')
+    narrowed = [big_index.search(query, 10) for query in queries]
+    for query, results in zip(queries, narrowed):
+        big_index.search('')  # forget the last query
+        scores = sorted(big_index.search(query, 10).values())
+        assert sorted(results.values()) == scores
+
+
+def test_score(index: SearchIndex):
+    assert index.score('fire', 'firefox') == index.search('fire')['firefox']
+    assert index.score('fire', 'gimp') == 0
+    assert index.score('fire', 'unknown') == 0
+
+
+def test_prepare_compacts(big_index: SearchIndex):
+    for n in range(150):
+        big_index.remove(n)
+    big_index.prepare()
+    assert big_index._removed == 0
+    assert len(big_index._texts[0]) == 50
+    assert all(serial in big_index._entries for _, serial in big_index._words[0])
+    assert set(big_index.search('f')) <= set(range(150, 200))
+
+
+def test_empty_fields(index: SearchIndex):
+    # an empty field never match, but the next ones keep their penalty
+    index.add('xterm', None, 'xterm.desktop')
+    assert index.search('xterm') == pytest.approx({'xterm': 8 + 5 / 13 - 0.01})
+    assert index.search('xt') == pytest.approx({'xterm': 8 + 2 / 13 - 0.01})
+
+
+def test_add_replace(index: SearchIndex):
+    index.search('fire')
+    index.add('firefox', 'IceWeasel', None, None)
+    assert index.search('fire') == {}
+    assert list(index.search('weasel')) == ['firefox']
+
+
+@pytest.mark.parametrize('query, text, low, high', [
+    ('firefox', 'Firefox', 10, 10),         # exact
+    ('fire', 'Firefox', 8, 9),              # prefix
+    ('office', 'LibreOffice', 7, 7),        # word start
+    ('ffic', 'LibreOffice', 6, 6),          # substring
+    ('lo', 'LibreOffice', 5, 5.5),          # acronym
+    ('gimp', 'GNU Image Manipulation Program', 5, 5.5),
+    ('lbr', 'LibreOffice', 1, 4.9),         # subsequence
+    ('xyz', 'LibreOffice', 0, 0),           # no match
+    ('lfe', 'LibreOffice', 0, 0),           # too scattered
+])
+def test_fuzzy_score(query: str, text: str, low: float, high: float):
+    assert low <= fuzzy_score(query, SearchField.from_text(text)) <= high
+
+
+@pytest.mark.parametrize('query, tier', [
+    ('foot', 0), ('foo', 1), ('fast', 2), ('ayla', 3), ('fd', 4), ('fdk', 5),
+])
+def test_score_tier(index: SearchIndex, query: str, tier: int):
+    assert score_tier(index.search(query)['term']) == tier
+
+
+def test_fuzzy_score_order():
+    field = SearchField.from_text('Visual Studio Code')
+    assert fuzzy_score('vscode', field) > fuzzy_score('visd', field) > 0
+
+
+def test_remove(index: SearchIndex):
+    index.search('fire')
+    index.remove('firefox')
+    index.remove('unknown')
+    assert 'firefox' not in index
+    assert index.search('fire') == {}
+    assert 'firefox' not in index.search('')
@@ -0,0 +1,189 @@
+import socket
+import threading
+
+import pytest
+
+from gi.repository import GLib
+
+from aria_shell.utils import socket as aria_socket
+from aria_shell.utils.socket import SocketClient, split_view
+
+
+class LineFramer:
+    def __init__(self):
+        self.buffer = b''
+
+    def feed(self, data: bytes) -> list[bytes]:
+        *lines, self.buffer = (self.buffer + data).split(b'\n')
+        return lines
+
+    def reset(self):
+        self.buffer = b''
+
+
+def serve(path: str, handler) -> socket.socket:
+    """Serve each connection with handler(conn) in a thread."""
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(path)
+    server.listen(16)
+
+    def _serve():
+        while True:
+            try:
+                conn, _ = server.accept()
+            except OSError:
+                return  # server closed
+            with conn:
+                handler(conn)
+
+    threading.Thread(target=_serve, daemon=True).start()
+    return server
+
+
+def collect(replies: list):
+    """A callback that store the replies, copying the zero copy views."""
+    def _callback(reply):
+        replies.append(None if reply is None else bytes(reply))
+    return _callback
+
+
+def run_until(replies: list, count: int):
+    loop = GLib.MainLoop()
+    GLib.timeout_add(2000, loop.quit)
+
+    def _check():
+        if len(replies) >= count:
+            loop.quit()
+        return True
+
+    GLib.timeout_add(5, _check)
+    loop.run()
+
+
+@pytest.fixture
+def socket_path(tmp_path) -> str:
+    return (tmp_path / 'test.sock').as_posix()
+
+
+@pytest.mark.parametrize('zero_copy', [False, True])
+def test_persistent_pipeline(socket_path: str, zero_copy: bool):
+    def _upper_lines(conn: socket.socket):
+        with conn.makefile('rb') as f:
+            for line in f:
+                conn.sendall(line.upper())
+
+    server = serve(socket_path, _upper_lines)
+    client = SocketClient(socket_path, framer=LineFramer(), max_in_flight=4,
+                          zero_copy=zero_copy)
+    replies = []
+    for i in range(10):
+        client.request(f'msg{i}\n', collect(replies))
+    assert client.pending == 10
+    run_until(replies, 10)
+    assert replies == [f'MSG{i}'.encode() for i in range(10)]
+    assert client.pending == 0
+    client.disconnect()
+    server.close()
+
+
+@pytest.mark.parametrize('zero_copy', [False, True])
+def test_oneshot(socket_path: str, zero_copy: bool):
+    def _reply_and_close(conn: socket.socket):
+        conn.sendall(b'reply:' + conn.recv(1024))
+
+    server = serve(socket_path, _reply_and_close)
+    client = SocketClient(socket_path, oneshot=True, max_in_flight=2,
+                          zero_copy=zero_copy)
+    replies = []
+    for i in range(5):
+        client.request(f'cmd{i}', collect(replies))
+    run_until(replies, 5)
+    # parallel connections, the replies can complete in any order
+    assert sorted(replies) == [f'reply:cmd{i}'.encode() for i in range(5)]
+    assert client.stats()['requests_sent'] == 5
+    client.disconnect()
+    server.close()
+
+
+def test_oneshot_in_order(socket_path: str):
+    def _slow_first(conn: socket.socket):
+        data = conn.recv(1024)
+        if data == b'cmd0':
+            threading.Event().wait(0.1)
+        conn.sendall(b'reply:' + data)
+
+    server = serve(socket_path, _slow_first)
+    client = SocketClient(socket_path, oneshot=True)
+    replies = []
+    for i in range(3):
+        client.request(f'cmd{i}', collect(replies))
+    run_until(replies, 3)
+    # one request at a time: the replies follow the requests order
+    assert replies == [f'reply:cmd{i}'.encode() for i in range(3)]
+    client.disconnect()
+    server.close()
+
+
+def test_timeout(socket_path: str):
+    def _never_reply(conn: socket.socket):
+        conn.recv(1024)
+        threading.Event().wait(1)
+
+    server = serve(socket_path, _never_reply)
+    client = SocketClient(socket_path, oneshot=True, timeout=0.1)
+    replies = []
+    client.request('cmd', replies.append)
+    run_until(replies, 1)
+    assert replies == [None]
+    assert client.requests_timed_out == 1
+    assert client.pending == 0
+    client.disconnect()
+    server.close()
+
+
+def test_zero_copy_big_reply(socket_path: str):
+    payload = bytes(range(256)) * (3 * SocketClient.BUFFER_SIZE // 256 + 7)
+
+    def _big_reply(conn: socket.socket):
+        conn.recv(1024)
+        conn.sendall(payload)
+
+    server = serve(socket_path, _big_reply)
+    client = SocketClient(socket_path, oneshot=True, zero_copy=True)
+    replies = []
+    client.request('big', collect(replies))
+    run_until(replies, 1)
+    assert replies == [payload]
+    client.disconnect()
+    server.close()
+
+
+def test_split_view():
+    view = memoryview(b'one\n\n\ntwo\n\n\n')
+    parts = split_view(view, b'\n\n\n')
+    assert [bytes(part) for part in parts] == [b'one', b'two', b'']
+    assert all(part.obj is view.obj for part in parts)
+
+
+@pytest.mark.parametrize('zero_copy', [False, True])
+def test_monitor_reconnect(socket_path: str, zero_copy: bool, monkeypatch):
+    monkeypatch.setattr(aria_socket, 'RECONNECT_MIN_DELAY', 0.05)
+    connections = []
+
+    def _send_and_close(conn: socket.socket):
+        connections.append(conn)
+        conn.sendall(f'event{len(connections)}\n'.encode())
+
+    server = serve(socket_path, _send_and_close)
+    client = SocketClient(socket_path, line_buffered=not zero_copy,
+                          zero_copy=zero_copy)
+    events = []
+    reconnected = []
+    client.monitor(collect(events), lambda: reconnected.append(True))
+    run_until(reconnected, 2)
+    newline = b'\n' if zero_copy else b''  # line_buffered strips it
+    assert events[:3] == [b'event1' + newline, None, b'event2' + newline]
+    assert client.reconnects >= 2
+    assert client.stats()['downtime'] > 0
+    client.disconnect()
+    server.close()
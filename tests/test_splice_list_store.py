@@ -0,0 +1,45 @@
+import pytest
+
+from gi.repository import Gio, GObject
+
+from aria_shell.utils import splice_list_store
+
+
+class Item(GObject.Object):
+    def __init__(self, name: str):
+        super().__init__()
+        self.name = name
+
+    def __repr__(self):
+        return self.name
+
+
+ITEMS = {name: Item(name) for name in 'abcdefgh'}
+
+
+def make_store(names: str) -> tuple[Gio.ListStore, list]:
+    store = Gio.ListStore(item_type=Item)
+    for name in names:
+        store.append(ITEMS[name])
+    changes = []
+    store.connect('items-changed', lambda _s, *args: changes.append(args))
+    return store, changes
+
+
+@pytest.mark.parametrize('old, new, expected_changes', [
+    ('abcdef', 'abcdef', []),
+    ('', 'abc', [(0, 0, 3)]),
+    ('abc', '', [(0, 3, 0)]),
+    ('abcdef', 'abdef', [(2, 1, 0)]),
+    ('abcdef', 'acf', [(3, 2, 0), (1, 1, 0)]),
+    ('acf', 'abcdef', [(1, 0, 1), (3, 0, 2)]),
+    ('abcd', 'abdce', [(2, 2, 3)]),
+])
+def test_splice_list_store(old: str, new: str, expected_changes: list):
+    store, changes = make_store(old)
+    items = [ITEMS[name] for name in new]
+
+    splice_list_store(store, items)
+
+    assert list(store) == items
+    assert changes == expected_changes
@@ -0,0 +1,186 @@
+import pytest
+
+from aria_shell.services.sway import SwayMessage, MessageType
+from aria_shell.services.wm import (
+    SwayBackend, WindowManagerBackend, WORKSPACES_STORE, WINDOWS_STORE,
+)
+from aria_shell.utils import Coalescer
+
+
+class FakeSway:
+    def __init__(self, tree: dict):
+        self.tree = tree
+        self.requests = 0
+
+    def get_tree(self, callback):
+        self.requests += 1
+        callback(self.tree)
+
+
+def output(name: str, *workspaces: dict, x: int = 0) -> dict:
+    """An output 1920 pixels wide at x, showing the first workspace."""
+    return {'type': 'output', 'name': name, 'nodes': list(workspaces),
+            'floating_nodes': [], 'focus': [ws['id'] for ws in workspaces],
+            'rect': {'x': x, 'y': 0, 'width': 1920, 'height': 1080}}
+
+
+def workspace(id_: int, name: str, output_: str, *windows: dict,
+              focused: bool = False) -> dict:
+    return {'type': 'workspace', 'id': id_, 'name': name, 'output': output_,
+            'focused': focused, 'nodes': list(windows), 'floating_nodes': []}
+
+
+def window(id_: int, app_id: str, title: str = '', focused: bool = False,
+           visible: bool = False, x: int = 0) -> dict:
+    return {'type': 'con', 'id': id_, 'pid': 1000 + id_, 'app_id': app_id,
+            'name': title, 'focused': focused, 'visible': visible,
+            'rect': {'x': x + 10, 'y': 10, 'width': 800, 'height': 600},
+            'nodes': [], 'floating_nodes': []}
+
+
+def root(*outputs: dict) -> dict:
+    return {'type': 'root', 'nodes': list(outputs), 'floating_nodes': []}
+
+
+@pytest.fixture
+def backend():
+    WINDOWS_STORE.remove_all()
+    WORKSPACES_STORE.remove_all()
+    backend = SwayBackend.__new__(SwayBackend)
+    WindowManagerBackend.__init__(backend)
+    backend.coalescer = Coalescer()
+    backend.sway = FakeSway(root(
+        output('DP-1',
+               workspace(1, '1', 'DP-1', window(10, 'foot', 'shell'),
+                         focused=True),
+               workspace(2, '2', 'DP-1', window(20, 'firefox'))),
+    ))
+    backend._resync()
+    backend.coalescer.flush()
+    yield backend
+    WINDOWS_STORE.remove_all()
+    WORKSPACES_STORE.remove_all()
+
+
+def send(backend: SwayBackend, type_: MessageType, change: str, **data):
+    backend._sway_events_cb(SwayMessage(type_, {'change': change, **data}))
+
+
+def test_tree(backend: SwayBackend):
+    assert list(WORKSPACES_STORE.keys()) == ['1', '2']
+    assert list(WINDOWS_STORE.keys()) == ['10', '20']
+    assert WINDOWS_STORE.get('20').workspace_id == '2'
+    assert WINDOWS_STORE.get('20').monitor_id == 'DP-1'
+    assert backend.active_workspace.id == '1'
+
+
+def test_window_new(backend: SwayBackend):
+    # a visible new window is on the visible workspace
+    send(backend, MessageType.EVT_WINDOW, 'new',
+         container=window(30, 'gimp', visible=True))
+    assert WINDOWS_STORE.get('30').workspace_id == '1'
+    backend.coalescer.flush()
+    assert backend.sway.requests == 1  # no tree request
+
+
+def test_window_new_on_other_workspace(backend: SwayBackend):
+    # a rule placed the new window on workspace 2, not the visible one
+    backend.sway.tree = root(
+        output('DP-1',
+               workspace(1, '1', 'DP-1', window(10, 'foot'), focused=True),
+               workspace(2, '2', 'DP-1', window(20, 'firefox'),
+                         window(30, 'gimp'))),
+    )
+    send(backend, MessageType.EVT_WINDOW, 'new', container=window(30, 'gimp'))
+    # the payload does not tell where, wait for the (coalesced) tree request
+    assert '30' not in WINDOWS_STORE.keys()
+    backend.coalescer.flush()
+    assert backend.sway.requests == 2
+    assert WINDOWS_STORE.get('30').workspace_id == '2'
+
+
+def test_window_move(backend: SwayBackend):
+    # two outputs, workspace 3 visible on the right one
+    backend.sway.tree = root(
+        output('DP-1',
+               workspace(1, '1', 'DP-1', window(10, 'foot'), focused=True),
+               workspace(2, '2', 'DP-1', window(20, 'firefox'))),
+        output('HDMI-A-1', workspace(3, '3', 'HDMI-A-1'), x=1920),
+    )
+    backend._resync()
+    backend.coalescer.flush()
+    assert backend.sway.requests == 2
+
+    # moved to the visible workspace of the other output
+    send(backend, MessageType.EVT_WINDOW, 'move',
+         container=window(10, 'foot', visible=True, x=1920))
+    assert WINDOWS_STORE.get('10').workspace_id == '3'
+    assert WINDOWS_STORE.get('10').monitor_id == 'HDMI-A-1'
+
+    # moved back, after workspace 2 has been shown on DP-1
+    send(backend, MessageType.EVT_WORKSPACE, 'focus',
+         current={'id': 2, 'output': 'DP-1'})
+    send(backend, MessageType.EVT_WINDOW, 'move',
+         container=window(10, 'foot', visible=True))
+    assert WINDOWS_STORE.get('10').workspace_id == '2'
+    assert WINDOWS_STORE.get('10').monitor_id == 'DP-1'
+    backend.coalescer.flush()
+    assert backend.sway.requests == 2  # all from the payload
+
+    # moved to a hidden workspace, only the tree tells which one
+    send(backend, MessageType.EVT_WINDOW, 'move', container=window(20, 'firefox'))
+    backend.coalescer.flush()
+    assert backend.sway.requests == 3
+
+
+def test_workspace_move(backend: SwayBackend):
+    send(backend, MessageType.EVT_WORKSPACE, 'move',
+         current={'id': 2, 'output': 'HDMI-A-1'})
+    # the windows follow their workspace at once
+    assert WORKSPACES_STORE.get('2').monitor == 'HDMI-A-1'
+    assert WINDOWS_STORE.get('20').monitor_id == 'HDMI-A-1'
+    # and the tree tells what DP-1 shows now
+    backend.coalescer.flush()
+    assert backend.sway.requests == 2
+
+
+def test_window_events(backend: SwayBackend):
+    send(backend, MessageType.EVT_WINDOW, 'title',
+         container={'id': 10, 'name': 'vim'})
+    assert WINDOWS_STORE.get('10').title == 'vim'
+
+    send(backend, MessageType.EVT_WINDOW, 'focus', container={'id': 20})
+    assert backend.active_window is WINDOWS_STORE.get('20')
+    assert WINDOWS_STORE.get('20').active
+
+    send(backend, MessageType.EVT_WINDOW, 'urgent',
+         container={'id': 10, 'urgent': True})
+    assert WINDOWS_STORE.get('10').urgent
+
+    send(backend, MessageType.EVT_WINDOW, 'close', container={'id': 10})
+    assert list(WINDOWS_STORE.keys()) == ['20']
+
+
+def test_workspace_events(backend: SwayBackend):
+    send(backend, MessageType.EVT_WORKSPACE, 'init',
+         current={'id': 3, 'name': '3', 'output': 'DP-1'})
+    assert list(WORKSPACES_STORE.keys()) == ['1', '2', '3']
+
+    send(backend, MessageType.EVT_WORKSPACE, 'focus', current={'id': 3})
+    assert backend.active_workspace is WORKSPACES_STORE.get('3')
+    assert not WORKSPACES_STORE.get('1').active
+
+    send(backend, MessageType.EVT_WORKSPACE, 'rename',
+         current={'id': 3, 'name': 'web'})
+    assert WORKSPACES_STORE.get('3').name == 'web'
+
+    send(backend, MessageType.EVT_WORKSPACE, 'empty', current={'id': 3})
+    assert list(WORKSPACES_STORE.keys()) == ['1', '2']
+
+
+def test_events_burst_resync_once(backend: SwayBackend):
+    send(backend, MessageType.EVT_WINDOW, 'move', container={'id': 10})
+    send(backend, MessageType.EVT_WINDOW, 'move', container={'id': 20})
+    send(backend, MessageType.EVT_WORKSPACE, 'move', current={'id': 2})
+    backend.coalescer.flush()
+    assert backend.sway.requests == 2  # the startup one, and a single resync
@@ -0,0 +1,63 @@
+import json
+
+import pytest
+
+from aria_shell.services.sway import SwayFramer, SwayService, MessageType
+
+
+def message(mtype: MessageType, data) -> bytes:
+    return SwayService._serialize(mtype, json.dumps(data))
+
+
+TREE = {'type': 'root', 'nodes': [{'id': i, 'name': 'x' * 100} for i in range(30000)]}
+WORKSPACE_EVENT = {'change': 'focus', 'current': {'id': 3}}
+WINDOW_EVENT = {'change': 'title', 'container': {'id': 7, 'name': 'ä title'}}
+
+
+def test_whole_messages():
+    framer = SwayFramer()
+    data = (message(MessageType.EVT_WORKSPACE, WORKSPACE_EVENT)
+            + message(MessageType.EVT_WINDOW, WINDOW_EVENT))
+    messages = framer.feed(data)
+    assert [m.type for m in messages] == [MessageType.EVT_WORKSPACE,
+                                          MessageType.EVT_WINDOW]
+    assert messages[1].data == WINDOW_EVENT
+    assert len(framer) == 0
+
+
+@pytest.mark.parametrize('chunk_size', [1, 3, 14, 1000])
+def test_split_messages(chunk_size: int):
+    framer = SwayFramer()
+    data = (message(MessageType.EVT_WINDOW, WINDOW_EVENT)
+            + message(MessageType.EVT_WORKSPACE, WORKSPACE_EVENT))
+    messages = []
+    for i in range(0, len(data), chunk_size):
+        messages += framer.feed(data[i:i + chunk_size])
+    assert [m.data for m in messages] == [WINDOW_EVENT, WORKSPACE_EVENT]
+    assert len(framer) == 0
+
+
+def test_big_payload():
+    framer = SwayFramer()
+    data = message(MessageType.GET_TREE, TREE) + message(MessageType.EVT_WINDOW, {})
+    chunk_size = 1024 * 1024
+    messages = []
+    for i in range(0, len(data), chunk_size):
+        messages += framer.feed(data[i:i + chunk_size])
+    assert len(data) > 3 * chunk_size
+    assert [m.type for m in messages] == [MessageType.GET_TREE, MessageType.EVT_WINDOW]
+    assert messages[0].data == TREE
+
+
+def test_invalid_payload_is_skipped():
+    framer = SwayFramer()
+    bad = SwayService._serialize(MessageType.EVT_WINDOW, b'{not json')
+    messages = framer.feed(bad + message(MessageType.EVT_WINDOW, WINDOW_EVENT))
+    assert [m.data for m in messages] == [WINDOW_EVENT]
+
+
+def test_invalid_header_resets():
+    framer = SwayFramer()
+    assert framer.feed(b'garbage-garbage') == []
+    assert len(framer) == 0
+    assert framer.feed(message(MessageType.EVT_WINDOW, {})) != []
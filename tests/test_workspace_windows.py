@@ -0,0 +1,82 @@
+from aria_shell.utils import IndexedListStore
+from aria_shell.services.wm import Window, Workspace, WorkspaceWindowsIndex, WINDOW_PROPS
+
+
+def make_window(id_: str, workspace_id: str) -> Window:
+    window = Window()
+    window.id = id_
+    window.workspace_id = workspace_id
+    return window
+
+
+def ids(store) -> list[str]:
+    return [win.id for win in store]
+
+
+def make_workspace(id_: str) -> Workspace:
+    workspace = Workspace()
+    workspace.id = id_
+    return workspace
+
+
+def make_index() -> tuple[IndexedListStore[Window], WorkspaceWindowsIndex]:
+    windows = IndexedListStore(item_type=Window)
+    workspaces = IndexedListStore(item_type=Workspace)
+    index = WorkspaceWindowsIndex(windows, workspaces)
+    for id_ in ('1', '2'):
+        workspaces.append(make_workspace(id_))
+    for id_, ws in (('a', '1'), ('b', '2'), ('c', '1')):
+        windows.append(make_window(id_, ws))
+    return windows, index
+
+
+def test_windows_per_workspace():
+    _, index = make_index()
+    assert ids(index.get_store('1')) == ['a', 'c']
+    assert ids(index.get_store('2')) == ['b']
+    assert ids(index.get_store('3')) == []
+
+
+def test_window_removed():
+    windows, index = make_index()
+    windows.remove_key('a')
+    assert ids(index.get_store('1')) == ['c']
+    windows.remove_all()
+    assert ids(index.get_store('1')) == []
+    assert ids(index.get_store('2')) == []
+
+
+def test_window_moved():
+    windows, index = make_index()
+    changes = []
+    index.get_store('2').connect('items-changed',
+                                 lambda _s, *args: changes.append(args))
+    windows.get('a').workspace_id = '2'
+    assert ids(index.get_store('1')) == ['c']
+    assert ids(index.get_store('2')) == ['b', 'a']
+    assert changes == [(1, 0, 1)]
+
+    # other workspaces are not touched
+    windows.get('c').title = 'new title'
+    assert changes == [(1, 0, 1)]
+
+
+def test_reconcile():
+    windows, index = make_index()
+    windows.reconcile([make_window('c', '2'), make_window('d', '1')], WINDOW_PROPS)
+    assert ids(index.get_store('1')) == ['d']
+    assert ids(index.get_store('2')) == ['c']
+
+
+
+def test_removed_workspace_dropped():
+    windows, index = make_index()
+    # the list is kept while the removed workspace still has windows
+    index._workspaces.remove_key('2')
+    assert '2' in index._stores
+    windows.remove_key('b')
+    assert '2' not in index._stores
+
+    # the lists of known workspaces are kept, even if empty
+    windows.remove_all()
+    assert '1' in index._stores
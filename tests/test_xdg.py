@@ -0,0 +1,189 @@
+import os
+from functools import lru_cache
+
+import pytest
+from gi.repository import Gio
+
+from aria_shell.services import xdg
+from aria_shell.services.xdg import XDGDesktopService, DesktopApp
+
+
+class FakeIconTheme:
+    def has_icon(self, _name: str) -> bool:
+        return True
+
+
+@pytest.fixture
+def data_dirs(tmp_path, monkeypatch) -> list:
+    """A temporary XDG_DATA_HOME and XDG_DATA_DIRS, by priority."""
+    dirs = [tmp_path / name / 'applications' for name in ('home', 'usr')]
+    for path in dirs:
+        path.mkdir(parents=True)
+    monkeypatch.setenv('XDG_DATA_DIRS', (tmp_path / 'usr').as_posix())
+    monkeypatch.setattr(xdg, 'APPS_DIRS', dirs)
+    monkeypatch.setattr(xdg, 'APPS_CACHE_FILE', tmp_path / 'desktop-apps.json')
+    return dirs
+
+
+@pytest.fixture
+def service(data_dirs):
+    """An xdg service without icon theme and dir monitors."""
+    service = XDGDesktopService.__new__(XDGDesktopService)
+    service.apps_class_map = {}
+    service.icon_theme = FakeIconTheme()
+    service._class_index = None
+    service._class_icon_cache = lru_cache(xdg.CLASS_ICON_CACHE_SIZE)(
+        service._resolve_window_class_icon
+    )
+    service._cancellable = Gio.Cancellable()
+    service.apps = {}
+    service._save_cache_timer = None
+    service._monitors = []
+    service.signals = []
+    for signal in service.__signals__:
+        service.connect(signal, lambda app_, s=signal:
+                        service.signals.append((s, app_.name)))
+    yield service
+    service._cancellable.cancel()
+    if service._save_cache_timer:
+        service._save_cache_timer.stop()
+
+
+def write_desktop(apps_dir, filename: str, name: str, **keys: str):
+    keys = {'Type': 'Application', 'Name': name, 'Exec': 'sh'} | keys
+    lines = ['[Desktop Entry]'] + [f'{key}={val}' for key, val in keys.items()]
+    (apps_dir / filename).write_text('\n'.join(lines) + '\n')
+
+
+def touch(path, later: int = 10):
+    """Move the mtime forward, the fs resolution can hide quick changes."""
+    mtime = os.stat(path).st_mtime_ns + later * 1_000_000_000
+    os.utime(path, ns=(mtime, mtime))
+
+
+def app(app_id: str, name: str, **fields) -> DesktopApp:
+    return DesktopApp(id=app_id, name=name, display_name=name, **fields)
+
+
+def test_cache_hit(service: XDGDesktopService, data_dirs):
+    write_desktop(data_dirs[1], 'foo.desktop', 'Foo')
+    apps = {'foo': app('foo.desktop', 'Foo', icon_name='foo')}
+    service._save_cache(apps, service._apps_dirs_mtimes())
+    cached_apps, files = service._load_cache()
+    assert cached_apps == apps
+    assert list(files) == [(data_dirs[1] / 'foo.desktop').as_posix()]
+
+
+@pytest.mark.parametrize('change', ['dir', 'locale', 'version'])
+def test_cache_invalidation(service: XDGDesktopService, data_dirs,
+                            monkeypatch, change: str):
+    service._save_cache({'foo': app('foo.desktop', 'Foo')},
+                        service._apps_dirs_mtimes())
+    match change:
+        case 'dir':
+            write_desktop(data_dirs[0], 'bar.desktop', 'Bar')
+            touch(data_dirs[0])
+        case 'locale':
+            monkeypatch.setattr(XDGDesktopService, '_cache_locale',
+                                staticmethod(lambda: 'xx_XX'))
+        case 'version':
+            monkeypatch.setattr(xdg, 'APPS_CACHE_VERSION', xdg.APPS_CACHE_VERSION + 1)
+    assert service._load_cache() is None
+
+
+def test_revalidation(service: XDGDesktopService, data_dirs, monkeypatch):
+    write_desktop(data_dirs[1], 'foo.desktop', 'Foo')
+    service._save_cache({}, service._apps_dirs_mtimes())
+    _, files = service._load_cache()
+    scans = []
+    monkeypatch.setattr(XDGDesktopService, '_scan_apps',
+                        staticmethod(lambda: scans.append(1) or {}))
+
+    # nothing changed: no need to read all the apps again
+    service._revalidate_thread(files)
+    assert scans == []
+
+    # a file edited in place does not change the dir mtime
+    touch(data_dirs[1] / 'foo.desktop')
+    service._revalidate_thread(files)
+    assert scans == [1]
+
+
+def test_reload_desktop_file(service: XDGDesktopService, data_dirs):
+    path = data_dirs[1] / 'org.example.Foo.desktop'
+    write_desktop(data_dirs[1], path.name, 'Foo', Icon='foo')
+    service._reload_desktop_file(path)
+    assert service.apps['org.example.foo'].icon_name == 'foo'
+
+    write_desktop(data_dirs[1], path.name, 'Foo', Icon='foo-new')
+    service._reload_desktop_file(path)
+    assert service.apps['org.example.foo'].icon_name == 'foo-new'
+
+    # hidden apps are removed, like the deleted ones
+    write_desktop(data_dirs[1], path.name, 'Foo', NoDisplay='true')
+    service._reload_desktop_file(path)
+    assert 'org.example.foo' not in service.apps
+
+    # not a .desktop file, or out of the apps dirs
+    service._reload_desktop_file(data_dirs[1] / 'foo.txt')
+    service._reload_desktop_file(data_dirs[1].parent / 'foo.desktop')
+    assert service.signals == [('app-added', 'Foo'), ('app-changed', 'Foo'),
+                               ('app-removed', 'Foo')]
+    assert service._save_cache_timer is not None
+
+
+def test_reload_subdir(service: XDGDesktopService, data_dirs):
+    # the desktop id of apps in subdirs include the subdir name
+    (data_dirs[1] / 'kde').mkdir()
+    write_desktop(data_dirs[1] / 'kde', 'foo.desktop', 'Foo')
+    service._reload_desktop_file(data_dirs[1] / 'kde' / 'foo.desktop')
+    assert service.apps['kde-foo'].id == 'kde-foo.desktop'
+
+
+def test_reload_precedence(service: XDGDesktopService, data_dirs):
+    home, usr = data_dirs
+    write_desktop(usr, 'foo.desktop', 'Foo')
+    service._reload_desktop_file(usr / 'foo.desktop')
+    write_desktop(home, 'foo.desktop', 'My Foo')
+    service._reload_desktop_file(home / 'foo.desktop')
+    assert service.apps['foo'].name == 'My Foo'
+
+    # a change in a shadowed file does not override the user one
+    write_desktop(usr, 'foo.desktop', 'Foo 2')
+    service._reload_desktop_file(usr / 'foo.desktop')
+    assert service.apps['foo'].name == 'My Foo'
+
+    # the shadowed file comes back when the user one is deleted
+    (home / 'foo.desktop').unlink()
+    service._reload_desktop_file(home / 'foo.desktop')
+    assert service.apps['foo'].name == 'Foo 2'
+    assert service.signals == [('app-added', 'Foo'), ('app-changed', 'My Foo'),
+                               ('app-changed', 'Foo 2')]
+
+
+def test_class_lookups_invalidation(service: XDGDesktopService):
+    service._set_app('foo', app('foo.desktop', 'Foo', icon_name='foo',
+                                startup_wm_class='FooWindow'))
+    assert service.class_index['foowindow'].id == 'foo.desktop'
+    assert service.get_icon_name_for_window_class('FooWindow') == 'foo'
+    assert service.get_icon_name_for_window_class('FooWindow') == 'foo'
+    assert service._class_icon_cache.cache_info().hits == 1
+
+    # a changed app is found with the new data
+    service._set_app('foo', app('foo.desktop', 'Foo', icon_name='foo-new',
+                                startup_wm_class='NewWindow'))
+    assert 'foowindow' not in service.class_index
+    assert service.get_icon_name_for_window_class('NewWindow') == 'foo-new'
+
+    # a removed app is not found anymore
+    service._set_app('foo', None)
+    assert service.class_index == {}
+    assert service.get_icon_name_for_window_class('NewWindow') == 'NewWindow'
+
+    # setting the same app again keeps the lookups
+    service._set_app('bar', app('bar.desktop', 'Bar', icon_name='bar'))
+    assert service.get_icon_name_for_window_class('bar') == 'bar'
+    index = service.class_index
+    service._set_app('bar', app('bar.desktop', 'Bar', icon_name='bar'))
+    assert service.class_index is index
+    assert service._class_icon_cache.cache_info().currsize == 1